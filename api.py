@@ -1,19 +1,63 @@
-from fastapi import FastAPI
+import asyncio
+from typing import Literal, Optional
+
+from fastapi import FastAPI, Request
 from pydantic import BaseModel
-from main import run_design_pipeline
+from starlette.concurrency import run_in_threadpool
+from main import run_design_pipeline, get_pipeline_stats
+from utils.deadline import Deadline
 
 app = FastAPI(title="Spatial Design Generator API")
 
+# 单个请求的默认端到端时间预算（秒）
+DEFAULT_TIMEOUT = 120.0
+# 检查客户端是否断开的间隔（秒）
+DISCONNECT_POLL_S = 0.5
+
 class DesignRequest(BaseModel):
     user_input: str
+    # 可选：显式约束（格式同 requirements.json）；不传则从 user_input 中提取
+    requirements: Optional[dict] = None
+    # 可选：是否分区并发生成；不传则按房间数自动判断
+    zoned: Optional[bool] = None
+    # LLM 调用优先级：交互请求默认 interactive，批量客户端可传 batch 让出配额
+    priority: Literal["interactive", "batch"] = "interactive"
+    # 可选：端到端时间预算（秒），超时后停止生成并返回；不传则为 DEFAULT_TIMEOUT
+    timeout: Optional[float] = None
 
 class DesignResponse(BaseModel):
     llm_raw_output: str
     parsed_design: dict
     validation_passed: bool
     validation_result: str
+    requirements: dict = {}
+    generation_path: Optional[str] = None  # "deterministic" | "infeasible" | "llm" | "zoned" | "cached"
+    diagnostics: list = []
+    feasibility: list = []  # 不可行原因（非空时未调用 LLM）
+    llm_usage: dict = {}  # LLM 调用次数、token 用量、续写次数与省下的输出 token
+    routing: Optional[dict] = None  # 模型路由决策（未调用 LLM 时为空）
+    cancelled: Optional[dict] = None  # 超时 / 客户端断开时的取消原因与阶段
+    timings: dict = {}  # 各阶段耗时（秒）
+    cache: Optional[dict] = None  # 结果缓存：键的种类（intent / exact）、是否命中、规范化置信度
 
 @app.post("/generate", response_model=DesignResponse)
-def generate_design(request: DesignRequest):
-    result = run_design_pipeline(request.user_input)
-    return result
\ No newline at end of file
+async def generate_design(request: DesignRequest, http_request: Request):
+    """
+    流水线在线程池中执行，本协程轮询客户端连接：客户端断开时取消请求，
+    流水线在下一个阶段边界（或 LLM 重试 / 限流等待中）停止，释放 worker
+    """
+    deadline = Deadline(request.timeout or DEFAULT_TIMEOUT)
+    task = asyncio.ensure_future(run_in_threadpool(
+        run_design_pipeline, request.user_input, requirements=request.requirements, zoned=request.zoned,
+        priority=request.priority, deadline=deadline
+    ))
+    while not task.done():
+        await asyncio.wait({task}, timeout=DISCONNECT_POLL_S)
+        if not task.done() and await http_request.is_disconnected():
+            deadline.cancel("client_disconnected")
+    return task.result()
+
+@app.get("/stats")
+def pipeline_stats():
+    """各生成路径的请求数、快速路径命中率、省下的 LLM 调用数与被取消的请求"""
+    return get_pipeline_stats()
@@ -0,0 +1,81 @@
+# benchmarks/bench_batch_validator.py
+"""
+对比逐个 validate_design 与列式批量 validate_batch：
+校验两者结论完全一致，并输出耗时与加速比。
+
+用法（项目根目录）：
+    python -m benchmarks.bench_batch_validator --n 100000
+"""
+import argparse
+import copy
+import random
+import time
+
+from constraint_checker import validate_design_report
+from constraint_checker.batch import pack_designs, validate_batch
+from utils.io import EXAMPLE_FILES, read_json
+
+_NEIGHBOR_POOL = [
+    "LivingRoom_1", "BedRoom_1", "BedRoom_2", "Kitchen_1", "DiningRoom_1",
+    "Entry_1", "Storage_1", "BathRoom_1", "Garage_1", "Garden_1",
+]
+_AREA_POOL = [1, 2.5, 4.5, 6, 9, 12, 16, 22, 30]
+
+
+def make_corpus(n: int, seed: int = 0) -> list:
+    """以 examples 为模板随机扰动面积与邻接，生成 n 个通过/不通过混合的 design"""
+    rnd = random.Random(seed)
+    templates = [read_json(p) for p in EXAMPLE_FILES]
+    corpus = []
+    for i in range(n):
+        design = copy.deepcopy(templates[i % len(templates)])
+        for room in design["rooms"]:
+            if rnd.random() < 0.05:
+                room["area"] = rnd.choice(_AREA_POOL)
+            if rnd.random() < 0.05:
+                room["adjacent_to"][rnd.choice(_NEIGHBOR_POOL)] = "by door"
+        corpus.append(design)
+    return corpus
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="批量校验 vs 逐个校验 基准测试")
+    arg_parser.add_argument("--n", type=int, default=100_000, help="design 数量")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    corpus = make_corpus(args.n, args.seed)
+
+    t0 = time.perf_counter()
+    loop_results = [validate_design_report(d) for d in corpus]
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = pack_designs(corpus)
+    t_pack = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    result = validate_batch(batch)
+    t_eval = time.perf_counter() - t0
+
+    # 一致性：通过与否 + 首条违规规则
+    mismatch = 0
+    for i, (ok, violations) in enumerate(loop_results):
+        first = result.first_violation[i]
+        expected = violations[0]["rule"] if violations else None
+        got = result.rule_ids[first] if first >= 0 else None
+        if ok != bool(result.passed[i]) or expected != got:
+            mismatch += 1
+
+    print(f"designs: {args.n}  passed: {int(result.passed.sum())}  mismatch: {mismatch}")
+    print(f"loop validate_design : {t_loop:8.3f}s  ({args.n / t_loop:,.0f} designs/s)")
+    print(f"pack_designs         : {t_pack:8.3f}s")
+    print(f"validate_batch       : {t_eval:8.3f}s  ({args.n / t_eval:,.0f} designs/s)")
+    print(f"speedup (eval only)  : {t_loop / t_eval:8.1f}x")
+    print(f"speedup (pack+eval)  : {t_loop / (t_pack + t_eval):8.1f}x")
+    if mismatch:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_compact.py
+"""
+紧凑编码对比：同一批合成方案分别以 JSON（LLM 当前输出格式）与紧凑格式（design_ir/compact.py）表示，
+比较输出 token 数、按每 token 生成耗时估算的生成延迟，以及本地解码耗时；
+并校验两种格式解码后构建的 SpatialGraph 完全一致。
+
+token 数为近似值：按 BPE 常见切分（单词按大小写拆分、数字逐位、标点逐个）计数，
+环境中没有对应模型的 tokenizer；两种格式用同一口径，比例可直接参考。
+
+用法：
+    python -m benchmarks.bench_compact --rooms 6 12 24 48 --ms-per-token 20
+"""
+import argparse
+import json
+import re
+import time
+
+from benchmarks.synthetic import generate_design
+from design_ir import clean_and_validate_json, decode_compact, encode_compact, graph_to_json_dict, parse_design_to_graph
+
+_APPROX_TOKEN = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d|[^\sA-Za-z\d]")
+
+
+def approx_tokens(text: str) -> int:
+    return len(_APPROX_TOKEN.findall(text))
+
+
+def best_of(fn, repeat: int = 200) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="紧凑编码 vs JSON：输出 token 与延迟")
+    arg_parser.add_argument("--rooms", type=int, nargs="+", default=[6, 12, 24, 48])
+    arg_parser.add_argument("--ms-per-token", type=float, default=20.0,
+                            help="每个输出 token 的生成耗时（毫秒），用于估算生成延迟")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    print(f"{'rooms':>5} {'json tok':>9} {'compact tok':>12} {'saved':>7} "
+          f"{'json gen s':>11} {'compact gen s':>14} {'json dec us':>12} {'compact dec us':>15} {'same graph':>10}")
+    for n in args.rooms:
+        design = generate_design(n, seed=args.seed)
+        json_text = json.dumps(design, ensure_ascii=False)
+        compact_text = encode_compact(design)
+
+        json_tok, compact_tok = approx_tokens(json_text), approx_tokens(compact_text)
+        t_json = best_of(lambda: clean_and_validate_json(json_text))
+        t_compact = best_of(lambda: decode_compact(compact_text))
+        same = (
+            graph_to_json_dict(parse_design_to_graph(json_text))
+            == graph_to_json_dict(parse_design_to_graph(decode_compact(compact_text)))
+        )
+        print(
+            f"{n:>5} {json_tok:>9} {compact_tok:>12} {1 - compact_tok / json_tok:>7.1%} "
+            f"{json_tok * args.ms_per_token / 1e3:>11.2f} {compact_tok * args.ms_per_token / 1e3:>14.2f} "
+            f"{t_json * 1e6:>12.1f} {t_compact * 1e6:>15.1f} {str(same):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
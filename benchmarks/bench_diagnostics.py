@@ -0,0 +1,127 @@
+# benchmarks/bench_diagnostics.py
+"""
+诊断输出方式的吞吐对比：多线程执行“解析 → 建图 → 回转 JSON → 校验”（与 run_design_pipeline 去掉 LLM 调用后一致）
+- legacy: 重放改造前的 stdout 流量（逐条修正信息、节点汇总表、graph_to_json_dict 中逐轮打印的 rooms 列表、
+          INFO 级别整段 JSON 日志），日志经同步 StreamHandler 写出
+- events: 诊断记为 graph.diagnostics 结构化事件，日志经队列异步写出，整段 JSON 只在 DEBUG 级别记录
+
+输出写入临时文件（真实 IO），用法：
+    python -m benchmarks.bench_diagnostics --designs 400 --rooms 30 --threads 8
+"""
+import argparse
+import contextlib
+import json
+import logging
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synthetic import generate_design
+from constraint_checker import validate_design
+from design_ir import parse_design_to_graph, graph_to_json_dict
+from design_ir.graph import Direction
+from utils.logging import setup_logging, shutdown_logging
+
+logger = logging.getLogger("bench_diagnostics")
+
+
+def make_llm_outputs(n: int, n_rooms: int, seed: int = 0) -> list:
+    """构造 LLM 风格的输出文本：随机删除 / 篡改部分反向边描述，使解析阶段产生修正事件"""
+    rnd = random.Random(seed)
+    outputs = []
+    for i in range(n):
+        design = generate_design(n_rooms, seed=seed + i)
+        for room in design["rooms"]:
+            for target in list(room["adjacent_to"]):
+                x = rnd.random()
+                if x < 0.15:
+                    del room["adjacent_to"][target]
+                elif x < 0.25:
+                    room["adjacent_to"][target] = "by door"
+        outputs.append(json.dumps(design, ensure_ascii=False, indent=2))
+    return outputs
+
+
+def _replay_legacy_stdout(graph, llm_text: str) -> None:
+    """按改造前的 print 语句重放 stdout 输出"""
+    for event in graph.diagnostics:
+        print(f"🔧 {event['message']}")
+        if event["kind"] == "edge.reverse_fixed":
+            print(f"   原信息：连接类型={event['old_connection']}，方向={event['old_direction']}")
+            print(f"   修正为：连接类型={event['new_connection']}，方向={event['new_direction']}")
+    print("\n 校验修正完成，当前节点列表：")
+    for idx, (name, node) in enumerate(graph.rooms.items()):
+        valid = sum(1 for e in node.adjacencies if e.direction != Direction.UNKNOWN)
+        print(f"   [{idx+1}] {name} - 邻接关系数：{len(node.adjacencies)}（有效方向数：{valid}）")
+    logger.info("JSON 解析成功，结果：")
+    logger.info(json.dumps(llm_text, indent=2, ensure_ascii=False))
+
+
+def run_one(llm_text: str, legacy: bool) -> bool:
+    graph = parse_design_to_graph(llm_text, fix_json=True)
+    if legacy:
+        _replay_legacy_stdout(graph, llm_text)
+        json_dict = graph_to_json_dict(graph)
+        rooms = json_dict["rooms"]
+        for i in range(1, len(rooms) + 1):
+            print(rooms[:i])  # 原 graph_to_json_dict 每轮循环打印累积的 rooms 列表
+        logger.info(json_dict)
+    else:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("LLM 输出：\n%s", json.dumps(llm_text, indent=2, ensure_ascii=False))
+        logger.info("SpatialGraph 构建成功！包含 %d 个房间节点，诊断事件 %d 条",
+                    len(graph.rooms), len(graph.diagnostics))
+        json_dict = graph_to_json_dict(graph)
+        logger.debug("%s", json_dict)
+    ok, result = validate_design(json_dict)
+    if ok:
+        logger.info("Validation passed!")
+    else:
+        logger.info("Rejected: %s", result)
+    return ok
+
+
+def run_mode(outputs: list, legacy: bool, threads: int, sink) -> float:
+    """返回吞吐（designs/s）"""
+    if legacy:
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    else:
+        setup_logging(level="INFO", sample_rates={}, stream=sink)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink), ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda text: run_one(text, legacy), outputs))
+    if not legacy:
+        shutdown_logging()  # 计入后台线程写完剩余日志的时间
+    return len(outputs) / (time.perf_counter() - start)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="诊断事件 + 异步日志 与 print + 同步日志 的吞吐对比")
+    arg_parser.add_argument("--designs", type=int, default=400)
+    arg_parser.add_argument("--rooms", type=int, default=30)
+    arg_parser.add_argument("--threads", type=int, default=8)
+    args = arg_parser.parse_args()
+
+    outputs = make_llm_outputs(args.designs, args.rooms)
+    results = {}
+    for mode in ("legacy", "events"):
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as sink:
+            tput = run_mode(outputs, mode == "legacy", args.threads, sink)
+            sink.flush()
+            results[mode] = (tput, sink.tell())
+
+    for mode, (tput, size) in results.items():
+        print(f"{mode:<8} {tput:10.1f} designs/s   output {size / 1024:10.1f} KB")
+    print(f"speedup  {results['events'][0] / results['legacy'][0]:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
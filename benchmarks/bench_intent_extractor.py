@@ -0,0 +1,101 @@
+# benchmarks/bench_intent_extractor.py
+"""
+意图提取器对比：单遍预编译扫描（extract_requirements）与原逐行三次 re.search 的解析逻辑。
+按“户”生成多户型任务书（每户一行，含多条关系，与 config/user_input.txt 的写法一致），
+比较耗时与提取到的约束数量（原逻辑每行每类关系只取第一处匹配）。
+
+用法：
+    python -m benchmarks.bench_intent_extractor --units 10 100 1000 10000
+"""
+import argparse
+import re
+import time
+
+from llm.intention_parser import extract_requirements
+
+_UNIT_BRIEF = (
+    "- Entry_{e} ({ea}㎡) at front, directly connected to LivingRoom_{l} ({la}㎡), "
+    "DiningRoom_{d} is EAST of LivingRoom_{l} (by connected space), "
+    "open Kitchen_{k} is NORTH of DiningRoom_{d} (by connected space), "
+    "LivingRoom_{l} connects to BedRoom_{b1}, BedRoom_{b2} and BedRoom_{b3} on SOUTH side (by door), "
+    "BedRoom_{b1} (Master) has private BathRoom_{t} (by door), Storage_{s} next to Kitchen_{k} (by door)"
+)
+
+
+def make_brief(n_units: int) -> str:
+    lines = []
+    for i in range(n_units):
+        n = i + 1
+        lines.append(_UNIT_BRIEF.format(
+            e=n, l=n, d=n, k=n, t=n, s=n,
+            b1=3 * i + 1, b2=3 * i + 2, b3=3 * i + 3,
+            ea=round(2 + (i % 20) * 0.1, 1), la=14 + i % 8,
+        ))
+    return "\n".join(lines)
+
+
+def legacy_parse(intention_text: str) -> dict:
+    """改造前 parse_intention_to_requirements 的解析循环（去掉文件读写）"""
+    requirements = {"area": {}, "adjacency": [], "direction": {}}
+    for line in intention_text.split("\n"):
+        line = line.strip().lstrip("-").strip()
+        if not line:
+            continue
+        area_match = re.search(r"(\w+_\d+) \((\d+)㎡\)", line)
+        if area_match:
+            requirements["area"][area_match.group(1)] = int(area_match.group(2))
+        adj_dir_match = re.search(r"(\w+_\d+) is (\w+) of (\w+_\d?)", line)
+        if adj_dir_match:
+            room1, direction, room2 = adj_dir_match.groups()
+            if "_" not in room2:
+                room2 += "_1"
+            requirements["adjacency"].append([room1, room2])
+            requirements["direction"].setdefault(room1, {})[room2] = direction
+        multi_adj_match = re.search(r"(\w+_\d+) connects to (.*?) on (\w+) side", line)
+        if multi_adj_match:
+            main_room = multi_adj_match.group(1)
+            direction = multi_adj_match.group(3)
+            for sub_room in (r.strip() for r in multi_adj_match.group(2).split(",")):
+                if "_" not in sub_room:
+                    sub_room += "_1"
+                requirements["adjacency"].append([main_room, sub_room])
+                requirements["direction"].setdefault(sub_room, {})[main_room] = direction
+    return requirements
+
+
+def count_constraints(req: dict) -> int:
+    return (
+        len(req["area"])
+        + len({frozenset(p) for p in req["adjacency"]})
+        + sum(len(v) for v in req["direction"].values())
+    )
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="意图提取器：单遍扫描 vs 原逐行解析")
+    arg_parser.add_argument("--units", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    args = arg_parser.parse_args()
+
+    print(f"{'units':>7} {'chars':>10} {'legacy ms':>10} {'found':>7} {'single-pass ms':>15} {'found':>7} {'ns/char':>8}")
+    for n in args.units:
+        brief = make_brief(n)
+        t_legacy = best_of(lambda: legacy_parse(brief))
+        t_new = best_of(lambda: extract_requirements(brief))
+        print(
+            f"{n:>7} {len(brief):>10} {t_legacy * 1e3:>10.2f} {count_constraints(legacy_parse(brief)):>7} "
+            f"{t_new * 1e3:>15.2f} {count_constraints(extract_requirements(brief)):>7} "
+            f"{t_new / len(brief) * 1e9:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/cassette_check.py
+"""
+录制 / 回放一致性检查：以 record 模式在一个新进程中对一组任务书运行流水线（LLM 由本地模拟服务替代），
+再以 replay 模式在另一个新进程中重跑，逐条比较两次的结果；回放未命中录制（CassetteMiss）或结果不一致即失败。
+
+两个阶段使用同一个临时运行记录库，回放进程启动时会从中预热示例索引等进程级状态，
+覆盖“录制时没有、回放时才有”的 prompt 差异。
+
+用法（项目根目录）：
+    python -m benchmarks.cassette_check
+    python -m benchmarks.cassette_check --briefs briefs.txt    # 每行一个任务书
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.fake_llm import FakeLLMConfig, FakeLLMServer
+
+# 相似的任务书：后一条在录制时能检索到前一条作为示例
+DEFAULT_BRIEFS = [
+    "A two-bedroom apartment: Entry connects to LivingRoom, Kitchen connects to DiningRoom on the south side.",
+    "A two-bedroom flat: Entry connects to LivingRoom, Kitchen connects to DiningRoom on the north side.",
+]
+COMPARED_FIELDS = ("generation_path", "llm_raw_output", "parsed_design", "validation_passed", "validation_result")
+
+
+def run_stage(briefs: list, output: str) -> None:
+    """子进程：按环境变量中的 cassette 模式依次运行任务书，结果写入 output"""
+    from main import run_design_pipeline
+
+    results = []
+    for brief in briefs:
+        result = run_design_pipeline(brief)
+        results.append({field: result.get(field) for field in COMPARED_FIELDS})
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False)
+
+
+def _spawn(stage: str, briefs_file: Path, output: Path, env: dict) -> None:
+    cmd = [sys.executable, "-m", "benchmarks.cassette_check", "--stage", stage,
+           "--briefs", str(briefs_file), "--output", str(output)]
+    subprocess.run(cmd, env={**os.environ, **env}, check=True)
+
+
+def check(briefs: list) -> list:
+    """
+    录制后回放，返回不一致的条目 [{"index", "field", "record", "replay"}]（为空表示一致）
+    回放中的 CassetteMiss 等异常由流水线记入 validation_result，同样表现为不一致
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        briefs_file = tmp / "briefs.txt"
+        briefs_file.write_text("\n".join(briefs), encoding="utf-8")
+        env = {
+            "LLM_CASSETTE_PATH": str(tmp / "cassette.jsonl"),
+            "RUN_STORE_PATH": str(tmp / "runs.sqlite"),
+            "DASHSCOPE_API_KEY": os.getenv("DASHSCOPE_API_KEY", "sk-fake-cassette-check"),
+        }
+
+        # 1. 录制：请求发往模拟 LLM
+        fake = FakeLLMServer(FakeLLMConfig(latency=0.0, jitter=0.0, seed=0)).start()
+        try:
+            _spawn("record", briefs_file, tmp / "record.json",
+                   {**env, "LLM_CASSETTE_MODE": "record", "LLM_API_URL": fake.url})
+        finally:
+            fake.stop()
+
+        # 2. 回放：新进程，不再访问任何 LLM 服务
+        _spawn("replay", briefs_file, tmp / "replay.json", {**env, "LLM_CASSETTE_MODE": "replay"})
+
+        recorded = json.loads((tmp / "record.json").read_text(encoding="utf-8"))
+        replayed = json.loads((tmp / "replay.json").read_text(encoding="utf-8"))
+
+    mismatches = []
+    for i, (a, b) in enumerate(zip(recorded, replayed)):
+        for field in COMPARED_FIELDS:
+            if a[field] != b[field]:
+                mismatches.append({"index": i, "field": field, "record": a[field], "replay": b[field]})
+    return mismatches
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="LLM 录制 / 回放一致性检查（模拟 LLM）")
+    arg_parser.add_argument("--briefs", help="任务书文件，每行一个（默认使用内置的相似任务书）")
+    arg_parser.add_argument("--stage", choices=("record", "replay"), help=argparse.SUPPRESS)
+    arg_parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    briefs = DEFAULT_BRIEFS
+    if args.briefs:
+        with open(args.briefs, "r", encoding="utf-8") as f:
+            briefs = [line.strip() for line in f if line.strip()]
+
+    if args.stage:
+        run_stage(briefs, args.output)
+        return
+
+    mismatches = check(briefs)
+    if mismatches:
+        for m in mismatches:
+            print(f"❌ 第 {m['index'] + 1} 条任务书的 {m['field']} 不一致：\n"
+                  f"   record: {str(m['record'])[:200]}\n   replay: {str(m['replay'])[:200]}")
+        sys.exit(1)
+    print(f"✅ {len(briefs)} 条任务书录制与回放结果一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# benchmarks/fake_llm.py
+"""
+本地模拟的 DashScope（OpenAI 兼容）chat/completions 服务，用于离线压测与回归。
+可配置延迟分布与失败模式：
+- error_rate:    返回 HTTP 500
+- throttle_rate: 返回 HTTP 429（模拟限流）
+- hang_rate:     挂起 hang_s 秒后再返回（模拟读超时）
+- truncate_rate: 返回被截断的 JSON，finish_reason = "length"
+- rpm_limit:     配额限流：最近 quota_window 秒内的请求数超过 rpm_limit * quota_window / 60 时返回 429（带 Retry-After）
+另外按请求的 max_tokens（约 4 字符 / token）截断输出，并支持续写请求（返回 assistant 前缀之后的剩余部分）。
+
+用法：
+    python -m benchmarks.fake_llm --port 9100 --latency 1.5 --jitter 0.5 --error-rate 0.02
+    LLM_API_URL=http://127.0.0.1:9100/v1/chat/completions uvicorn api:app --port 8002
+"""
+import argparse
+import collections
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic import generate_design
+
+
+class FakeLLMConfig:
+    def __init__(self, latency=1.0, jitter=0.2, error_rate=0.0, throttle_rate=0.0,
+                 hang_rate=0.0, hang_s=60.0, truncate_rate=0.0, n_rooms=10, seed=None,
+                 rpm_limit=None, quota_window=60.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.hang_rate = hang_rate
+        self.hang_s = hang_s
+        self.truncate_rate = truncate_rate
+        self.n_rooms = n_rooms
+        self.seed = seed
+        self.rpm_limit = rpm_limit
+        self.quota_window = quota_window
+
+
+class FakeLLMServer:
+    """在后台线程中运行的模拟 LLM 服务，记录每个请求的服务耗时"""
+
+    def __init__(self, config: FakeLLMConfig = None, host="127.0.0.1", port=0):
+        self.config = config or FakeLLMConfig()
+        self.rnd = random.Random(self.config.seed)
+        self.content = json.dumps(generate_design(self.config.n_rooms), ensure_ascii=False)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "throttled": 0, "hung": 0, "truncated": 0}
+        self.service_times = []
+        self.arrivals = collections.deque()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def _over_quota(self) -> bool:
+        """滑动窗口配额：窗口内请求数超限时拒绝（被拒绝的请求不计入）"""
+        cfg = self.config
+        if not cfg.rpm_limit:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            while self.arrivals and now - self.arrivals[0] > cfg.quota_window:
+                self.arrivals.popleft()
+            if len(self.arrivals) >= cfg.rpm_limit * cfg.quota_window / 60.0:
+                return True
+            self.arrivals.append(now)
+            return False
+
+    def _pick_outcome(self) -> tuple:
+        cfg = self.config
+        if self._over_quota():
+            return "quota", 0.0
+        with self.lock:
+            x = self.rnd.random()
+            delay = max(0.0, self.rnd.gauss(cfg.latency, cfg.jitter))
+        for outcome, rate in (("error", cfg.error_rate), ("throttle", cfg.throttle_rate),
+                              ("hang", cfg.hang_rate), ("truncate", cfg.truncate_rate)):
+            if x < rate:
+                return outcome, delay
+            x -= rate
+        return "ok", delay
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body, retry_after=None):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if retry_after is not None:
+                    self.send_header("Retry-After", f"{retry_after:g}")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                start = time.perf_counter()
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                outcome, delay = server._pick_outcome()
+                with server.lock:
+                    server.stats["requests"] += 1
+
+                if outcome == "hang":
+                    with server.lock:
+                        server.stats["hung"] += 1
+                    time.sleep(server.config.hang_s)
+                else:
+                    time.sleep(delay)
+
+                if outcome == "error":
+                    with server.lock:
+                        server.stats["errors"] += 1
+                    self._reply(500, {"error": {"code": "InternalError", "message": "fake failure"}})
+                elif outcome in ("throttle", "quota"):
+                    with server.lock:
+                        server.stats["throttled"] += 1
+                    retry_after = server.config.quota_window if outcome == "quota" else None
+                    self._reply(429, {"error": {"code": "Throttling", "message": "rate limited"}}, retry_after)
+                else:
+                    content, finish_reason = server.content, "stop"
+                    # 续写请求：最后一条 assistant 消息是已生成的前缀，只返回剩余部分
+                    prefix = next(
+                        (m.get("content", "") for m in reversed(payload.get("messages", []))
+                         if m.get("role") == "assistant"),
+                        "",
+                    )
+                    if prefix and content.startswith(prefix):
+                        content = content[len(prefix):]
+                    # 按 max_tokens 截断（约 4 字符 / token）
+                    max_tokens = payload.get("max_tokens")
+                    if max_tokens and len(content) > max_tokens * 4:
+                        with server.lock:
+                            server.stats["truncated"] += 1
+                        content, finish_reason = content[: max_tokens * 4], "length"
+                    elif outcome == "truncate":
+                        with server.lock:
+                            server.stats["truncated"] += 1
+                        content, finish_reason = content[: len(content) // 2], "length"
+                    prompt_chars = sum(len(m.get("content", "")) for m in payload.get("messages", []))
+                    self._reply(200, {
+                        "id": "fake-completion",
+                        "model": payload.get("model", "fake"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": finish_reason,
+                        }],
+                        "usage": {
+                            "prompt_tokens": prompt_chars // 4,
+                            "completion_tokens": len(content) // 4,
+                            "total_tokens": (prompt_chars + len(content)) // 4,
+                        },
+                    })
+                with server.lock:
+                    server.service_times.append(time.perf_counter() - start)
+
+        return Handler
+
+    def start(self) -> "FakeLLMServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def add_fake_llm_args(arg_parser: argparse.ArgumentParser):
+    """模拟 LLM 的命令行参数（load_test 复用）"""
+    arg_parser.add_argument("--latency", type=float, default=1.0, help="平均响应延迟（秒）")
+    arg_parser.add_argument("--jitter", type=float, default=0.2, help="延迟标准差（秒）")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0)
+    arg_parser.add_argument("--throttle-rate", type=float, default=0.0)
+    arg_parser.add_argument("--hang-rate", type=float, default=0.0)
+    arg_parser.add_argument("--hang-s", type=float, default=60.0)
+    arg_parser.add_argument("--truncate-rate", type=float, default=0.0)
+    arg_parser.add_argument("--rooms", type=int, default=10, help="返回 design 的房间数")
+    arg_parser.add_argument("--seed", type=int, default=None)
+    arg_parser.add_argument("--rpm-limit", type=float, default=None, help="模拟供应商 RPM 配额（超出返回 429）")
+    arg_parser.add_argument("--quota-window", type=float, default=60.0, help="配额滑动窗口（秒）")
+
+
+def fake_llm_config_from_args(args) -> FakeLLMConfig:
+    return FakeLLMConfig(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, hang_rate=args.hang_rate, hang_s=args.hang_s,
+        truncate_rate=args.truncate_rate, n_rooms=args.rooms, seed=args.seed,
+        rpm_limit=args.rpm_limit, quota_window=args.quota_window,
+    )
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="本地模拟 DashScope chat/completions 服务")
+    arg_parser.add_argument("--port", type=int, default=9100)
+    add_fake_llm_args(arg_parser)
+    args = arg_parser.parse_args()
+
+    fake = FakeLLMServer(fake_llm_config_from_args(args), port=args.port).start()
+    print(f"✅ 模拟 LLM 服务已启动：{fake.url}")
+    try:
+        fake.thread.join()
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,247 @@
+# benchmarks/load_test.py
+"""
+/generate 接口的端到端压测：DashScope 接口由本地模拟服务（benchmarks.fake_llm）替代，
+按开环泊松到达（open-loop，请求到达不等待前一个完成）逐级施加 QPS，
+统计每一级的 p50/p95/p99 延迟、吞吐、错误率与排队情况，并写出 JSON 报告。
+
+两种模式：
+- 进程内（默认）：启动模拟 LLM，再在后台线程中用 uvicorn 启动 api.app
+- 外部端口（--target）：压测已在本机运行的服务，该服务需以
+  LLM_API_URL=<模拟服务地址> 启动（可用 --fake-port 固定模拟服务端口）
+
+每个请求发送相同的任务书：进程内模式默认关闭结果缓存与示例检索（--cache 开启），
+否则首个请求之后全部命中缓存，测到的只是内存查表；每一级报告命中缓存的响应数（cached）。
+
+用法（项目根目录）：
+    python -m benchmarks.load_test --rates 1 2 5 10 --duration 20 --latency 1.5
+    python -m benchmarks.load_test --error-rate 0.05 --throttle-rate 0.05 --report load_report.json
+    python -m benchmarks.load_test --target http://127.0.0.1:8002 --fake-port 9100
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List
+
+import requests
+
+from benchmarks.fake_llm import FakeLLMServer, add_fake_llm_args, fake_llm_config_from_args
+
+DEFAULT_RATES = [1, 2, 5, 10]
+DEFAULT_USER_INPUT = (
+    "A two-bedroom apartment: Entry connects to LivingRoom, "
+    "Kitchen connects to DiningRoom on the south side."
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app_in_process(fake_url: str, cache: bool = False):
+    """
+    在后台线程中启动 api.app（需在导入 api 之前设置 LLM_API_URL）
+    :param cache: 是否保留配置中的结果缓存与示例检索；关闭时每个请求都经过 LLM
+    """
+    import uvicorn
+
+    os.environ["LLM_API_URL"] = fake_url
+    os.environ.setdefault("DASHSCOPE_API_KEY", "sk-fake-load-test")
+    from api import app
+    if not cache:
+        from llm.retrieval import set_exemplar_index
+        from utils.result_cache import set_result_cache
+        set_result_cache(None)
+        set_exemplar_index(None)
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("api 服务启动失败")
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def percentile(values: List[float], p: float) -> float:
+    """最近秩百分位（values 需已排序）"""
+    if not values:
+        return 0.0
+    k = max(0, math.ceil(p / 100 * len(values)) - 1)
+    return values[k]
+
+
+def run_step(target: str, rate: float, duration: float, timeout: float,
+             max_inflight: int, user_input: str, seed: int) -> dict:
+    """
+    以 rate（次/秒）的泊松到达施加 duration 秒负载：
+    到达时刻预先生成，调度线程按时刻提交，不等待已发请求完成
+    """
+    rnd = random.Random(seed)
+    arrivals, t = [], rnd.expovariate(rate)
+    while t < duration:
+        arrivals.append(t)
+        t += rnd.expovariate(rate)
+
+    records = []
+    lock = threading.Lock()
+    inflight = {"now": 0, "max": 0}
+
+    def fire(scheduled: float, t0: float):
+        sent = time.perf_counter()
+        with lock:
+            inflight["now"] += 1
+            inflight["max"] = max(inflight["max"], inflight["now"])
+        status, error, passed, path = None, None, None, None
+        try:
+            resp = requests.post(f"{target}/generate", json={"user_input": user_input}, timeout=timeout)
+            status = resp.status_code
+            if status == 200:
+                body = resp.json()
+                passed = bool(body.get("validation_passed"))
+                path = body.get("generation_path")
+        except requests.RequestException as e:
+            error = type(e).__name__
+        end = time.perf_counter()
+        with lock:
+            inflight["now"] -= 1
+            records.append({
+                "scheduled": scheduled,
+                "client_lag": sent - t0 - scheduled,  # 客户端侧排队（发送线程不足时增大）
+                "latency": end - sent,
+                "status": status,
+                "error": error,
+                "validation_passed": passed,
+                "generation_path": path,
+            })
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+        for scheduled in arrivals:
+            delay = start + scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, scheduled, start)
+    wall = time.perf_counter() - start
+
+    ok = [r for r in records if r["status"] == 200]
+    latencies = sorted(r["latency"] for r in ok)
+    lags = sorted(r["client_lag"] for r in records)
+    status_counts = {}
+    for r in records:
+        key = str(r["status"]) if r["status"] is not None else r["error"]
+        status_counts[key] = status_counts.get(key, 0) + 1
+
+    return {
+        "rate": rate,
+        "duration_s": duration,
+        "wall_s": round(wall, 3),
+        "sent": len(records),
+        "ok": len(ok),
+        "validation_passed": sum(1 for r in ok if r["validation_passed"]),
+        "cached": sum(1 for r in ok if r["generation_path"] == "cached"),
+        "error_rate": round(1 - len(ok) / len(records), 4) if records else 0.0,
+        "throughput_rps": round(len(ok) / wall, 3) if wall > 0 else 0.0,
+        "latency_s": {
+            "p50": round(percentile(latencies, 50), 4),
+            "p95": round(percentile(latencies, 95), 4),
+            "p99": round(percentile(latencies, 99), 4),
+            "max": round(latencies[-1], 4) if latencies else 0.0,
+        },
+        "client_lag_p99_s": round(percentile(lags, 99), 4),
+        "max_inflight": inflight["max"],
+        "status_counts": status_counts,
+    }
+
+
+def summarize_queueing(step: dict, llm_service_p50: float) -> dict:
+    """服务端排队估计：成功请求延迟减去模拟 LLM 自身耗时的中位数"""
+    lat = step["latency_s"]
+    return {
+        "llm_service_p50_s": round(llm_service_p50, 4),
+        "server_overhead_p50_s": round(max(0.0, lat["p50"] - llm_service_p50), 4),
+        "server_overhead_p99_s": round(max(0.0, lat["p99"] - llm_service_p50), 4),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="/generate 端到端压测（模拟 LLM）")
+    arg_parser.add_argument("--rates", type=float, nargs="+", default=DEFAULT_RATES, help="逐级到达率（次/秒）")
+    arg_parser.add_argument("--duration", type=float, default=20.0, help="每一级持续秒数")
+    arg_parser.add_argument("--timeout", type=float, default=120.0, help="客户端请求超时（秒）")
+    arg_parser.add_argument("--max-inflight", type=int, default=512, help="客户端最大并发连接数")
+    arg_parser.add_argument("--target", help="压测已运行的服务（如 http://127.0.0.1:8002），不指定则进程内启动")
+    arg_parser.add_argument("--fake-port", type=int, default=0, help="模拟 LLM 服务端口（0 表示随机）")
+    arg_parser.add_argument("--user-input", default=DEFAULT_USER_INPUT)
+    arg_parser.add_argument("--cache", action="store_true",
+                            help="进程内模式保留结果缓存与示例检索（默认关闭，相同任务书每次都经过 LLM）")
+    arg_parser.add_argument("--report", default="load_report.json", help="报告输出路径")
+    add_fake_llm_args(arg_parser)
+    args = arg_parser.parse_args()
+
+    # 1. 启动模拟 LLM 与被测服务
+    fake = FakeLLMServer(fake_llm_config_from_args(args), port=args.fake_port).start()
+    print(f"模拟 LLM：{fake.url}")
+    server = None
+    if args.target:
+        target = args.target.rstrip("/")
+    else:
+        server, target = start_app_in_process(fake.url, cache=args.cache)
+    print(f"被测服务：{target}")
+
+    # 2. 逐级施压
+    steps = []
+    try:
+        for i, rate in enumerate(args.rates):
+            served_before = len(fake.service_times)
+            step = run_step(target, rate, args.duration, args.timeout, args.max_inflight,
+                            args.user_input, seed=(args.seed or 0) + i)
+            service = sorted(fake.service_times[served_before:])
+            step["queueing"] = summarize_queueing(step, percentile(service, 50))
+            steps.append(step)
+            lat = step["latency_s"]
+            print(
+                f"  rate {rate:>6.1f}/s  sent {step['sent']:>5}  ok {step['ok']:>5}  "
+                f"tput {step['throughput_rps']:>7.2f}/s  err {step['error_rate']:>6.1%}  "
+                f"p50 {lat['p50']:.3f}s  p95 {lat['p95']:.3f}s  p99 {lat['p99']:.3f}s  "
+                f"inflight≤{step['max_inflight']}  cached {step['cached']}",
+                flush=True,
+            )
+    finally:
+        if server is not None:
+            server.should_exit = True
+        fake.stop()
+
+    # 3. 写出报告
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "target": target,
+            "in_process": server is not None,
+            "cache": args.cache if server is not None else None,
+            "fake_llm": vars(fake.config),
+        },
+        "fake_llm_stats": fake.stats,
+        "steps": steps,
+    }
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ 报告已保存：{args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# benchmarks/run_benchmarks.py
+"""
+可复现的微基准：对 design_ir 与 constraint_checker 的关键函数按房间规模计时，
+记录耗时与峰值内存，可保存基线并与已存基线比较、标记性能回退。
+
+用法（项目根目录）：
+    python -m benchmarks.run_benchmarks                              # 默认规模 10 ~ 100000
+    python -m benchmarks.run_benchmarks --sizes 10 1000 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/baseline.json --threshold 0.25
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from benchmarks.synthetic import generate_design, generate_design_text
+from constraint_checker import build_validation_context, validate_design
+from constraint_checker.rule_engine import get_default_rule_plan
+from design_ir.parser import (
+    fix_incomplete_json,
+    clean_and_validate_json,
+    build_graph_from_json,
+    graph_to_json_dict,
+)
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+
+def _quiet(fn: Callable) -> Callable:
+    """屏蔽被测函数的 stdout 输出，避免终端 IO 干扰计时"""
+    def wrapper():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return wrapper
+
+
+def measure(fn: Callable, min_time: float = 0.2, max_repeat: int = 50) -> dict:
+    """多次运行取最小耗时；另单独运行一次统计峰值内存"""
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_repeat and (not times or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"time_s": min(times), "peak_kb": round(peak / 1024, 1), "repeat": len(times)}
+
+
+def build_cases(n_rooms: int) -> Dict[str, Callable]:
+    """为某一规模构造全部被测用例（输入在计时外准备好）"""
+    valid = generate_design(n_rooms, valid=True)
+    invalid = generate_design(n_rooms, valid=False, violation="function")
+    text = json.dumps(valid, ensure_ascii=False, indent=2)
+    truncated = generate_design_text(n_rooms, truncate=0.05)
+    with contextlib.redirect_stdout(io.StringIO()):
+        graph = build_graph_from_json(valid)
+    ctx = build_validation_context(valid)
+
+    cases = {
+        "fix_incomplete_json": lambda: fix_incomplete_json(truncated),
+        "clean_and_validate_json": lambda: clean_and_validate_json(text),
+        "build_graph_from_json": _quiet(lambda: build_graph_from_json(valid)),
+        "graph_to_json_dict": _quiet(lambda: graph_to_json_dict(graph)),
+        "build_validation_context": lambda: build_validation_context(valid),
+    }
+    for rule_id, check in get_default_rule_plan().steps:
+        cases[f"rule:{rule_id}"] = lambda check=check: check(ctx)
+    cases["validate_design[valid]"] = lambda: validate_design(valid)
+    cases["validate_design[invalid]"] = lambda: validate_design(invalid)
+    return cases
+
+
+def predict_time(history: List[tuple], n: int) -> float:
+    """
+    根据已测规模 [(规模, 耗时), ...] 外推规模 n 的耗时：
+    用最近两个点估计增长阶数（至少按线性），超线性函数因此不会被低估
+    """
+    if not history:
+        return 0.0
+    n2, t2 = history[-1]
+    exponent = 1.0
+    if len(history) >= 2:
+        n1, t1 = history[-2]
+        if t1 > 0 and n2 > n1:
+            exponent = max(1.0, math.log(t2 / t1) / math.log(n2 / n1))
+    return t2 * (n / n2) ** exponent
+
+
+def run(sizes: List[int], budget: float) -> dict:
+    """
+    运行全部用例；按增长阶数外推，预计超过 budget 秒的用例在该规模及更大规模上跳过
+    """
+    results: Dict[str, Dict[str, dict]] = {}
+    history: Dict[str, List[tuple]] = {}  # 用例 -> [(规模, 耗时), ...]
+    skipped = set()
+    for n in sizes:
+        print(f"\n== {n} rooms ==", flush=True)
+        for name, fn in build_cases(n).items():
+            if name in skipped:
+                results.setdefault(name, {})[str(n)] = {"skipped": True}
+                print(f"  {name:<40} skipped（更小规模已超出时间预算）", flush=True)
+                continue
+            predicted = predict_time(history.get(name, []), n)
+            if predicted > budget:
+                skipped.add(name)
+                results.setdefault(name, {})[str(n)] = {"skipped": True}
+                print(f"  {name:<40} skipped（预计 {predicted:.1f}s 超出时间预算）", flush=True)
+                continue
+            r = measure(fn)
+            results.setdefault(name, {})[str(n)] = r
+            history.setdefault(name, []).append((n, r["time_s"]))
+            print(f"  {name:<40} {r['time_s'] * 1e3:12.3f} ms  peak {r['peak_kb']:10.1f} KB", flush=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """返回相对基线变慢超过 threshold 的用例列表"""
+    regressions = []
+    for name, by_size in results.items():
+        for size, r in by_size.items():
+            base = baseline.get("results", {}).get(name, {}).get(size)
+            if not base or r.get("skipped") or base.get("skipped"):
+                continue
+            ratio = r["time_s"] / base["time_s"] if base["time_s"] > 0 else 1.0
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"{name} @ {size} rooms: {base['time_s'] * 1e3:.3f} ms → "
+                    f"{r['time_s'] * 1e3:.3f} ms（{ratio:.2f}x）"
+                )
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="design_ir / constraint_checker 微基准")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="房间规模")
+    arg_parser.add_argument("--budget", type=float, default=10.0, help="预计单次运行超过该秒数的用例跳过")
+    arg_parser.add_argument("--save-baseline", help="将结果保存为基线 JSON")
+    arg_parser.add_argument("--compare", help="与已保存的基线 JSON 比较")
+    arg_parser.add_argument("--threshold", type=float, default=0.25, help="判定回退的相对变慢比例")
+    args = arg_parser.parse_args()
+
+    results = run(args.sizes, args.budget)
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+        },
+        "results": results,
+    }
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ 基线已保存：{args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ 发现 {len(regressions)} 项性能回退（阈值 {args.threshold:.0%}）：")
+            for line in regressions:
+                print(f"   {line}")
+            raise SystemExit(1)
+        print(f"\n✅ 未发现超过 {args.threshold:.0%} 的性能回退")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/synthetic.py
+"""
+可扩展的合成 design 生成器（rooms / adjacent_to 格式），用于基准测试。
+
+按“户”（unit）复制一个约 10 个房间的典型住宅模板，房间编号全局递增，
+可从 examples 的 10 房间规模扩展到 10 万房间。
+- valid=True：满足所有单间面积与功能规则；总面积规则只在单户规模（约 90㎡）下满足
+- valid=False：注入一种指定违规（area / function / adjacency / total）
+"""
+import json
+import random
+from typing import Optional
+
+# 单户模板：(房间类型, 面积范围, [(邻接的模板下标, 连接方式, 对方相对本房间的方位)])
+# 顺序保证截断到任意长度时，已生成房间的依赖（Entry→LivingRoom 等）都已存在
+_UNIT_TEMPLATE = [
+    ("LivingRoom", (14, 20), []),
+    ("DiningRoom", (7, 10), [(0, "by connected space", "west")]),
+    ("Kitchen", (5, 8), [(1, "by connected space", "south")]),
+    ("Entry", (2, 4), [(0, "by connected space", "north")]),
+    ("BedRoom", (10, 14), [(0, "by door", "north")]),
+    ("BedRoom", (9, 12), [(0, "by door", "north")]),
+    ("BedRoom", (9, 12), [(0, "by door", "east")]),
+    ("BathRoom", (3.5, 6), [(4, "by door", "west")]),
+    ("BathRoom", (3, 5), [(0, "by door", "south")]),
+    ("Storage", (1.5, 3), [(2, "by door", "west")]),
+]
+UNIT_SIZE = len(_UNIT_TEMPLATE)
+
+_REVERSE = {"north": "south", "south": "north", "east": "west", "west": "east"}
+VIOLATIONS = ("area", "function", "adjacency", "total")
+
+
+def generate_design(
+    n_rooms: int,
+    valid: bool = True,
+    violation: Optional[str] = None,
+    seed: int = 0
+) -> dict:
+    """
+    生成包含 n_rooms 个房间的 design
+    :param valid: False 时注入 violation 指定的违规（默认 function）
+    :param violation: area / function / adjacency / total
+    """
+    rnd = random.Random(seed)
+    counters = {}
+    rooms = []
+    unit_names = []
+
+    for i in range(n_rooms):
+        unit_idx, slot = divmod(i, UNIT_SIZE)
+        if slot == 0:
+            unit_names = []
+        room_type, (mn, mx), links = _UNIT_TEMPLATE[slot]
+        counters[room_type] = counters.get(room_type, 0) + 1
+        name = f"{room_type}_{counters[room_type]}"
+        unit_names.append(name)
+        room = {"type": name, "area": round(rnd.uniform(mn, mx), 1), "adjacent_to": {}}
+        rooms.append(room)
+
+        # 双向写入邻接描述
+        for target_slot, connection, direction in links:
+            target = rooms[unit_idx * UNIT_SIZE + target_slot]
+            room["adjacent_to"][target["type"]] = f"{connection} in the {direction}"
+            target["adjacent_to"][name] = f"{connection} in the {_REVERSE[direction]}"
+
+    design = {"rooms": rooms}
+    if not valid:
+        inject_violation(design, violation or "function", rnd)
+    return design
+
+
+def inject_violation(design: dict, violation: str, rnd: random.Random) -> None:
+    """在 design 中注入一种违规（就地修改）"""
+    rooms = design["rooms"]
+    if violation == "area":
+        rnd.choice(rooms)["area"] = 999
+    elif violation == "function":
+        # BedRoom 连接 Storage（或 Kitchen），违反 BedRoom 邻居规则
+        bedrooms = [r for r in rooms if r["type"].startswith("BedRoom")]
+        others = [r for r in rooms if r["type"].startswith(("Storage", "Kitchen"))]
+        if bedrooms and others:
+            bedroom, other = rnd.choice(bedrooms), rnd.choice(others)
+            bedroom["adjacent_to"][other["type"]] = "by door in the east"
+            other["adjacent_to"][bedroom["type"]] = "by door in the west"
+        else:
+            rooms[0]["area"] = 999
+    elif violation == "adjacency":
+        # 删除所有 Kitchen ↔ DiningRoom 邻接
+        for room in rooms:
+            room["adjacent_to"] = {
+                k: v for k, v in room["adjacent_to"].items()
+                if not (
+                    {room["type"].split("_")[0], k.split("_")[0]} == {"Kitchen", "DiningRoom"}
+                )
+            }
+    elif violation == "total":
+        for room in rooms:
+            if room["type"].startswith("LivingRoom"):
+                room["area"] = 22
+        rooms.append({"type": f"Garden_{len(rooms)}", "area": 30, "adjacent_to": {}})
+        rooms.append({"type": f"Garage_{len(rooms)}", "area": 20, "adjacent_to": {}})
+    else:
+        raise ValueError(f"未知违规类型：{violation}（可选：{VIOLATIONS}）")
+
+
+def generate_design_text(n_rooms: int, truncate: float = 0.0, seed: int = 0) -> str:
+    """
+    生成 LLM 风格的 JSON 文本；truncate > 0 时截掉末尾该比例的字符，
+    模拟 max_tokens 截断，用于测试 fix_incomplete_json
+    """
+    text = json.dumps(generate_design(n_rooms, seed=seed), ensure_ascii=False, indent=2)
+    if truncate > 0:
+        text = text[: int(len(text) * (1 - truncate))]
+    return text
@@ -4,7 +4,14 @@ constraint_checker 模块：空间设计方案的约束校验核心模块，
 提供整体校验入口和各类规则校验函数。
 """
 # 1. 导入核心校验调度器（validator.py的核心函数/类）
-from .validator import validate_design  
+from .validator import validate_design, validate_design_report
+from .context import ValidationContext, build_validation_context
+from .rule_engine import RulePlan, compile_rule_set, load_rule_plan
+from .requirements_index import RequirementsIndex, compile_requirements
+from .feasibility import check_feasibility, is_feasible
+from .batch import pack_designs, validate_batch
+from .scoring import DesignScores, score_designs, score_graph, top_k_designs
+from .stream_check import validate_stream, stream_validate_file
 from .run_check import run_example, batch_run_check
 
 # 2. 导入rules模块的核心函数（可选，方便外部直接调用）
@@ -19,6 +26,30 @@ from .rules import (
 __all__ = [
     # 核心调度接口（外部优先用这个）
     "validate_design",
+    "validate_design_report",
+    "ValidationContext",
+    "build_validation_context",
+    # 声明式规则引擎（按请求替换规则集）
+    "RulePlan",
+    "compile_rule_set",
+    "load_rule_plan",
+    # 用户约束编译索引
+    "RequirementsIndex",
+    "compile_requirements",
+    # 生成前可行性分析
+    "check_feasibility",
+    "is_feasible",
+    # 列式批量校验（NumPy）
+    "pack_designs",
+    "validate_batch",
+    # 软偏好评分与 top-k 选优
+    "DesignScores",
+    "score_designs",
+    "score_graph",
+    "top_k_designs",
+    # JSONL 语料流式校验
+    "validate_stream",
+    "stream_validate_file",
     # 常用规则函数（方便单独调用）
     "validate_room_area",
     "validate_total_area",
@@ -0,0 +1,245 @@
+# constraint_checker/batch.py
+"""
+列式批量校验：把大量 design 打包为 NumPy 列式数组（房间类型编码、面积、
+每个 design 的偏移量、邻接边表），按规则计划对整批数据做向量化判定。
+结果与逐个调用 validate_design(design)（无 requirements）完全一致。
+"""
+from typing import Dict, List
+
+import numpy as np
+
+from .rule_engine import get_default_rule_plan
+
+
+class DesignBatch:
+    """
+    列式存储的一批 design：
+    - room_*:  rooms 列表中的每个条目（面积规则按条目计算）
+    - node_*:  每个 design 内出现过的房间名（含只出现在 adjacent_to 中的名字）
+    - edge_*:  无向邻接边（端点为 node 下标，自环已剔除）
+    - room_offsets: 第 i 个 design 的房间条目为 room_offsets[i]:room_offsets[i+1]
+    """
+
+    def __init__(self, n_designs, vocab, room_design, room_func, room_area, room_node,
+                 room_offsets, node_func, node_is_room, edge_u, edge_v, edge_design):
+        self.n_designs = n_designs
+        self.vocab = vocab
+        self.room_design = room_design
+        self.room_func = room_func
+        self.room_area = room_area
+        self.room_node = room_node
+        self.room_offsets = room_offsets
+        self.node_func = node_func
+        self.node_is_room = node_is_room
+        self.edge_u = edge_u
+        self.edge_v = edge_v
+        self.edge_design = edge_design
+
+    def code(self, func: str) -> int:
+        """功能类型 -> 编码（批内未出现的类型返回 -1）"""
+        return self.vocab.get(func, -1)
+
+    def type_mask(self, funcs) -> np.ndarray:
+        """按编码索引的布尔表：编码对应的类型是否属于 funcs"""
+        mask = np.zeros(len(self.vocab), dtype=bool)
+        for f in funcs:
+            if f in self.vocab:
+                mask[self.vocab[f]] = True
+        return mask
+
+
+def pack_designs(designs) -> DesignBatch:
+    """
+    将 design 列表打包为列式数组
+    :raises ValueError: 房间缺少 area 或 area 不是数值（validate_design 对此同样会报错）
+    """
+    vocab: Dict[str, int] = {}
+    name_codes: Dict[str, int] = {}  # 房间名 -> 类型编码，整批只 split 一次
+    room_design, room_func, room_area, room_node = [], [], [], []
+    room_offsets = [0]
+    node_func, node_is_room = [], []
+    edge_u, edge_v, edge_design = [], [], []
+
+    def func_code(name):
+        code = name_codes.get(name)
+        if code is None:
+            func = name.split("_")[0]
+            code = vocab.get(func)
+            if code is None:
+                code = vocab[func] = len(vocab)
+            name_codes[name] = code
+        return code
+
+    for d_idx, design in enumerate(designs):
+        nodes: Dict[str, int] = {}
+        rooms = design["rooms"]
+
+        for room in rooms:
+            name = room["type"]
+            n = nodes.get(name)
+            if n is None:
+                n = nodes[name] = len(node_func)
+                node_func.append(func_code(name))
+                node_is_room.append(True)
+            area = room.get("area")
+            if not isinstance(area, (int, float)):
+                raise ValueError(f"第 {d_idx} 个 design 的房间 {name} 面积无效：{area!r}")
+            room_design.append(d_idx)
+            room_func.append(node_func[n])
+            room_area.append(area)
+            room_node.append(n)
+
+        for room in rooms:
+            u = nodes[room["type"]]
+            for target in room.get("adjacent_to", {}):
+                v = nodes.get(target)
+                if v is None:
+                    # 只出现在 adjacent_to 中的名字：非房间节点
+                    v = nodes[target] = len(node_func)
+                    node_func.append(func_code(target))
+                    node_is_room.append(False)
+                if u != v:
+                    edge_u.append(u)
+                    edge_v.append(v)
+                    edge_design.append(d_idx)
+
+        room_offsets.append(len(room_design))
+
+    return DesignBatch(
+        n_designs=len(room_offsets) - 1,
+        vocab=vocab,
+        room_design=np.asarray(room_design, dtype=np.int64),
+        room_func=np.asarray(room_func, dtype=np.int32),
+        room_area=np.asarray(room_area, dtype=np.float64),
+        room_node=np.asarray(room_node, dtype=np.int64),
+        room_offsets=np.asarray(room_offsets, dtype=np.int64),
+        node_func=np.asarray(node_func, dtype=np.int32),
+        node_is_room=np.asarray(node_is_room, dtype=bool),
+        edge_u=np.asarray(edge_u, dtype=np.int64),
+        edge_v=np.asarray(edge_v, dtype=np.int64),
+        edge_design=np.asarray(edge_design, dtype=np.int64),
+    )
+
+
+# -------------------- 各规则类型的向量化实现 --------------------
+# 每个函数返回 shape=(n_designs,) 的布尔数组：该 design 是否违反此规则
+
+def _any_per_design(batch: DesignBatch, design_idx: np.ndarray) -> np.ndarray:
+    return np.bincount(design_idx, minlength=batch.n_designs) > 0
+
+
+def _room_of_type(batch: DesignBatch, func: str) -> np.ndarray:
+    """node 级布尔数组：是否为 rooms 列表中 func 类型的房间"""
+    return batch.node_is_room & (batch.node_func == batch.code(func))
+
+
+def _vec_require_neighbor_type(batch: DesignBatch, spec: dict) -> np.ndarray:
+    target = _room_of_type(batch, spec["neighbor"])
+    has = np.zeros(len(batch.node_func), dtype=bool)
+    has[batch.edge_u[target[batch.edge_v]]] = True
+    has[batch.edge_v[target[batch.edge_u]]] = True
+    bad = (batch.room_func == batch.code(spec["room"])) & ~has[batch.room_node]
+    return _any_per_design(batch, batch.room_design[bad])
+
+
+def _vec_allowed_neighbors(batch: DesignBatch, spec: dict) -> np.ndarray:
+    room = _room_of_type(batch, spec["room"])
+    allowed = batch.type_mask(spec["allowed"])
+    u, v = batch.edge_u, batch.edge_v
+    bad = (
+        (room[u] & ~allowed[batch.node_func[v]])
+        | (room[v] & ~allowed[batch.node_func[u]])
+    )
+    return _any_per_design(batch, batch.edge_design[bad])
+
+
+def _vec_require_connection(batch: DesignBatch, spec: dict) -> np.ndarray:
+    type_a, type_b = spec["pair"]
+    a, b = _room_of_type(batch, type_a), _room_of_type(batch, type_b)
+    u, v = batch.edge_u, batch.edge_v
+    hit = (a[u] & b[v]) | (b[u] & a[v])
+    return ~_any_per_design(batch, batch.edge_design[hit])
+
+
+def _vec_type_ranges(batch: DesignBatch, spec: dict) -> np.ndarray:
+    lo = np.full(len(batch.vocab), np.nan)
+    hi = np.full(len(batch.vocab), np.nan)
+    for func, (mn, mx) in spec["ranges"].items():
+        if func in batch.vocab:
+            lo[batch.vocab[func]], hi[batch.vocab[func]] = mn, mx
+    room_lo, room_hi = lo[batch.room_func], hi[batch.room_func]
+    checked = ~np.isnan(room_lo)
+    bad = checked & ((batch.room_area < room_lo) | (batch.room_area > room_hi))
+    return _any_per_design(batch, batch.room_design[bad])
+
+
+def _vec_total_area(batch: DesignBatch, spec: dict) -> np.ndarray:
+    excluded = batch.type_mask(spec.get("exclude") or ())
+    weights = np.where(excluded[batch.room_func], 0.0, batch.room_area)
+    # bincount 按输入顺序累加，与 Python sum 的浮点结果一致
+    total = np.bincount(batch.room_design, weights=weights, minlength=batch.n_designs)
+    return (total < spec["min"]) | (total > spec["max"])
+
+
+VECTOR_KERNELS = {
+    "require_neighbor_type": _vec_require_neighbor_type,
+    "allowed_neighbors": _vec_allowed_neighbors,
+    "require_connection": _vec_require_connection,
+    "type_ranges": _vec_type_ranges,
+    "total_area": _vec_total_area,
+}
+
+
+class BatchResult:
+    """
+    批量校验结果：
+    - passed:          (n_designs,) 是否通过
+    - violations:      (n_designs, n_rules) 每条规则是否违反
+    - first_violation: (n_designs,) 首条违反规则在 rule_ids 中的下标（通过为 -1），
+                       与 validate_design 返回的首条违规一致
+    """
+
+    def __init__(self, rule_ids: List[str], violations: np.ndarray):
+        self.rule_ids = rule_ids
+        self.violations = violations
+        self.passed = ~violations.any(axis=1)
+        self.first_violation = np.where(self.passed, -1, violations.argmax(axis=1))
+
+    def codes_for(self, i: int) -> List[str]:
+        """第 i 个 design 违反的全部规则 id"""
+        return [self.rule_ids[j] for j in np.flatnonzero(self.violations[i])]
+
+    def summary(self) -> dict:
+        return {
+            "total": int(len(self.passed)),
+            "passed": int(self.passed.sum()),
+            "failed": int((~self.passed).sum()),
+            "by_rule": {
+                rule_id: int(count)
+                for rule_id, count in zip(self.rule_ids, self.violations.sum(axis=0))
+            },
+        }
+
+
+def validate_batch(designs, rule_plan=None) -> BatchResult:
+    """
+    批量校验（仅通用硬规则，对应 validate_design(design) 不带 requirements）
+    :param designs: design 列表，或已打包的 DesignBatch
+    :param rule_plan: RulePlan，默认 config/rules.yaml
+    :raises ValueError: 规则计划中存在无向量化实现的规则类型
+    """
+    plan = rule_plan if rule_plan is not None else get_default_rule_plan()
+    batch = designs if isinstance(designs, DesignBatch) else pack_designs(designs)
+
+    columns = []
+    for spec in plan.specs:
+        kernel = VECTOR_KERNELS.get(spec["kind"])
+        if kernel is None:
+            raise ValueError(f"规则类型 {spec['kind']} 不支持批量校验（规则 {spec['id']}）")
+        columns.append(kernel(batch, spec))
+
+    violations = (
+        np.stack(columns, axis=1) if columns
+        else np.zeros((batch.n_designs, 0), dtype=bool)
+    )
+    return BatchResult(plan.rule_ids, violations)
@@ -0,0 +1,117 @@
+# constraint_checker/context.py
+"""
+校验上下文：每个 design 只构建一次的预计算索引，
+供所有规则共享，避免每条规则重复 extract_adjacency / split 房间名。
+"""
+from collections import defaultdict
+from functools import cached_property
+from typing import Dict, List, Set, Tuple
+
+from design_ir.graph import Direction, REVERSE_DIRECTION, parse_adjacency_description
+
+
+def make_violation(rule: str, message: str, rooms=()) -> dict:
+    """统一的违规记录结构：规则 id + 可读信息 + 涉及房间"""
+    return {"rule": rule, "message": message, "rooms": list(rooms)}
+
+
+class ValidationContext:
+    """
+    单个 design 的校验索引（构建 O(R + E)）：
+    - edges:     无向邻接对集合（与 extract_adjacency 结果一致）
+    - neighbors: 房间 -> 邻居集合
+    - functions: 房间名 -> 功能类型（'LivingRoom_1' -> 'LivingRoom'），每个名字只 split 一次
+    - by_type:   功能类型 -> rooms 列表中的房间名（按出现顺序）
+    以下索引按需惰性构建（只有方位 / 面积约束需要时才计算）：
+    - directions: (src, tgt) -> tgt 相对 src 的方位
+    - room_areas: 房间名 -> 面积
+    - unit_of:    房间名 -> 所属户（邻接连通分量）编号，按 rooms 中首次出现的顺序编号
+    """
+
+    def __init__(self, design: dict):
+        self.design = design
+        self.rooms: List[dict] = design["rooms"]
+        self.room_ids: Set[str] = set()
+        self.edges: Set[Tuple[str, str]] = set()
+        self.neighbors: Dict[str, Set[str]] = defaultdict(set)
+        self.functions: Dict[str, str] = {}
+        self.by_type: Dict[str, List[str]] = defaultdict(list)
+
+        for room in self.rooms:
+            r1 = room["type"]
+            self.room_ids.add(r1)
+            self.by_type[self.function_of(r1)].append(r1)
+            for r2 in room.get("adjacent_to", {}):
+                self.edges.add(tuple(sorted((r1, r2))))
+                # 自环不计入邻居（与原 BedRoom 规则的 x != r 判断一致）
+                if r1 != r2:
+                    self.neighbors[r1].add(r2)
+                    self.neighbors[r2].add(r1)
+
+    @cached_property
+    def directions(self) -> Dict[Tuple[str, str], Direction]:
+        """
+        有向方位表，与 build_graph_from_json 的镜像规则一致：
+        只声明了一侧时自动补全反向边；冲突时以先出现的房间为准
+        """
+        directions: Dict[Tuple[str, str], Direction] = {}
+        for room in self.rooms:
+            src = room["type"]
+            for tgt, desc in room.get("adjacent_to", {}).items():
+                _, direction = parse_adjacency_description(desc)
+                if directions.get((src, tgt), Direction.UNKNOWN) == Direction.UNKNOWN:
+                    directions[(src, tgt)] = direction
+                if direction != Direction.UNKNOWN and \
+                        directions.get((tgt, src), Direction.UNKNOWN) == Direction.UNKNOWN:
+                    directions[(tgt, src)] = REVERSE_DIRECTION[direction]
+        return directions
+
+    @cached_property
+    def room_areas(self) -> Dict[str, float]:
+        return {r["type"]: r.get("area") for r in self.rooms}
+
+    @cached_property
+    def unit_of(self) -> Dict[str, int]:
+        unit_of: Dict[str, int] = {}
+        unit = -1
+        for room in self.rooms:
+            start = room["type"]
+            if start in unit_of:
+                continue
+            unit += 1
+            unit_of[start] = unit
+            stack = [start]
+            while stack:
+                for nb in self.neighbors.get(stack.pop(), ()):
+                    if nb not in unit_of:
+                        unit_of[nb] = unit
+                        stack.append(nb)
+        return unit_of
+
+    def function_of(self, room_name: str) -> str:
+        """带缓存的 get_room_function"""
+        func = self.functions.get(room_name)
+        if func is None:
+            func = room_name.split("_")[0]
+            self.functions[room_name] = func
+        return func
+
+    def connected(self, x: str, y: str) -> bool:
+        return y in self.neighbors.get(x, ())
+
+    def has_type_pair(self, type_a: str, type_b: str) -> bool:
+        """是否存在 type_a 与 type_b（均来自 rooms 列表）之间的邻接"""
+        targets = set(self.by_type.get(type_b, ()))
+        if not targets:
+            return False
+        return any(
+            not targets.isdisjoint(self.neighbors.get(a, ()))
+            for a in self.by_type.get(type_a, ())
+        )
+
+
+def build_validation_context(design: dict) -> ValidationContext:
+    """为 design 构建共享校验上下文（已是上下文则原样返回）"""
+    if isinstance(design, ValidationContext):
+        return design
+    return ValidationContext(design)
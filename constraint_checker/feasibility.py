@@ -0,0 +1,141 @@
+# constraint_checker/feasibility.py
+"""
+生成前的静态可行性分析：只看 requirements 与规则计划，证明某些任务书
+无论生成什么方案都不可能通过 validate_design，从而在调用 LLM 之前直接拒绝。
+
+可证明的不可行情形（均与 validate_design 的判定口径一致）：
+- feasibility.unknown_type:     房间名不是 <RoomType>_<N> 或类型未定义（建图阶段必然失败）
+- feasibility.area_range:       要求面积在容差内与该类型面积范围无交集
+- feasibility.total_area:       所需房间的最小可行面积之和已超过总面积上限（per_unit 规则按约束的邻接连通分量逐户计算：
+                                方案中每一户至少包含一个完整分量）
+- feasibility.forbidden_adjacency: 必需邻接违反 allowed_neighbors 规则（如 BedRoom 必须邻接 Storage）
+- feasibility.direction_conflict:  同一对房间的方位要求互相矛盾（A 在 B 北侧，且 B 也在 A 北侧）
+"""
+from typing import Dict, List, Optional, Tuple
+
+from design_ir.graph import Direction, REVERSE_DIRECTION, parse_room_name
+from .context import make_violation
+from .requirements_index import AREA_TOLERANCE, RequirementsIndex, compile_requirements
+from .rule_engine import get_default_rule_plan
+
+
+def _required_area_interval(required: float) -> Tuple[float, float]:
+    """math.isclose(x, required, rel_tol=AREA_TOLERANCE) 成立的 x 区间"""
+    return required * (1 - AREA_TOLERANCE), required / (1 - AREA_TOLERANCE)
+
+
+def _required_units(index: RequirementsIndex) -> Dict[str, str]:
+    """房间 -> 所属分量代表：必需邻接与方位约束（隐含邻接）连通的房间必属同一户"""
+    parent: Dict[str, str] = {room: room for room in index.rooms}
+
+    def find(room: str) -> str:
+        while parent[room] != room:
+            parent[room] = parent[parent[room]]
+            room = parent[room]
+        return room
+
+    for a, b in list(index.adjacency) + list(index.direction):
+        parent[find(a)] = find(b)
+    return {room: find(room) for room in parent}
+
+
+def check_feasibility(requirements, rule_plan=None) -> List[dict]:
+    """
+    返回可证明的不可行原因列表（空列表表示未发现矛盾，而非保证可行）
+    :param requirements: requirements dict 或已编译的 RequirementsIndex
+    :param rule_plan: 规则计划，默认使用 config/rules.yaml
+    """
+    index: Optional[RequirementsIndex] = compile_requirements(requirements)
+    if not index:
+        return []
+    plan = rule_plan if rule_plan is not None else get_default_rule_plan()
+    violations = []
+
+    # 1. 房间名与类型
+    types: Dict[str, str] = {}
+    for room in sorted(index.rooms):
+        try:
+            types[room] = parse_room_name(room)[0]
+        except ValueError as e:
+            violations.append(make_violation(
+                "feasibility.unknown_type", f"{room}: {e}", [room]
+            ))
+
+    # 2. 要求面积与类型面积范围
+    ranges = plan.type_ranges()
+    min_areas: Dict[str, float] = {}
+    for room, required in index.area.items():
+        if not isinstance(required, (int, float)):
+            continue
+        req_lo, req_hi = _required_area_interval(required)
+        lo, hi = ranges.get(types.get(room), (float("-inf"), float("inf")))
+        if max(lo, req_lo) > min(hi, req_hi):
+            violations.append(make_violation(
+                "feasibility.area_range",
+                f"{room} required area {required} is outside the allowed range {lo}–{hi}",
+                [room]
+            ))
+        min_areas[room] = max(lo, req_lo)
+
+    # 3. 最小总面积：每个房间取可行的最小面积（未要求面积时取类型下限）；per_unit 时逐个分量计算
+    for spec in plan.specs_of_kind("total_area"):
+        exclude = set(spec.get("exclude") or ())
+        unit_of = _required_units(index) if spec.get("per_unit") else {}
+        totals: Dict[str, float] = {}
+        members: Dict[str, List[str]] = {}
+        for room, room_type in types.items():
+            unit = unit_of.get(room, "")
+            members.setdefault(unit, []).append(room)
+            if room_type in exclude:
+                continue
+            area = min_areas.get(room, ranges.get(room_type, (0, 0))[0])
+            totals[unit] = totals.get(unit, 0.0) + max(area, 0)
+        for unit, rooms in members.items():
+            total = totals.get(unit, 0.0)
+            if total > spec["max"]:
+                violations.append(make_violation(
+                    "feasibility.total_area",
+                    f"Minimum total area {round(total, 2)} of required rooms exceeds the maximum {spec['max']}",
+                    sorted(rooms)
+                ))
+
+    # 4. 必需邻接与 allowed_neighbors 规则
+    for spec in plan.specs_of_kind("allowed_neighbors"):
+        room_type, allowed = spec["room"], set(spec["allowed"])
+        for a, b in index.adjacency:
+            if a == b:
+                continue
+            for x, y in ((a, b), (b, a)):
+                if types.get(x) == room_type and types.get(y) is not None and types[y] not in allowed:
+                    violations.append(make_violation(
+                        "feasibility.forbidden_adjacency",
+                        f"Required adjacency {x}-{y} violates rule {spec['id']}: "
+                        f"{room_type} may only connect to {', '.join(sorted(allowed))}",
+                        [x, y]
+                    ))
+                    break  # 同一对房间只报告一次
+
+    # 5. 方位矛盾：(a, b) 与 (b, a) 的要求必须互为反向
+    for (a, b), direction in index.direction.items():
+        if a >= b and (b, a) in index.direction:
+            continue  # 每对只检查一次
+        reverse = index.direction.get((b, a))
+        if reverse is None or Direction.UNKNOWN in (direction, reverse):
+            continue
+        if REVERSE_DIRECTION[direction] != reverse:
+            violations.append(make_violation(
+                "feasibility.direction_conflict",
+                f"{a} is required to be {direction.name} of {b}, "
+                f"but {b} is also required to be {reverse.name} of {a}",
+                [a, b]
+            ))
+
+    return violations
+
+
+def is_feasible(requirements, rule_plan=None) -> Tuple[bool, str]:
+    """与 validate_design 相同的 (bool, message) 形式"""
+    violations = check_feasibility(requirements, rule_plan)
+    if violations:
+        return False, violations[0]["message"]
+    return True, "No infeasibility found"
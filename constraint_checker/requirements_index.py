@@ -0,0 +1,126 @@
+# constraint_checker/requirements_index.py
+"""
+用户显式约束（requirements.json）的编译索引：
+一次编译为 frozenset 邻接对集合、Direction 方位表和面积表，
+校验时每条约束都是 O(1) 查找，适用于上千条约束的多户型任务书。
+
+requirements 格式：
+    {
+        "area":      {"Entry_1": 3},
+        "adjacency": [["Kitchen_1", "DiningRoom_1"], ...],
+        "direction": {"Kitchen_1": {"DiningRoom_1": "NORTH"}}   # Kitchen_1 位于 DiningRoom_1 的北侧
+    }
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+
+from design_ir.graph import Direction, parse_direction
+from .context import build_validation_context, make_violation
+from .rules.adjacency import check_required_adjacency
+
+# 面积约束的相对容差（任务书中的面积通常为“约”值）
+AREA_TOLERANCE = 0.1
+
+
+class RequirementsIndex:
+    """
+    编译后的约束索引：
+    - adjacency:     去重后的有序必需邻接 [(a, b), ...]（保留原顺序用于报错）
+    - adjacency_set: {frozenset((a, b)), ...}
+    - direction:     {(a, b): Direction}，表示 a 位于 b 的该方位
+    - area:          {room: 面积}
+    """
+
+    def __init__(self, adjacency, direction, area):
+        self.adjacency: List[Tuple[str, str]] = adjacency
+        self.adjacency_set = {frozenset(pair) for pair in adjacency}
+        self.direction: Dict[Tuple[str, str], Direction] = direction
+        self.area: Dict[str, float] = area
+
+    @property
+    def rooms(self) -> set:
+        """约束中出现的全部房间"""
+        rooms = set(self.area)
+        for a, b in self.adjacency:
+            rooms.update((a, b))
+        for a, b in self.direction:
+            rooms.update((a, b))
+        return rooms
+
+    def __len__(self):
+        return len(self.adjacency) + len(self.direction) + len(self.area)
+
+
+def compile_requirements(requirements) -> Optional[RequirementsIndex]:
+    """
+    将 requirements dict 编译为索引（已是索引则原样返回，None 返回 None）
+    :raises ValueError: 邻接对格式错误或方位值非法
+    """
+    if requirements is None or isinstance(requirements, RequirementsIndex):
+        return requirements
+
+    adjacency, seen = [], set()
+    for pair in requirements.get("adjacency") or []:
+        if len(pair) != 2:
+            raise ValueError(f"Invalid adjacency requirement: {pair}")
+        key = frozenset(pair)
+        if key not in seen:
+            seen.add(key)
+            adjacency.append((pair[0], pair[1]))
+
+    direction = {
+        (a, b): parse_direction(value)
+        for a, targets in (requirements.get("direction") or {}).items()
+        for b, value in targets.items()
+    }
+    area = dict(requirements.get("area") or {})
+    return RequirementsIndex(adjacency, direction, area)
+
+
+def check_requirements(ctx, index: RequirementsIndex) -> list:
+    """按 邻接 → 方位 → 面积 的顺序返回全部约束违规"""
+    ctx = build_validation_context(ctx)
+    room_ids = ctx.room_ids
+
+    # 1. 必需邻接
+    violations = check_required_adjacency(ctx, index.adjacency)
+
+    # 2. 必需方位：a 位于 b 的 expected 方位 ⇔ b -> a 的边方向为 expected
+    #    设计未声明方位（UNKNOWN）时无法判定，不视为违规
+    if index.direction:
+        directions = ctx.directions
+        for (a, b), expected in index.direction.items():
+            if a not in room_ids or b not in room_ids:
+                violations.append(make_violation(
+                    "direction.unknown_room",
+                    f"Required direction refers to unknown room: {a} or {b}",
+                    [a, b]
+                ))
+                continue
+            actual = directions.get((b, a), Direction.UNKNOWN)
+            if actual != Direction.UNKNOWN and actual != expected:
+                violations.append(make_violation(
+                    "direction.mismatch",
+                    f"{a} should be {expected.name} of {b}, got {actual.name}",
+                    [a, b]
+                ))
+
+    # 3. 必需面积
+    if index.area:
+        room_areas = ctx.room_areas
+        for room, required in index.area.items():
+            if room not in room_areas:
+                violations.append(make_violation(
+                    "area.required_unknown_room",
+                    f"Required area refers to unknown room: {room}",
+                    [room]
+                ))
+            elif not isinstance(room_areas[room], (int, float)) or \
+                    not math.isclose(room_areas[room], required, rel_tol=AREA_TOLERANCE):
+                violations.append(make_violation(
+                    "area.required",
+                    f"{room} area {room_areas[room]} does not match required {required}",
+                    [room]
+                ))
+
+    return violations
@@ -0,0 +1,202 @@
+# constraint_checker/rule_engine.py
+"""
+声明式规则引擎：把 YAML 规则集编译为有序、去重的规则计划（RulePlan）。
+编译只做一次，之后每次校验直接执行闭包，没有逐次解释规则定义的开销。
+"""
+import json
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from utils.io import RULES_YAML, read_yaml
+from .context import build_validation_context
+from .rules.area import check_room_area, check_total_area
+from .rules.topology import (
+    check_neighbor_type,
+    check_allowed_neighbors,
+    check_type_connection
+)
+
+# 仅用于去重时忽略的描述性字段
+_NON_SEMANTIC_KEYS = {"id", "message", "description", "enabled"}
+
+
+# -------------------- 各类规则的编译函数 --------------------
+def _compile_require_neighbor_type(spec: dict) -> Callable:
+    room, neighbor = spec["room"], spec["neighbor"]
+    rule_id = spec["id"]
+    message = spec.get("message", f"{room} is not connected to {neighbor}")
+    return lambda ctx: check_neighbor_type(ctx, room, neighbor, rule_id, message)
+
+
+def _compile_allowed_neighbors(spec: dict) -> Callable:
+    room = spec["room"]
+    allowed = frozenset(spec["allowed"])
+    rule_id = spec["id"]
+    message = spec.get("message", f"{room} connected to invalid space: {{neighbor}}")
+    return lambda ctx: check_allowed_neighbors(ctx, room, allowed, rule_id, message)
+
+
+def _compile_require_connection(spec: dict) -> Callable:
+    type_a, type_b = spec["pair"]
+    rule_id = spec["id"]
+    message = spec.get("message", f"{type_a} and {type_b} must be connected")
+    return lambda ctx: check_type_connection(ctx, type_a, type_b, rule_id, message)
+
+
+def _compile_type_ranges(spec: dict) -> Callable:
+    limits = {t: (mn, mx) for t, (mn, mx) in spec["ranges"].items()}
+    rule_id = spec["id"]
+    message = spec.get("message", "{room} area out of bounds")
+    return lambda ctx: check_room_area(ctx, limits, rule_id, message)
+
+
+def _compile_total_area(spec: dict) -> Callable:
+    min_area, max_area = spec["min"], spec["max"]
+    exclude = frozenset(spec.get("exclude") or ())
+    rule_id = spec["id"]
+    message = spec.get("message", "Total area {total} out of bounds")
+    per_unit = bool(spec.get("per_unit", False))
+    return lambda ctx: check_total_area(ctx, min_area, max_area, exclude, rule_id, message, per_unit)
+
+
+RULE_COMPILERS: Dict[str, Callable[[dict], Callable]] = {
+    "require_neighbor_type": _compile_require_neighbor_type,
+    "allowed_neighbors": _compile_allowed_neighbors,
+    "require_connection": _compile_require_connection,
+    "type_ranges": _compile_type_ranges,
+    "total_area": _compile_total_area,
+}
+
+
+# -------------------- 规则计划 --------------------
+class RulePlan:
+    """
+    编译后的规则计划：steps 为 (rule_id, check) 有序列表，
+    check(ctx) -> list[violation]
+    """
+
+    def __init__(self, name: str, steps: List[Tuple[str, Callable]], specs: List[dict]):
+        self.name = name
+        self.steps = steps
+        self.specs = specs
+        self._per_unit_plan = None
+
+    @property
+    def rule_ids(self) -> List[str]:
+        return [rule_id for rule_id, _ in self.steps]
+
+    def specs_of_kind(self, kind: str) -> List[dict]:
+        return [s for s in self.specs if s["kind"] == kind]
+
+    def type_ranges(self) -> Dict[str, Tuple[float, float]]:
+        """合并全部 type_ranges 规则的面积范围 {类型: (min, max)}（多条规则时取交集）"""
+        ranges: Dict[str, Tuple[float, float]] = {}
+        for spec in self.specs_of_kind("type_ranges"):
+            for room_type, (mn, mx) in spec["ranges"].items():
+                lo, hi = ranges.get(room_type, (float("-inf"), float("inf")))
+                ranges[room_type] = (max(lo, mn), min(hi, mx))
+        return ranges
+
+    def per_unit(self) -> "RulePlan":
+        """
+        多户型楼层使用的规则计划：total_area 规则按户（邻接连通分量）逐户判定，其余规则不变
+        （整层总面积必然超过单套住宅的上限）；首次调用时编译并缓存
+        """
+        if self._per_unit_plan is None:
+            rules = [dict(s, per_unit=True) if s["kind"] == "total_area" else s for s in self.specs]
+            self._per_unit_plan = compile_rule_set({"name": f"{self.name}.per_unit", "rules": rules})
+        return self._per_unit_plan
+
+    def iter_violations(self, ctx):
+        ctx = build_validation_context(ctx)
+        for _, check in self.steps:
+            yield from check(ctx)
+
+    def __repr__(self):
+        return f"RulePlan(name={self.name!r}, rules={self.rule_ids})"
+
+
+def _dedup_key(spec: dict) -> str:
+    """规则语义指纹：忽略 id / message 等描述字段"""
+    semantic = {k: v for k, v in spec.items() if k not in _NON_SEMANTIC_KEYS}
+    return json.dumps(semantic, sort_keys=True, ensure_ascii=False)
+
+
+def compile_rule_set(rule_set: dict) -> RulePlan:
+    """
+    将规则集定义（YAML 解析后的 dict）编译为 RulePlan
+    :raises ValueError: 规则缺少 id/kind、kind 未知或 id 重复
+    """
+    steps, specs = [], []
+    seen_keys, seen_ids = set(), set()
+
+    for idx, spec in enumerate(rule_set.get("rules") or []):
+        if not spec.get("enabled", True):
+            continue
+        kind, rule_id = spec.get("kind"), spec.get("id")
+        if not kind or not rule_id:
+            raise ValueError(f"第 {idx + 1} 条规则缺少 id 或 kind：{spec}")
+        if kind not in RULE_COMPILERS:
+            raise ValueError(f"未知规则类型：{kind}（规则 {rule_id}）")
+
+        key = _dedup_key(spec)
+        if key in seen_keys:
+            continue
+        if rule_id in seen_ids:
+            raise ValueError(f"规则 id 重复：{rule_id}")
+        seen_keys.add(key)
+        seen_ids.add(rule_id)
+
+        try:
+            steps.append((rule_id, RULE_COMPILERS[kind](spec)))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"规则 {rule_id} 参数错误：{e}")
+        specs.append(spec)
+
+    return RulePlan(rule_set.get("name", "custom"), steps, specs)
+
+
+@lru_cache(maxsize=32)
+def _load_rule_plan_cached(path: str, mtime: float) -> RulePlan:
+    return compile_rule_set(read_yaml(path))
+
+
+def load_rule_plan(path: Optional[Union[Path, str]] = None) -> RulePlan:
+    """
+    从 YAML 文件加载并编译规则计划（按路径 + 修改时间缓存，文件不变则不重复编译）
+    :param path: 规则文件路径，默认 config/rules.yaml
+    """
+    path = Path(path or RULES_YAML).resolve()
+    if not path.exists():
+        raise FileNotFoundError(f"规则文件不存在：{path}")
+    return _load_rule_plan_cached(str(path), path.stat().st_mtime)
+
+
+# ---- 默认规则计划：路径只解析一次，修改时间按间隔检查（校验热路径上不做逐次文件 I/O） ----
+RULE_PLAN_CHECK_INTERVAL = 2.0
+_DEFAULT_PATH = Path(RULES_YAML).resolve()
+_DEFAULT_PLAN = None
+_DEFAULT_MTIME = None
+_DEFAULT_CHECKED_AT = 0.0
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_default_rule_plan() -> RulePlan:
+    """config/rules.yaml 的规则计划；距上次检查超过 RULE_PLAN_CHECK_INTERVAL 秒才重新 stat，文件变化时重新编译"""
+    global _DEFAULT_PLAN, _DEFAULT_MTIME, _DEFAULT_CHECKED_AT
+    now = time.monotonic()
+    if _DEFAULT_PLAN is not None and now - _DEFAULT_CHECKED_AT < RULE_PLAN_CHECK_INTERVAL:
+        return _DEFAULT_PLAN
+    with _DEFAULT_LOCK:
+        if _DEFAULT_PLAN is None or now - _DEFAULT_CHECKED_AT >= RULE_PLAN_CHECK_INTERVAL:
+            if not _DEFAULT_PATH.exists():
+                raise FileNotFoundError(f"规则文件不存在：{_DEFAULT_PATH}")
+            mtime = _DEFAULT_PATH.stat().st_mtime
+            if _DEFAULT_PLAN is None or mtime != _DEFAULT_MTIME:
+                _DEFAULT_PLAN = compile_rule_set(read_yaml(_DEFAULT_PATH))
+                _DEFAULT_MTIME = mtime
+            _DEFAULT_CHECKED_AT = now
+        return _DEFAULT_PLAN
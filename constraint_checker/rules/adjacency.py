@@ -1,4 +1,6 @@
 # 邻接相关规则与工具
+from ..context import build_validation_context, make_violation
+
 
 def get_room_function(room_type: str) -> str:
     """
@@ -19,15 +21,25 @@ def extract_adjacency(design: dict) -> set:
     return edges
 
 
-def validate_required_adjacency(design: dict, required_pairs: list):
-    adj = extract_adjacency(design)
-    room_ids = {r["type"] for r in design["rooms"]}
-
+def check_required_adjacency(ctx, required_pairs: list) -> list:
+    ctx = build_validation_context(ctx)
+    violations = []
     for a, b in required_pairs:
-        if a not in room_ids or b not in room_ids:
-            return False, f"Required adjacency refers to unknown room: {a} or {b}"
+        if a not in ctx.room_ids or b not in ctx.room_ids:
+            violations.append(make_violation(
+                "adjacency.unknown_room",
+                f"Required adjacency refers to unknown room: {a} or {b}",
+                [a, b]
+            ))
+        elif tuple(sorted((a, b))) not in ctx.edges:
+            violations.append(make_violation(
+                "adjacency.missing", f"Missing required adjacency: {a}-{b}", [a, b]
+            ))
+    return violations
 
-        if tuple(sorted((a, b))) not in adj:
-            return False, f"Missing required adjacency: {a}-{b}"
 
+def validate_required_adjacency(design: dict, required_pairs: list):
+    violations = check_required_adjacency(design, required_pairs)
+    if violations:
+        return False, violations[0]["message"]
     return True, "Required adjacency satisfied"
@@ -1,4 +1,4 @@
-from .adjacency import get_room_function
+from ..context import build_validation_context, make_violation
 
 
 AREA_LIMITS = {
@@ -15,18 +15,73 @@ AREA_LIMITS = {
 }
 
 
-def validate_room_area(design: dict):
-    for r in design["rooms"]:
-        func = get_room_function(r["type"])
-        if func in AREA_LIMITS:
-            mn, mx = AREA_LIMITS[func]
+def check_room_area(
+    ctx,
+    limits=None,
+    rule_id="area.room_range",
+    message="{room} area out of bounds"
+) -> list:
+    ctx = build_validation_context(ctx)
+    limits = AREA_LIMITS if limits is None else limits
+    violations = []
+    for r in ctx.rooms:
+        func = ctx.function_of(r["type"])
+        if func in limits:
+            mn, mx = limits[func]
             if not (mn <= r["area"] <= mx):
-                return False, f"{r['type']} area out of bounds"
+                violations.append(make_violation(
+                    rule_id, message.format(room=r["type"]), [r["type"]]
+                ))
+    return violations
+
+
+def check_total_area(
+    ctx,
+    min_area=60,
+    max_area=130,
+    exclude=(),
+    rule_id="area.total",
+    message="Total area {total} out of bounds",
+    per_unit=False
+) -> list:
+    """
+    exclude: 不计入建筑面积的功能类型（如 Garden / Outdoor）
+    per_unit: 按户（邻接连通分量，见 ValidationContext.unit_of）逐户判定，用于多户型楼层
+    """
+    ctx = build_validation_context(ctx)
+    if per_unit:
+        totals, members = {}, {}
+        for r in ctx.rooms:
+            unit = ctx.unit_of[r["type"]]
+            members.setdefault(unit, []).append(r["type"])
+            if ctx.function_of(r["type"]) not in exclude:
+                totals[unit] = totals.get(unit, 0) + r["area"]
+        return [
+            make_violation(rule_id, message.format(total=totals.get(unit, 0)), rooms)
+            for unit, rooms in members.items()
+            if not (min_area <= totals.get(unit, 0) <= max_area)
+        ]
+    if exclude:
+        total = sum(
+            r["area"] for r in ctx.rooms
+            if ctx.function_of(r["type"]) not in exclude
+        )
+    else:
+        total = sum(r["area"] for r in ctx.rooms)
+    if not (min_area <= total <= max_area):
+        return [make_violation(rule_id, message.format(total=total))]
+    return []
+
+
+def validate_room_area(design: dict):
+    violations = check_room_area(design)
+    if violations:
+        return False, violations[0]["message"]
     return True, "Room areas valid"
 
 
 def validate_total_area(design: dict, min_area=60, max_area=130):
-    total = sum(r["area"] for r in design["rooms"])
-    if not (min_area <= total <= max_area):
-        return False, f"Total area {total} out of bounds"
+    violations = check_total_area(design, min_area, max_area)
+    if violations:
+        return False, violations[0]["message"]
     return True, "Total area valid"
@@ -1,49 +1,73 @@
 # constraint_checker/rules/topology.py
-from .adjacency import extract_adjacency, get_room_function
+from ..context import build_validation_context, make_violation
 
 
-def validate_basic_function(design: dict):
-    adj = extract_adjacency(design)
-
-    def connected(x, y):
-        return tuple(sorted((x, y))) in adj
-
-    rooms = design["rooms"]
-
-    entries = [r for r in rooms if get_room_function(r["type"]) == "Entry"]
-    livings = [r for r in rooms if get_room_function(r["type"]) == "LivingRoom"]
-    dinings = [r for r in rooms if get_room_function(r["type"]) == "DiningRoom"]
-    kitchens = [r for r in rooms if get_room_function(r["type"]) == "Kitchen"]
-
-    # ① Entry → LivingRoom
-    for e in entries:
-        if not any(connected(e["type"], l["type"]) for l in livings):
-            return False, "Entry is not connected to LivingRoom"
-
-    # ② Bedroom adjacency constraint
-    allowed = {"LivingRoom", "DiningRoom", "BathRoom"}
-    for r in rooms:
-        if get_room_function(r["type"]) == "BedRoom":
-            neighbors = [
-                x for pair in adj if r["type"] in pair
-                for x in pair if x != r["type"]
-            ]
-            for n in neighbors:
-                if get_room_function(n) not in allowed:
-                    return False, f"BedRoom connected to invalid space: {n}"
-
-    # ③ Kitchen ↔ DiningRoom
-    if not any(
-        connected(k["type"], d["type"])
-        for k in kitchens for d in dinings
-    ):
-        return False, "Kitchen and DiningRoom must be connected"
-
-    # ④ LivingRoom ↔ DiningRoom
-    if not any(
-        connected(l["type"], d["type"])
-        for l in livings for d in dinings
-    ):
-        return False, "LivingRoom and DiningRoom must be connected"
+BEDROOM_ALLOWED_NEIGHBORS = {"LivingRoom", "DiningRoom", "BathRoom"}
+
+
+# -------------------- 参数化规则原语（规则引擎编译时复用） --------------------
+def check_neighbor_type(ctx, room_type, neighbor_type, rule_id, message) -> list:
+    """每个 room_type 房间至少连接一个 neighbor_type 房间"""
+    targets = set(ctx.by_type.get(neighbor_type, ()))
+    return [
+        make_violation(rule_id, message.format(room=r), [r])
+        for r in ctx.by_type.get(room_type, ())
+        if targets.isdisjoint(ctx.neighbors.get(r, ()))
+    ]
+
+
+def check_allowed_neighbors(ctx, room_type, allowed, rule_id, message) -> list:
+    """room_type 房间的所有邻居类型 ⊆ allowed，只遍历自身邻居"""
+    violations = []
+    for r in ctx.by_type.get(room_type, ()):
+        for n in ctx.neighbors.get(r, ()):
+            if ctx.function_of(n) not in allowed:
+                violations.append(make_violation(
+                    rule_id, message.format(room=r, neighbor=n), [r, n]
+                ))
+    return violations
+
 
+def check_type_connection(ctx, type_a, type_b, rule_id, message) -> list:
+    """至少存在一对 type_a ↔ type_b 的邻接"""
+    if ctx.has_type_pair(type_a, type_b):
+        return []
+    return [make_violation(rule_id, message)]
+
+
+# -------------------- 默认基本功能规则 --------------------
+def check_basic_function(ctx) -> list:
+    """
+    基于共享上下文返回全部功能违规（按规则①~④顺序），
+    BedRoom 只遍历自身邻居，复杂度 O(R + E)
+    """
+    ctx = build_validation_context(ctx)
+    return (
+        # ① Entry → LivingRoom
+        check_neighbor_type(
+            ctx, "Entry", "LivingRoom",
+            "function.entry_living", "Entry is not connected to LivingRoom"
+        )
+        # ② Bedroom adjacency constraint
+        + check_allowed_neighbors(
+            ctx, "BedRoom", BEDROOM_ALLOWED_NEIGHBORS,
+            "function.bedroom_neighbors", "BedRoom connected to invalid space: {neighbor}"
+        )
+        # ③ Kitchen ↔ DiningRoom
+        + check_type_connection(
+            ctx, "Kitchen", "DiningRoom",
+            "function.kitchen_dining", "Kitchen and DiningRoom must be connected"
+        )
+        # ④ LivingRoom ↔ DiningRoom
+        + check_type_connection(
+            ctx, "LivingRoom", "DiningRoom",
+            "function.living_dining", "LivingRoom and DiningRoom must be connected"
+        )
+    )
+
+
+def validate_basic_function(design: dict):
+    violations = check_basic_function(design)
+    if violations:
+        return False, violations[0]["message"]
     return True, "Basic function valid"
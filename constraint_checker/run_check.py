@@ -1,12 +1,39 @@
 # constraint_checker/run_check.py 对示例文件进行检验
+import argparse
 import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from .validator import validate_design
+from .validator import validate_design, validate_design_report
 # 导入统一的示例目录路径
-from utils.io import EXAMPLE_FILES, ensure_dir, REQUIREMENTS_JSON
+from utils.io import EXAMPLE_FILES, ensure_dir, REQUIREMENTS_JSON, get_file_list
 
-def run_example(design_path):
-    """校验单个 design 示例"""
+def load_requirements(req_path=None):
+    """读取requirements.json（默认使用统一路径），文件不存在返回 None"""
+    req_path = Path(req_path or REQUIREMENTS_JSON)
+    if not req_path.exists():
+        return None
+    with open(req_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def requirements_for(design_path, default=None):
+    """
+    design 文件对应的约束：同目录下存在 <文件名>.requirements.json 时以其为准
+    （示例方案与演示任务书无关时可用空对象 {} 声明“只校验硬规则”），否则返回 default
+    """
+    design_path = Path(design_path)
+    sidecar = design_path.with_name(design_path.stem + ".requirements.json")
+    if sidecar.exists():
+        return load_requirements(sidecar)
+    return default
+
+def run_example(design_path, requirements=None):
+    """
+    校验单个 design 示例
+    :param requirements: 已加载的约束；为 None 时从 requirements.json 读取
+                         （同名 .requirements.json 文件优先）
+    """
     design_path = Path(design_path)
     if not design_path.exists():
         raise FileNotFoundError(f"设计文件不存在：{design_path}")
@@ -15,12 +42,10 @@ def run_example(design_path):
     with open(design_path, "r", encoding="utf-8") as f:
         design = json.load(f)
 
-    # 读取requirements.json（使用统一路径）
-    req_path = REQUIREMENTS_JSON
-    requirements = None
-    if req_path.exists():
-        with open(req_path, "r", encoding="utf-8") as f:
-            requirements = json.load(f)
+    # 读取requirements.json（批量调用时由外部只加载一次后传入）
+    if requirements is None:
+        requirements = load_requirements()
+    requirements = requirements_for(design_path, requirements)
 
     # 调用校验函数
     ok, msg = validate_design(design, requirements)
@@ -71,6 +96,9 @@ def batch_run_check(examples_dir=None):
     fail_files = 0
     fail_details = []
 
+    # requirements 只加载一次
+    requirements = load_requirements()
+
     # 打印开始信息
     print(f"📁 开始批量校验，共找到 {total_files} 个示例文件")
     print("-" * 60)
@@ -79,7 +107,7 @@ def batch_run_check(examples_dir=None):
     for file_path in file_paths:
         try:
             # 调用run_example执行单个文件校验
-            ok, msg = run_example(file_path)
+            ok, msg = run_example(file_path, requirements)
             
             # 统计结果
             if ok:
@@ -108,6 +136,177 @@ def batch_run_check(examples_dir=None):
         for idx, detail in enumerate(fail_details, 1):
             print(f"   {idx}. {detail['file']}: {detail['reason']}")
 
+# ===================== 并行批量校验（进程池 + JSONL 流式输出） =====================
+# 每个工作进程只加载一次 requirements，保存在进程内全局变量中
+_WORKER_REQUIREMENTS = None
+
+
+def _init_worker(req_path):
+    global _WORKER_REQUIREMENTS
+    _WORKER_REQUIREMENTS = load_requirements(req_path) if req_path else None
+
+
+def _check_file(file_path: str) -> dict:
+    """校验单个文件，返回一条结果记录（异常被隔离为 error 记录）"""
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            design = json.load(f)
+        ok, violations = validate_design_report(design, requirements_for(file_path, _WORKER_REQUIREMENTS))
+        return {
+            "file": file_path,
+            "ok": ok,
+            "message": violations[0]["message"] if violations else "Design valid",
+            "violations": [v["rule"] for v in violations],
+        }
+    except Exception as e:
+        return {"file": file_path, "ok": False, "error": f"校验出错：{e}"}
+
+
+def _check_chunk(file_paths: list) -> list:
+    return [_check_file(p) for p in file_paths]
+
+
+def collect_design_files(inputs, recursive=True) -> list:
+    """收集待校验的 design 文件（支持目录/文件混合，排除 *.requirements.json）"""
+    if isinstance(inputs, (str, Path)):
+        inputs = [inputs]
+    file_paths = []
+    for item in inputs:
+        item = Path(item)
+        if item.is_dir():
+            file_paths.extend(get_file_list(item, suffix=".json", recursive=recursive))
+        else:
+            file_paths.append(item.resolve())
+    return [
+        f for f in file_paths
+        if f.suffix.lower() == ".json" and not f.name.endswith(".requirements.json")
+    ]
+
+
+def _truncate_partial_line(output_path: Path) -> None:
+    """截掉结果文件末尾中断时写了一半的行，使续跑追加的第一条记录从新行开始"""
+    with open(output_path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        pos = size
+        while pos > 0:
+            step = min(65536, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            idx = block.rfind(b"\n")
+            if idx >= 0:
+                pos = pos - step + idx + 1
+                break
+            pos -= step
+        if pos != size:
+            f.truncate(pos)
+
+
+def _load_done_records(output_path: Path) -> dict:
+    """读取已有结果文件中已完成的记录 {file: record}（用于断点续跑；先截掉末尾不完整的行）"""
+    done = {}
+    if not output_path.exists():
+        return done
+    _truncate_partial_line(output_path)
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                done[record["file"]] = record
+            except (json.JSONDecodeError, KeyError):
+                continue
+    return done
+
+
+def _tally(summary: dict, record: dict) -> None:
+    if "error" in record:
+        summary["errors"] += 1
+    elif record.get("ok"):
+        summary["passed"] += 1
+    else:
+        summary["failed"] += 1
+
+
+def batch_run_check_parallel(
+    inputs=None,
+    output_path="check_results.jsonl",
+    workers=None,
+    chunksize=64,
+    recursive=True,
+    resume=False,
+    req_path=None
+) -> dict:
+    """
+    并行批量校验：进程池按块分发文件，结果逐条写入 JSONL，最后返回汇总
+    :param inputs: 目录/文件（或其列表），默认 constraint_checker/examples 下的示例文件
+    :param output_path: JSONL 结果文件，每行一条 {"file", "ok", "message", "violations"}
+    :param workers: 进程数，默认 CPU 核数
+    :param chunksize: 每个任务块包含的文件数
+    :param resume: True 时跳过结果文件中已完成的文件，并以追加方式写入
+    :param req_path: requirements.json 路径，默认使用统一路径
+    """
+    start_time = time.time()
+    file_paths = collect_design_files(inputs if inputs is not None else EXAMPLE_FILES, recursive)
+    output_path = Path(output_path)
+    ensure_dir(output_path.parent)
+
+    done = _load_done_records(output_path) if resume else {}
+    pending = [str(f) for f in file_paths if str(f) not in done]
+    chunks = [pending[i:i + chunksize] for i in range(0, len(pending), chunksize)]
+
+    summary = {"total": len(done) + len(pending), "skipped": len(file_paths) - len(pending),
+               "passed": 0, "failed": 0, "errors": 0}
+    # 汇总覆盖整个结果文件：续跑时先计入之前已完成的记录
+    for record in done.values():
+        _tally(summary, record)
+    print(f"📁 开始并行校验，共 {len(file_paths)} 个文件，待校验 {len(pending)} 个")
+
+    req_path = str(req_path or REQUIREMENTS_JSON)
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                initializer=_init_worker, initargs=(req_path,)) as executor:
+        futures = [executor.submit(_check_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            for record in future.result():
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                _tally(summary, record)
+            # 每个块落盘一次，中断后可从结果文件续跑
+            out.flush()
+
+    elapsed = time.time() - start_time
+    summary["elapsed_s"] = round(elapsed, 3)
+    summary["files_per_s"] = round(len(pending) / elapsed, 1) if elapsed > 0 else None
+
+    print("-" * 60)
+    print(f"📊 校验汇总：总计 {summary['total']} 个文件（续跑跳过 {summary['skipped']} 个）")
+    print(f"   ✅ 通过：{summary['passed']} 个")
+    print(f"   ❌ 失败：{summary['failed']} 个")
+    print(f"   ⚠️ 出错：{summary['errors']} 个")
+    print(f"   ⏱ 耗时：{summary['elapsed_s']}s（{summary['files_per_s']} 个/s），结果：{output_path}")
+    return summary
+
+
 if __name__ == "__main__":
-    # 直接调用，无需处理路径切换（根目录已统一）
-    batch_run_check()
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="批量校验 design 文件")
+    arg_parser.add_argument("inputs", nargs="*", help="目录或文件（默认 examples 示例）")
+    arg_parser.add_argument("-o", "--output", help="JSONL 结果文件；指定后使用并行模式")
+    arg_parser.add_argument("-w", "--workers", type=int, default=None, help="进程数")
+    arg_parser.add_argument("--chunksize", type=int, default=64, help="每个任务块的文件数")
+    arg_parser.add_argument("--no-recursive", action="store_true", help="不递归子目录")
+    arg_parser.add_argument("--resume", action="store_true", help="从已有结果文件断点续跑")
+    arg_parser.add_argument("--requirements", help="requirements.json 路径")
+    args = arg_parser.parse_args()
+
+    if args.output:
+        batch_run_check_parallel(
+            inputs=args.inputs or None,
+            output_path=args.output,
+            workers=args.workers,
+            chunksize=args.chunksize,
+            recursive=not args.no_recursive,
+            resume=args.resume,
+            req_path=args.requirements
+        )
+    else:
+        # 直接调用，无需处理路径切换（根目录已统一）
+        batch_run_check()
@@ -0,0 +1,229 @@
+# constraint_checker/scoring.py
+"""
+软偏好评分：validate_design 只判定通过 / 不通过，本模块在 SpatialGraph 上给多个（通常已通过校验的）
+候选方案打分（0~1，越高越好），并用定长小顶堆单遍选出前 k 个，不对整个候选池排序。
+
+分项（均为 0~1）：
+- area:        各房间面积接近该类型典型面积（规则计划 type_ranges 区间中点）的程度，区间端点及以外为 0
+- direction:   requirements 中方位要求的满足比例（无方位要求时为 1）
+- circulation: 从 Entry 出发的动线深度，1 / 平均 BFS 深度（不可达房间按房间数计深度；无 Entry 为 0）
+- total_area:  总面积与目标（约 90㎡）的偏差，偏差达到 TOTAL_AREA_TOLERANCE 时为 0
+
+逐图只做一次遍历提取原始量（房间面积、方位命中、动线深度、总面积），分项换算与加权在整批上向量化完成。
+"""
+import heapq
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from design_ir.graph import REVERSE_DIRECTION, SpatialGraph, parse_direction
+from design_ir.parser import graph_to_json_dict, parse_design_to_graph
+from .requirements_index import compile_requirements
+from .rule_engine import RulePlan, get_default_rule_plan
+from .validator import validate_design
+
+# 默认分项权重（加权平均，权重之和不必为 1）
+SCORE_WEIGHTS = {"area": 0.3, "direction": 0.3, "circulation": 0.2, "total_area": 0.2}
+COMPONENTS = tuple(SCORE_WEIGHTS)
+TARGET_TOTAL_AREA = 90.0
+TOTAL_AREA_TOLERANCE = 40.0
+
+
+@lru_cache(maxsize=8)
+def _type_arrays(plan: RulePlan) -> tuple:
+    """(类型编码, 区间中点, 区间半宽)：与校验使用同一规则计划的面积范围，规则文件变化（新计划）时重新计算"""
+    ranges = plan.type_ranges()
+    codes = {room_type: i for i, room_type in enumerate(ranges)}
+    mid = np.array([(mn + mx) / 2 for mn, mx in ranges.values()])
+    half = np.array([(mx - mn) / 2 for mn, mx in ranges.values()])
+    return codes, mid, half
+
+
+class DesignScores:
+    """
+    一批候选方案的评分：
+    - total:      (n,) 加权总分
+    - components: {分项名: (n,) 分项得分}
+    """
+
+    def __init__(self, total: np.ndarray, components: Dict[str, np.ndarray]):
+        self.total = total
+        self.components = components
+
+    def __len__(self) -> int:
+        return len(self.total)
+
+    def breakdown(self, i: int) -> dict:
+        """第 i 个方案的总分与各分项"""
+        result = {"score": round(float(self.total[i]), 4)}
+        result.update({name: round(float(v[i]), 4) for name, v in self.components.items()})
+        return result
+
+
+def _as_graph(candidate) -> SpatialGraph:
+    if isinstance(candidate, SpatialGraph):
+        return candidate
+    return parse_design_to_graph(candidate)
+
+
+def _direction_targets(requirements: Optional[dict]) -> list:
+    """[(a, b, D)]：a 位于 b 的 D 侧"""
+    return [
+        (a, b, parse_direction(d))
+        for a, targets in ((requirements or {}).get("direction") or {}).items()
+        for b, d in targets.items()
+    ]
+
+
+def _direction_met(graph: SpatialGraph, a: str, b: str, expected) -> bool:
+    """b → a 的边方位为 expected（a 在 b 的该侧），或 a → b 的边方位为其反向"""
+    room_a, room_b = graph.rooms.get(a), graph.rooms.get(b)
+    if room_a is None or room_b is None:
+        return False
+    reverse = REVERSE_DIRECTION[expected]
+    return (
+        any(e.target is room_a and e.direction == expected for e in room_b.adjacencies)
+        or any(e.target is room_b and e.direction == reverse for e in room_a.adjacencies)
+    )
+
+
+def _mean_entry_depth(graph: SpatialGraph) -> float:
+    """非 Entry 房间到最近 Entry 的平均 BFS 深度；无 Entry 返回 inf"""
+    depth = {name: 0 for name, room in graph.rooms.items() if room.room_type == "Entry"}
+    if not depth:
+        return float("inf")
+    queue = deque(depth)
+    while queue:
+        name = queue.popleft()
+        for edge in graph.rooms[name].adjacencies:
+            if edge.target.name not in depth:
+                depth[edge.target.name] = depth[name] + 1
+                queue.append(edge.target.name)
+    others = [name for name, room in graph.rooms.items() if room.room_type != "Entry"]
+    if not others:
+        return 1.0
+    unreachable = len(graph.rooms)
+    return sum(depth.get(name, unreachable) for name in others) / len(others)
+
+
+def score_designs(candidates, requirements: Optional[dict] = None, weights: Optional[dict] = None) -> DesignScores:
+    """
+    批量评分
+    :param candidates: SpatialGraph 或 design dict 的列表
+    :param requirements: 用户约束（只用其中的 direction）
+    :param weights: 分项权重，缺省项取 SCORE_WEIGHTS
+    """
+    weights = {**SCORE_WEIGHTS, **(weights or {})}
+    targets = _direction_targets(requirements)
+    type_codes, type_mid, type_half = _type_arrays(get_default_rule_plan())
+    n = len(candidates)
+
+    # 1. 逐图提取原始量
+    room_design, room_type, room_area = [], [], []
+    direction_hits = np.ones(n)
+    depths = np.empty(n)
+    totals = np.empty(n)
+    for i, candidate in enumerate(candidates):
+        graph = _as_graph(candidate)
+        total = 0.0
+        for room in graph.rooms.values():
+            area = room.area or 0.0
+            total += area
+            code = type_codes.get(room.room_type)
+            if code is not None:
+                room_design.append(i)
+                room_type.append(code)
+                room_area.append(area)
+        totals[i] = total
+        depths[i] = _mean_entry_depth(graph)
+        if targets:
+            direction_hits[i] = sum(_direction_met(graph, a, b, d) for a, b, d in targets) / len(targets)
+
+    # 2. 向量化换算分项
+    room_design = np.asarray(room_design, dtype=np.int64)
+    room_type = np.asarray(room_type, dtype=np.int64)
+    closeness = np.clip(
+        1.0 - np.abs(np.asarray(room_area, dtype=np.float64) - type_mid[room_type]) / type_half[room_type],
+        0.0, 1.0,
+    )
+    counts = np.bincount(room_design, minlength=n)
+    sums = np.bincount(room_design, weights=closeness, minlength=n)
+    components = {
+        # 没有可评分房间的方案不扣分
+        "area": np.divide(sums, counts, out=np.ones(n), where=counts > 0),
+        "direction": direction_hits,
+        "circulation": 1.0 / np.maximum(depths, 1.0),
+        "total_area": np.clip(1.0 - np.abs(totals - TARGET_TOTAL_AREA) / TOTAL_AREA_TOLERANCE, 0.0, 1.0),
+    }
+
+    # 3. 加权平均
+    w = np.array([weights[name] for name in COMPONENTS], dtype=np.float64)
+    matrix = np.stack([components[name] for name in COMPONENTS], axis=1) if n else np.zeros((0, len(w)))
+    total = matrix @ w / w.sum() if w.sum() > 0 else np.zeros(n)
+    return DesignScores(total, components)
+
+
+def score_graph(graph, requirements: Optional[dict] = None, weights: Optional[dict] = None) -> dict:
+    """单个方案的总分与各分项"""
+    return score_designs([graph], requirements, weights).breakdown(0)
+
+
+def top_k_designs(
+    candidates: Iterable,
+    k: int,
+    requirements: Optional[dict] = None,
+    weights: Optional[dict] = None,
+    passed_only: bool = False,
+    chunk_size: int = 1024,
+) -> List[dict]:
+    """
+    单遍选出得分最高的 k 个方案：候选按 chunk_size 分块批量评分，定长小顶堆保存当前前 k 个，
+    每块先用堆顶分数向量化筛掉不可能入选的候选；候选可以是生成器（不需要整体放入内存）
+    :param passed_only: 只保留通过 validate_design（含 requirements）的方案；只对能进入前 k 的候选做校验
+    :return: [{"index", "score", "components", "design"}]，按得分从高到低（同分时先出现的在前）
+    """
+    if k <= 0:
+        return []
+    # 同一约束反复校验：先编译一次
+    compiled = compile_requirements(requirements) if passed_only else None
+
+    heap = []  # (score, -index, components, candidate)：堆顶为当前第 k 名
+    chunk, offset = [], 0
+
+    def flush():
+        scores = score_designs(chunk, requirements, weights)
+        order = np.arange(len(chunk))
+        if len(heap) >= k:
+            order = order[scores.total > heap[0][0]]
+        for j in order:
+            score = float(scores.total[j])
+            if len(heap) >= k and score <= heap[0][0]:
+                continue
+            candidate = chunk[j]
+            if passed_only:
+                design = graph_to_json_dict(candidate) if isinstance(candidate, SpatialGraph) else candidate
+                if not validate_design(design, compiled)[0]:
+                    continue
+            components = {name: round(float(v[j]), 4) for name, v in scores.components.items()}
+            entry = (score, -(offset + int(j)), components, candidate)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            else:
+                heapq.heapreplace(heap, entry)
+
+    for candidate in candidates:
+        chunk.append(candidate)
+        if len(chunk) >= chunk_size:
+            flush()
+            offset += len(chunk)
+            chunk = []
+    if chunk:
+        flush()
+
+    ranked = sorted(heap, key=lambda entry: (entry[0], entry[1]), reverse=True)
+    return [
+        {"index": -neg_index, "score": round(score, 4), "components": components, "design": candidate}
+        for score, neg_index, components, candidate in ranked
+    ]
@@ -0,0 +1,143 @@
+# constraint_checker/stream_check.py
+"""
+流式校验 JSONL（可选 gzip）design 语料：逐行解析 → parse_design_to_graph 标准化 → 校验，
+结果逐条写出，内存占用与语料大小无关；单行格式错误只影响该行。
+
+每行支持两种格式：
+    {"rooms": [...]}                                         # 直接是 design
+    {"id": "...", "design": {...} 或 "<raw LLM 输出>", "requirements": {...}}  # 带包装
+
+用法（项目根目录）：
+    python -m constraint_checker.stream_check corpus.jsonl.gz -o results.jsonl
+"""
+import argparse
+import contextlib
+import gzip
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+from design_ir import parse_design_to_graph, graph_to_json_dict
+from .validator import validate_design_report
+
+logger = logging.getLogger(__name__)
+
+
+def _open_text(path: Union[Path, str], mode: str = "r"):
+    """按后缀透明打开 .gz / 普通文本文件"""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def iter_jsonl(path: Union[Path, str]) -> Iterator[Tuple[int, str]]:
+    """逐行产出 (行号, 原始行)，跳过空行；不会把整个文件读入内存"""
+    with _open_text(path) as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if line:
+                yield line_no, line
+
+
+def _validate_line(line_no: int, line: str, requirements, rule_plan) -> dict:
+    try:
+        obj = json.loads(line)
+        if not isinstance(obj, dict):
+            raise ValueError("每行必须是 JSON 对象")
+        record_id = obj.get("id")
+        design = obj.get("design", obj)
+        line_requirements = obj.get("requirements", requirements)
+
+        graph = parse_design_to_graph(design, fix_json=True)
+        normalized = graph_to_json_dict(graph)
+        ok, violations = validate_design_report(normalized, line_requirements, rule_plan)
+        return {
+            "line": line_no,
+            "id": record_id,
+            "ok": ok,
+            "message": violations[0]["message"] if violations else "Design valid",
+            "violations": [v["rule"] for v in violations],
+        }
+    except Exception as e:
+        # 单行错误隔离：记录后继续处理下一行
+        return {"line": line_no, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def validate_stream(
+    lines: Iterable[Tuple[int, str]],
+    requirements: Optional[dict] = None,
+    rule_plan=None
+) -> Iterator[dict]:
+    """对 (行号, 行内容) 流逐条校验，产出结果记录（生成器）"""
+    for line_no, line in lines:
+        yield _validate_line(line_no, line, requirements, rule_plan)
+
+
+def stream_validate_file(
+    input_path: Union[Path, str],
+    output_path: Optional[Union[Path, str]] = None,
+    requirements: Optional[dict] = None,
+    rule_plan=None,
+    report_every: int = 10000
+) -> dict:
+    """
+    流式校验整个语料文件，结果逐条写入 output_path（.gz 自动压缩，None 输出到 stdout）
+    :return: 汇总 {"lines", "passed", "failed", "errors", "elapsed_s", "lines_per_s"}
+    """
+    summary = {"lines": 0, "passed": 0, "failed": 0, "errors": 0}
+    start_time = time.time()
+    out = _open_text(output_path, "w") if output_path else sys.stdout
+    # 结果写入上面取得的句柄；处理期间 print() 一律转到 stderr，不会混入 stdout 上的 JSONL 结果流
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            for record in validate_stream(iter_jsonl(input_path), requirements, rule_plan):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                summary["lines"] += 1
+                if "error" in record:
+                    summary["errors"] += 1
+                elif record["ok"]:
+                    summary["passed"] += 1
+                else:
+                    summary["failed"] += 1
+
+                if report_every and summary["lines"] % report_every == 0:
+                    elapsed = time.time() - start_time
+                    logger.info(
+                        f"已处理 {summary['lines']} 行，{summary['lines'] / elapsed:.0f} lines/s"
+                    )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.time() - start_time
+    summary["elapsed_s"] = round(elapsed, 3)
+    summary["lines_per_s"] = round(summary["lines"] / elapsed, 1) if elapsed > 0 else None
+    logger.info(f"流式校验完成：{summary}")
+    return summary
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    arg_parser = argparse.ArgumentParser(description="流式校验 JSONL design 语料")
+    arg_parser.add_argument("input", help="JSONL 语料文件（支持 .gz）")
+    arg_parser.add_argument("-o", "--output", help="结果 JSONL 文件（支持 .gz），默认输出到 stdout")
+    arg_parser.add_argument("--requirements", help="所有行共用的 requirements.json（行内 requirements 优先）")
+    arg_parser.add_argument("--report-every", type=int, default=10000, help="每处理多少行报告一次吞吐")
+    args = arg_parser.parse_args()
+
+    shared_requirements = None
+    if args.requirements:
+        with open(args.requirements, "r", encoding="utf-8") as f:
+            shared_requirements = json.load(f)
+
+    stream_validate_file(
+        args.input,
+        args.output,
+        requirements=shared_requirements,
+        report_every=args.report_every
+    )
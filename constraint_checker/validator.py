@@ -118,46 +118,46 @@
 }'''
 
 # constraint_checker/validator.py
-# constraint_checker/validator.py
-from .rules import (
-    validate_basic_function,
-    validate_room_area,
-    validate_total_area,
-    validate_required_adjacency
-)
+from .context import build_validation_context
+from .rule_engine import get_default_rule_plan
+from .requirements_index import compile_requirements, check_requirements
 
-# 总校验入口
-def validate_design(design, requirements=None):
-    """
-    校验设计是否满足硬规则和用户显式约束
-    :param design: dict, JSON 格式设计数据
-    :param requirements: dict, 可选，包含用户显式约束（如 adjacency）
-    :return: tuple(bool, str), 是否通过及提示信息
-    """
-    # 1. 通用硬规则（不依赖用户输入）
-    validators = [
-        validate_basic_function,
-        validate_room_area,
-        validate_total_area
-    ]
 
-    for v in validators:
-        ok, msg = v(design)
-        if not ok:
-            return False, msg
+def _iter_violations(ctx, requirements=None, rule_plan=None):
+    """按规则顺序逐条产出违规，调用方可在首条违规处停止"""
+    # 1. 通用硬规则（不依赖用户输入），由编译后的规则计划执行
+    plan = rule_plan if rule_plan is not None else get_default_rule_plan()
+    yield from plan.iter_violations(ctx)
 
-    # 2. 用户显式约束（可选）
+    # 2. 用户显式约束（可选）：邻接 / 方位 / 面积，均为索引 O(1) 查找
     if requirements:
-        if "adjacency" in requirements:
-            ok, msg = validate_required_adjacency(
-                design, requirements["adjacency"]
-            )
-            if not ok:
-                return False, msg
+        yield from check_requirements(ctx, compile_requirements(requirements))
 
         # 未来可以加：
-        # if "orientation" in requirements:
         # if "priority" in requirements:
 
+
+# 总校验入口
+def validate_design(design, requirements=None, rule_plan=None):
+    """
+    校验设计是否满足硬规则和用户显式约束
+    :param design: dict, JSON 格式设计数据
+    :param requirements: dict 或 RequirementsIndex, 可选，用户显式约束（adjacency / direction / area）；
+                         多次校验同一约束时可先 compile_requirements 再传入
+    :param rule_plan: RulePlan, 可选，按请求替换规则集（默认 config/rules.yaml）
+    :return: tuple(bool, str), 是否通过及提示信息
+    """
+    ctx = build_validation_context(design)
+    for violation in _iter_violations(ctx, requirements, rule_plan):
+        return False, violation["message"]
     return True, "Design valid"
 
+
+def validate_design_report(design, requirements=None, rule_plan=None):
+    """
+    完整报告模式：共享一次上下文，运行全部规则并收集所有违规
+    :return: tuple(bool, list[dict]), 是否通过及违规列表（含 rule / message / rooms）
+    """
+    ctx = build_validation_context(design)
+    violations = list(_iter_violations(ctx, requirements, rule_plan))
+    return not violations, violations
@@ -4,7 +4,14 @@ design_ir 模块：定义空间设计方案的内部表示（IR）数据结构
 并提供将LLM输出的非结构化JSON转换为标准化DesignGraph的解析器。
 """
 # 导入核心类（而非零散函数），符合模块核心定位
-from .parser import parse_design_to_graph
+from .parser import parse_design_to_graph, graph_to_json_dict, clean_and_validate_json
+from .synthesis import is_fully_specified, synthesize_design
+from .compact import encode_compact, decode_compact
+from .zoning import ZONE_MIN_ROOMS, split_zones, zone_brief, merge_zone_graphs
 
 # 明确对外暴露的核心接口（只暴露类，隐藏内部实现细节）
-__all__ = ["parse_design_to_graph"]
\ No newline at end of file
+__all__ = ["parse_design_to_graph", "graph_to_json_dict", "clean_and_validate_json", "is_fully_specified", "synthesize_design",
+           # 紧凑输出编码
+           "encode_compact", "decode_compact",
+           # 分区生成（大型任务书）
+           "ZONE_MIN_ROOMS", "split_zones", "zone_brief", "merge_zone_graphs"]
\ No newline at end of file
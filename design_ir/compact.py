@@ -0,0 +1,121 @@
+# design_ir/compact.py
+"""
+紧凑的 design 编码：用 validator 说明中的单字母空间代号与短连接 / 方位代号，
+替代 {"type", "area", "adjacent_to": {"X": "by door in the north"}} 中反复出现的键名与短语，
+减少 LLM 的输出 token。
+
+格式（每行一个房间，也可用 ; 分隔）：
+    <代号><编号> <面积> <邻接>...
+    邻接 = <代号><编号>:<方位><连接>
+    方位：n / s / e / w（可省略，表示未知）；连接：d = by door，o = by connected space
+示例：
+    g1 3 a1:eo
+    a1 16 g1:wo d1:eo b1:sd
+    → Entry_1 (3㎡) 东侧开敞连接 LivingRoom_1；LivingRoom_1 (16㎡) ...
+
+方位语义与 adjacent_to 一致：a1 行中的 b1:sd 表示 BedRoom_1 位于 LivingRoom_1 的南侧，以门连接。
+"""
+import re
+from typing import Dict
+
+from .graph import ConnectionType, Direction, parse_adjacency_description
+
+# 空间代号（见 constraint_checker/validator.py 的规则说明）
+TYPE_CODES = {
+    "LivingRoom": "a",
+    "BedRoom": "b",
+    "Kitchen": "c",
+    "DiningRoom": "d",
+    "BathRoom": "e",
+    "Storage": "f",
+    "Entry": "g",
+    "Garage": "h",
+    "Garden": "j",
+    "Outdoor": "o",
+}
+CODE_TYPES = {code: room_type for room_type, code in TYPE_CODES.items()}
+
+DIRECTION_CODES = {
+    Direction.NORTH: "n",
+    Direction.SOUTH: "s",
+    Direction.EAST: "e",
+    Direction.WEST: "w",
+    Direction.UNKNOWN: "",
+}
+CONNECTION_CODES = {ConnectionType.DOOR: "d", ConnectionType.CONNECTED_SPACE: "o"}
+
+# 解码时直接映射为 adjacent_to 的规范短语：(方位代号, 连接代号) -> 描述
+_PHRASES = {
+    (d_code, c_code): (
+        f"{'by door' if conn is ConnectionType.DOOR else 'by connected space'}"
+        + (f" in the {direction.value}" if d_code else "")
+    )
+    for direction, d_code in DIRECTION_CODES.items()
+    for conn, c_code in CONNECTION_CODES.items()
+}
+
+_CODE = "[" + "".join(sorted(CODE_TYPES)) + "]"
+# 单遍扫描：房间头（代号+编号+面积）与邻接项交替出现，分隔符为空白 / ; / ,
+_TOKEN = re.compile(
+    rf"(?P<code>{_CODE})(?P<num>\d+)"
+    rf"(?:(?P<adj>:(?P<dir>[nsew]?)(?P<conn>[do]))|\s+(?P<area>\d+(?:\.\d+)?)(?![\d.]))"
+    r"|(?P<sep>[\s;,]+)"
+)
+
+
+def _room_code(name: str) -> str:
+    room_type, _, number = name.rpartition("_")
+    if room_type not in TYPE_CODES or not number.isdigit():
+        raise ValueError(f"Cannot encode room name: {name}")
+    return f"{TYPE_CODES[room_type]}{number}"
+
+
+def _format_area(area) -> str:
+    return f"{area:g}" if isinstance(area, (int, float)) else str(area)
+
+
+def encode_compact(design: dict) -> str:
+    """design dict → 紧凑文本（用于 prompt 示例与 token 对比）"""
+    lines = []
+    for room in design.get("rooms", []):
+        parts = [_room_code(room["type"]), _format_area(room.get("area"))]
+        for target, desc in (room.get("adjacent_to") or {}).items():
+            connection, direction = parse_adjacency_description(desc)
+            parts.append(f"{_room_code(target)}:{DIRECTION_CODES[direction]}{CONNECTION_CODES[connection]}")
+        lines.append(" ".join(parts))
+    return "\n".join(lines)
+
+
+def decode_compact(text: str) -> dict:
+    """
+    紧凑文本 → design dict（与 LLM 的 JSON 输出同构，可直接交给 Schema 校验与 parse_design_to_graph）
+    单遍 finditer 扫描；出现无法识别的片段时抛出 ValueError
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").partition("\n")[2]
+
+    rooms: Dict[str, dict] = {}
+    current = None
+    pos = 0
+    for match in _TOKEN.finditer(text):
+        if match.start() != pos:
+            break
+        pos = match.end()
+        if match.group("sep"):
+            continue
+        name = f"{CODE_TYPES[match.group('code')]}_{match.group('num')}"
+        if match.group("adj"):
+            if current is None:
+                raise ValueError(f"紧凑格式解析失败：邻接项出现在房间之前：{match.group(0)!r}")
+            current["adjacent_to"][name] = _PHRASES[(match.group("dir"), match.group("conn"))]
+        else:
+            area = match.group("area")
+            current = rooms.setdefault(name, {"type": name, "area": None, "adjacent_to": {}})
+            current["area"] = float(area) if "." in area else int(area)
+
+    if pos != len(text):
+        raise ValueError(f"紧凑格式解析失败，位置 {pos}：{text[pos:pos + 40]!r}")
+    if not rooms:
+        raise ValueError("紧凑格式解析失败：没有房间")
+    return {"rooms": list(rooms.values())}
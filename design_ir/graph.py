@@ -53,6 +53,26 @@ class Direction(Enum):
     UNKNOWN = "unknown"
 
 
+# 方位取反（A 在 B 的北侧 ⇔ B 在 A 的南侧）
+REVERSE_DIRECTION = {
+    Direction.NORTH: Direction.SOUTH,
+    Direction.SOUTH: Direction.NORTH,
+    Direction.EAST: Direction.WEST,
+    Direction.WEST: Direction.EAST,
+    Direction.UNKNOWN: Direction.UNKNOWN,
+}
+
+
+def parse_direction(value) -> Direction:
+    """'NORTH' / 'north' / Direction.NORTH -> Direction.NORTH"""
+    if isinstance(value, Direction):
+        return value
+    try:
+        return Direction(str(value).strip().lower())
+    except ValueError:
+        raise ValueError(f"Unknown direction: {value}")
+
+
 def parse_adjacency_description(desc: Optional[str]):
     """
     将自然语言/简述解析为结构化邻接语义
@@ -117,6 +137,14 @@ class SpatialGraph:
     """
     def __init__(self):
         self.rooms: Dict[str, RoomNode] = {}
+        # 解析 / 修正过程中产生的结构化诊断事件（替代逐条 print）
+        self.diagnostics: List[dict] = []
+
+    def add_diagnostic(self, kind: str, message: str, **fields) -> dict:
+        """记录一条诊断事件：{"kind", "message", ...附加字段}"""
+        event = {"kind": kind, "message": message, **fields}
+        self.diagnostics.append(event)
+        return event
 
     def add_room(self, room_name: str) -> RoomNode:
         if room_name in self.rooms:
@@ -148,18 +176,19 @@ class SpatialGraph:
     # 4. 最小一致性校验
     # =========================
 
-    def check_bidirectional(self):
+    def check_bidirectional(self) -> List[dict]:
         """
-        邻接应当是双向的（软校验，只给 warning）
+        邻接应当是双向的（软校验，不抛异常）
+        返回缺失反向边的诊断事件，同时记入 self.diagnostics
         """
+        events = []
         for room in self.rooms.values():
             for adj in room.adjacencies:
-                back_refs = [
-                    a for a in adj.target.adjacencies
-                    if a.target == room
-                ]
-                if not back_refs:
-                    print(
-                        f"⚠️ Warning: adjacency not bidirectional: "
-                        f"{room.name} -> {adj.target.name}"
-                    )
+                if not any(a.target is room for a in adj.target.adjacencies):
+                    events.append(self.add_diagnostic(
+                        "adjacency.not_bidirectional",
+                        f"adjacency not bidirectional: {room.name} -> {adj.target.name}",
+                        source=room.name,
+                        target=adj.target.name,
+                    ))
+        return events
@@ -5,7 +5,7 @@ import re
 from pathlib import Path
 from typing import Dict, Any, Optional
 
-from .graph import SpatialGraph, RoomNode, AdjacencyEdge, ConnectionType, Direction
+from .graph import SpatialGraph, RoomNode, AdjacencyEdge, ConnectionType, Direction, REVERSE_DIRECTION
 
 
 # -------------------- JSON 清洗 --------------------
@@ -84,14 +84,8 @@ def build_graph_from_json(design: Dict[str, Any]) -> SpatialGraph:
         node.area = room.get("area", 0)
 
     # 2. 添加邻接边（修改这部分逻辑，自动补全缺失的房间）
-    # 定义枚举方向的反向映射（核心修正点）
-    reverse_direction_enum_map = {
-        Direction.NORTH: Direction.SOUTH,
-        Direction.SOUTH: Direction.NORTH,
-        Direction.EAST: Direction.WEST,
-        Direction.WEST: Direction.EAST,
-        Direction.UNKNOWN: Direction.UNKNOWN
-    }
+    # 枚举方向的反向映射（核心修正点）
+    reverse_direction_enum_map = REVERSE_DIRECTION
 
     for room in design.get("rooms", []):
         source_name = room["type"]
@@ -99,7 +93,9 @@ def build_graph_from_json(design: Dict[str, Any]) -> SpatialGraph:
         for target_name, desc in room.get("adjacent_to", {}).items():
             # 核心修改1：如果目标房间不存在，自动补全到 graph 中
             if target_name not in graph.rooms:
-                print(f"动补全缺失的房间节点：{target_name}")
+                graph.add_diagnostic(
+                    "room.autocreated", f"自动补全缺失的房间节点：{target_name}", room=target_name
+                )
                 # 解析目标房间名称，自动添加节点
                 try:
                     target_type, target_id = parse_room_type(target_name)
@@ -149,7 +145,9 @@ def build_graph_from_json(design: Dict[str, Any]) -> SpatialGraph:
     # 补全缺失的节点（确保add_adjacency不会报KeyError）
     for room_name in all_related_rooms:
         if room_name not in graph.rooms:
-            print(f"校验阶段补全缺失节点：{room_name}")
+            graph.add_diagnostic(
+                "room.autocreated", f"校验阶段补全缺失节点：{room_name}", room=room_name
+            )
             try:
                 graph.add_room(room_name)
                 graph.rooms[room_name].area = 0
@@ -190,7 +188,12 @@ def build_graph_from_json(design: Dict[str, Any]) -> SpatialGraph:
             if adj_edge is None:
                 # 仅当主方向不是UNKNOWN时才补充（避免无意义的UNKNOWN反向）
                 if main_direction != Direction.UNKNOWN:
-                    print(f"🔧 补充反向连接：{adj_room_name} -> {main_room_name}（以{main_room_name}为准）")
+                    graph.add_diagnostic(
+                        "edge.reverse_added",
+                        f"补充反向连接：{adj_room_name} -> {main_room_name}（以{main_room_name}为准）",
+                        source=adj_room_name,
+                        target=main_room_name,
+                    )
                     graph.add_adjacency(
                         adj_room_name,
                         main_room_name,
@@ -212,10 +215,23 @@ def build_graph_from_json(design: Dict[str, Any]) -> SpatialGraph:
                     )
 
                 if need_fix:
-                    print(f"🔧 修正不匹配的反向连接：{adj_room_name} -> {main_room_name}")
-                    print(f"   原信息：连接类型={adj_conn_type.value}，方向={adj_direction.value}")
-                    print(f"   修正为：连接类型={main_conn_type.value}，方向={expected_adj_direction.value}（以{main_room_name}为准）")
-                    
+                    # 主方向为 UNKNOWN 时保留原方向
+                    new_direction = (
+                        expected_adj_direction
+                        if expected_adj_direction is not None
+                        else adj_direction
+                    )
+                    graph.add_diagnostic(
+                        "edge.reverse_fixed",
+                        f"修正不匹配的反向连接：{adj_room_name} -> {main_room_name}（以{main_room_name}为准）",
+                        source=adj_room_name,
+                        target=main_room_name,
+                        old_connection=adj_conn_type.value,
+                        old_direction=adj_direction.value,
+                        new_connection=main_conn_type.value,
+                        new_direction=new_direction.value,
+                    )
+
                     # 步骤1：删除旧的不匹配边（遍历并过滤）
                     adj_room.adjacencies = [
                         edge for edge in adj_room.adjacencies 
@@ -226,11 +242,7 @@ def build_graph_from_json(design: Dict[str, Any]) -> SpatialGraph:
                         adj_room_name,
                         main_room_name,
                         connection_type=main_conn_type,
-                        direction=(
-                            expected_adj_direction
-                            if expected_adj_direction is not None
-                            else adj_direction  # 保留原方向
-                        )
+                        direction=new_direction
                     )
 
     # 步骤4：额外补充：修正UNKNOWN方向（可选，基于双向映射推导）
@@ -248,40 +260,62 @@ def build_graph_from_json(design: Dict[str, Any]) -> SpatialGraph:
                 if reverse_edge:
                     # 反向推导正确方向
                     correct_direction = reverse_direction_enum_map[reverse_edge.direction]
-                    print(f"🔧 推导UNKNOWN方向：{room_name} -> {edge.target.name} 从 unknown 修正为 {correct_direction.value}")
+                    graph.add_diagnostic(
+                        "direction.inferred",
+                        f"推导UNKNOWN方向：{room_name} -> {edge.target.name} 从 unknown 修正为 {correct_direction.value}",
+                        source=room_name,
+                        target=edge.target.name,
+                        direction=correct_direction.value,
+                    )
                     # 删除旧边，添加修正后的新边
                     room_node.adjacencies = [e for e in room_node.adjacencies if not (e.target.name == edge.target.name and e.direction == Direction.UNKNOWN)]
                     graph.add_adjacency(room_name, edge.target.name, edge.connection_type, correct_direction)
 
-    # 步骤5：打印校验结果（可选，便于验证）
-    print("\n 校验修正完成，当前节点列表：")
-    for idx, room_name in enumerate(room_appear_order):
-        if room_name in graph.rooms:
-            adj_count = len(graph.rooms[room_name].adjacencies)
-            # 统计有效方向数
-            valid_dir_count = sum(1 for e in graph.rooms[room_name].adjacencies if e.direction != Direction.UNKNOWN)
-            print(f"   [{idx+1}] {room_name} - 邻接关系数：{adj_count}（有效方向数：{valid_dir_count}）")
-
     # ===================== 校验逻辑结束 =====================
     
     return graph
 
 
-def parse_design_to_graph(content: str, fix_json: bool = True) -> SpatialGraph:
+def parse_design_to_graph(content, fix_json: bool = True) -> SpatialGraph:
     """
-    接收 raw LLM 输出或 JSON 文件内容，返回 SpatialGraph
+    接收 raw LLM 输出或 JSON 文件内容（也可直接传入已解析的 dict），返回 SpatialGraph
     """
-    if fix_json:
+    if isinstance(content, dict):
+        design_json = content
+    elif fix_json:
         design_json = clean_and_validate_json(content)
     else:
         design_json = json.loads(content)
 
     graph = build_graph_from_json(design_json)
-    # 可选：检查邻接双向性
+    # 可选：检查邻接双向性（结果记入 graph.diagnostics）
     graph.check_bidirectional()
     return graph
 
 
+# -------------------- Graph → JSON --------------------
+def graph_to_json_dict(spatial_graph):
+    """把 SpatialGraph 转回原始 JSON 格式的字典"""
+    rooms = []
+    for room_node in spatial_graph.rooms.values():
+        # 构建邻接关系字典
+        adjacent_to = {}
+        for adj_edge in room_node.adjacencies:
+            # 还原邻接描述字符串（如 "by door in the north"）
+            direction = adj_edge.direction.value
+            connection = "by door" if adj_edge.connection_type.value == "door" else "by connected space"
+            desc = f"{connection} in the {direction}"
+            adjacent_to[adj_edge.target.name] = desc
+        
+        rooms.append({
+            "type": room_node.name,
+            "area": room_node.area,
+            "adjacent_to": adjacent_to
+        })
+
+    return {"rooms": rooms}
+
+
 def parse_design_file(file_path: str) -> SpatialGraph:
     """从 JSON 文件生成 SpatialGraph"""
     file_path = Path(file_path)
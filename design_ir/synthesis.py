@@ -0,0 +1,123 @@
+# design_ir/synthesis.py
+"""
+确定性方案合成：当任务书已完整给出每个房间的面积与邻接关系时，
+直接由 requirements 构造 design JSON（rooms / adjacent_to 格式），无需调用 LLM。
+
+“完整”的判定：
+- 所有房间名合法（<RoomType>_<N>，类型属于 ROOM_TYPES）
+- 每个房间都给出了面积
+- 多于一个房间时，每个房间至少参与一条邻接（方位约束隐含邻接）
+- 方位值合法
+信息不全时返回 None，由调用方回退到 LLM 生成。
+"""
+from typing import Dict, List, Optional
+
+from .graph import REVERSE_DIRECTION, parse_direction, parse_room_name
+
+# 私密 / 附属空间用门连接，其余为开敞连接（与 prompt 示例的惯例一致）
+DOOR_ROOM_TYPES = {"BedRoom", "BathRoom", "Storage", "Garage"}
+
+
+def _connection(room_a: str, room_b: str) -> str:
+    types = {room_a.split("_")[0], room_b.split("_")[0]}
+    return "by door" if types & DOOR_ROOM_TYPES else "by connected space"
+
+
+def _ordered_rooms(requirements: dict) -> List[str]:
+    """按首次出现顺序收集约束中的全部房间（面积 → 邻接 → 方位）"""
+    rooms = dict.fromkeys(requirements.get("area") or {})
+    for a, b in requirements.get("adjacency") or []:
+        rooms.setdefault(a)
+        rooms.setdefault(b)
+    for a, targets in (requirements.get("direction") or {}).items():
+        rooms.setdefault(a)
+        for b in targets:
+            rooms.setdefault(b)
+    return list(rooms)
+
+
+def _adjacency_pairs(requirements: dict) -> List[tuple]:
+    """必需邻接对 + 仅以方位给出的房间对（方位约束隐含邻接），按无序对去重"""
+    pairs, seen = [], set()
+    declared = [tuple(pair) for pair in requirements.get("adjacency") or []]
+    implied = [
+        (a, b)
+        for a, targets in (requirements.get("direction") or {}).items()
+        for b in targets
+    ]
+    for pair in declared + implied:
+        key = frozenset(pair)
+        if key not in seen:
+            seen.add(key)
+            pairs.append(pair)
+    return pairs
+
+
+def is_fully_specified(requirements: Optional[dict]) -> bool:
+    """requirements 是否足以不经 LLM 直接合成方案"""
+    if not requirements:
+        return False
+    rooms = _ordered_rooms(requirements)
+    if not rooms:
+        return False
+
+    if any(len(pair) != 2 for pair in requirements.get("adjacency") or []):
+        return False
+    try:
+        for targets in (requirements.get("direction") or {}).values():
+            for value in targets.values():
+                parse_direction(value)
+    except ValueError:
+        return False
+    areas = requirements.get("area") or {}
+    linked = {room for pair in _adjacency_pairs(requirements) for room in pair}
+
+    for room in rooms:
+        try:
+            parse_room_name(room)
+        except ValueError:
+            return False
+        if not isinstance(areas.get(room), (int, float)):
+            return False
+        if len(rooms) > 1 and room not in linked:
+            return False
+    return True
+
+
+def synthesize_design(requirements: Optional[dict]) -> Optional[dict]:
+    """
+    由完整的 requirements 合成 design；信息不全时返回 None
+    方位约定：direction[A][B] = D 表示 A 位于 B 的 D 侧，
+    即 B 的 adjacent_to[A] 写 D，A 的 adjacent_to[B] 写 D 的反向
+    """
+    if not is_fully_specified(requirements):
+        return None
+
+    directions = {
+        (a, b): parse_direction(value)
+        for a, targets in (requirements.get("direction") or {}).items()
+        for b, value in targets.items()
+    }
+    areas = requirements["area"]
+    rooms: Dict[str, dict] = {
+        name: {"type": name, "area": areas[name], "adjacent_to": {}}
+        for name in _ordered_rooms(requirements)
+    }
+
+    for a, b in _adjacency_pairs(requirements):
+        connection = _connection(a, b)
+        if (a, b) in directions:
+            a_of_b = directions[(a, b)]
+        elif (b, a) in directions:
+            a_of_b = REVERSE_DIRECTION[directions[(b, a)]]
+        else:
+            a_of_b = None
+
+        if a_of_b is None:
+            rooms[a]["adjacent_to"][b] = connection
+            rooms[b]["adjacent_to"][a] = connection
+        else:
+            rooms[b]["adjacent_to"][a] = f"{connection} in the {a_of_b.value}"
+            rooms[a]["adjacent_to"][b] = f"{connection} in the {REVERSE_DIRECTION[a_of_b].value}"
+
+    return {"rooms": list(rooms.values())}
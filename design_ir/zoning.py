@@ -0,0 +1,192 @@
+# design_ir/zoning.py
+"""
+分区生成：大型任务书（多户型楼层、30+ 房间）按 requirements 的邻接连通分量拆成若干分区，
+每个分区单独生成（较小的 prompt 与输出，可并发），再按跨区约束把各分区的 SpatialGraph 拼接成整体。
+
+- split_zones:        邻接连通分量 → 分区；超过 max_rooms 的分量按 BFS 顺序切块，小分量合并装箱
+- zone_brief:         由分区内约束渲染出该分区的设计意图文本
+- merge_zone_graphs:  合并各分区 SpatialGraph，并补上跨区邻接边
+"""
+from collections import deque
+from typing import Dict, List, Optional
+
+from .graph import (
+    ConnectionType,
+    Direction,
+    REVERSE_DIRECTION,
+    SpatialGraph,
+    parse_direction,
+)
+from .synthesis import _adjacency_pairs, _connection, _ordered_rooms
+
+# 房间数达到该值时启用分区生成；每个分区最多容纳的房间数
+ZONE_MIN_ROOMS = 16
+ZONE_MAX_ROOMS = 10
+
+
+class Zone:
+    """一个分区：房间列表 + 只含区内约束的 requirements"""
+    def __init__(self, index: int, rooms: List[str], requirements: dict):
+        self.index = index
+        self.rooms = rooms
+        self.requirements = requirements
+
+
+def _zone_requirements(rooms: List[str], requirements: dict) -> dict:
+    """从全局 requirements 中筛出两端都在区内的约束"""
+    members = set(rooms)
+    direction = {}
+    for a, targets in (requirements.get("direction") or {}).items():
+        if a not in members:
+            continue
+        inner = {b: d for b, d in targets.items() if b in members}
+        if inner:
+            direction[a] = inner
+    return {
+        "area": {r: v for r, v in (requirements.get("area") or {}).items() if r in members},
+        "adjacency": [
+            list(pair) for pair in requirements.get("adjacency") or []
+            if len(pair) == 2 and pair[0] in members and pair[1] in members
+        ],
+        "direction": direction,
+    }
+
+
+def split_zones(requirements: Optional[dict], max_rooms: int = ZONE_MAX_ROOMS) -> List[Zone]:
+    """
+    按邻接连通分量拆分分区（方位约束隐含邻接）
+    超过 max_rooms 的分量按 BFS 顺序切成相邻的块，块间的约束成为跨区连接；
+    互不相连的小分量合并到同一分区（区内无约束连接，不产生跨区边）
+    """
+    if not requirements:
+        return []
+    rooms = _ordered_rooms(requirements)
+    neighbors: Dict[str, List[str]] = {room: [] for room in rooms}
+    for pair in _adjacency_pairs(requirements):
+        if len(pair) != 2:
+            continue
+        a, b = pair
+        neighbors[a].append(b)
+        neighbors[b].append(a)
+
+    # 1. 连通分量（BFS 顺序保证切块后每块内部尽量相连）
+    components, visited = [], set()
+    for start in rooms:
+        if start in visited:
+            continue
+        visited.add(start)
+        order, queue = [], deque([start])
+        while queue:
+            room = queue.popleft()
+            order.append(room)
+            for nb in neighbors[room]:
+                if nb not in visited:
+                    visited.add(nb)
+                    queue.append(nb)
+        components.append(order)
+
+    # 2. 大分量切块；小分量按 first-fit 装入已有分区，避免为零散房间单独调用 LLM
+    chunks: List[List[str]] = []
+    for order in components:
+        for i in range(0, len(order), max_rooms):
+            part = order[i:i + max_rooms]
+            target = next((c for c in chunks if len(c) + len(part) <= max_rooms), None)
+            if target is None:
+                chunks.append(list(part))
+            else:
+                target.extend(part)
+    return [Zone(i, chunk, _zone_requirements(chunk, requirements)) for i, chunk in enumerate(chunks)]
+
+
+def cross_zone_pairs(zones: List[Zone], requirements: dict) -> List[tuple]:
+    """两端分属不同分区的邻接对（含方位隐含的邻接）"""
+    zone_of = {room: zone.index for zone in zones for room in zone.rooms}
+    return [
+        tuple(pair) for pair in _adjacency_pairs(requirements)
+        if len(pair) == 2 and zone_of.get(pair[0]) != zone_of.get(pair[1])
+    ]
+
+
+def zone_brief(zone: Zone) -> str:
+    """把分区约束渲染为与 user_input.txt 同样写法的设计意图文本"""
+    req = zone.requirements
+    areas = req["area"]
+    lines = [f"- Rooms in this zone (generate ONLY these rooms): {', '.join(zone.rooms)}"]
+    for room in zone.rooms:
+        if room in areas:
+            lines.append(f"- {room} ({areas[room]}㎡)")
+
+    directed = set()
+    for a, targets in req["direction"].items():
+        for b, d in targets.items():
+            directed.add(frozenset((a, b)))
+            lines.append(f"- {a} is {str(d).upper()} of {b}")
+    for a, b in req["adjacency"]:
+        if frozenset((a, b)) not in directed:
+            lines.append(f"- {a} is adjacent to {b}")
+    return "\n".join(lines)
+
+
+def merge_zone_graphs(
+    zone_graphs: List[SpatialGraph],
+    zones: List[Zone],
+    requirements: dict,
+) -> SpatialGraph:
+    """
+    拼接各分区的 SpatialGraph：
+    1. 区内房间归属本区；不属于任何分区的额外房间（如 LLM 补充的 Entry）先到先得
+    2. 只保留两端都归属本区的边（指向其他分区房间的边由跨区约束重新生成）
+    3. 按跨区约束补双向边，方位与 synthesize_design 的约定一致
+    """
+    merged = SpatialGraph()
+    zone_of = {room: zone.index for zone in zones for room in zone.rooms}
+    kept: Dict[str, int] = {}
+
+    # 1. 房间
+    for zone, graph in zip(zones, zone_graphs):
+        for name, node in graph.rooms.items():
+            owner = zone_of.get(name)
+            if owner == zone.index or (owner is None and name not in kept):
+                merged.add_room(name).area = node.area
+                kept[name] = zone.index
+            else:
+                merged.add_diagnostic(
+                    "zone.room_dropped",
+                    f"zone {zone.index} generated {name} owned by another zone",
+                    zone=zone.index, room=name,
+                )
+        for event in graph.diagnostics:
+            merged.diagnostics.append({**event, "zone": zone.index})
+
+    # 2. 区内边
+    for zone, graph in zip(zones, zone_graphs):
+        for name, node in graph.rooms.items():
+            if kept.get(name) != zone.index:
+                continue
+            for edge in node.adjacencies:
+                if kept.get(edge.target.name) == zone.index:
+                    merged.add_adjacency(name, edge.target.name, edge.connection_type, edge.direction)
+
+    # 3. 跨区边
+    directions = {
+        (a, b): parse_direction(value)
+        for a, targets in (requirements.get("direction") or {}).items()
+        for b, value in targets.items()
+    }
+    for a, b in cross_zone_pairs(zones, requirements):
+        if a not in merged.rooms or b not in merged.rooms:
+            merged.add_diagnostic(
+                "zone.link_missing", f"cross-zone link {a}-{b} refers to a room that was not generated",
+                source=a, target=b,
+            )
+            continue
+        connection = ConnectionType.DOOR if _connection(a, b) == "by door" else ConnectionType.CONNECTED_SPACE
+        if (a, b) in directions:
+            a_of_b = directions[(a, b)]
+        elif (b, a) in directions:
+            a_of_b = REVERSE_DIRECTION[directions[(b, a)]]
+        else:
+            a_of_b = Direction.UNKNOWN
+        merged.add_adjacency(b, a, connection, a_of_b)
+        merged.add_adjacency(a, b, connection, REVERSE_DIRECTION[a_of_b])
+    return merged
@@ -1,9 +1,21 @@
 # intent/__init__.py
 """
-intent 模块：提供JSON Schema
+intent 模块：提供JSON Schema（示意结构 + 由房间规则生成的严格 Schema 与本地校验器）
 """
 # 导入核心函数和变量
 from .intent_schema import intent_schema
+from .schema_builder import (
+    DESIGN_SCHEMA,
+    build_design_schema,
+    build_response_format,
+    provider_schema,
+    compile_schema,
+    validate_design_json,
+)
 
 # 明确对外暴露的接口
-__all__ = ["intent_schema"]
\ No newline at end of file
+__all__ = [
+    "intent_schema",
+    # 严格 JSON Schema 与预编译校验器
+    "DESIGN_SCHEMA", "build_design_schema", "build_response_format", "provider_schema", "compile_schema", "validate_design_json",
+]
\ No newline at end of file
@@ -0,0 +1,304 @@
+# intent/schema_builder.py
+"""
+由 ROOM_TYPES、合法连接方式 / 方位与各类型面积范围生成严格的 design JSON Schema，
+并提供预编译的本地校验器：在 build_graph_from_json 之前拒绝不合规输出
+（如 "Dining_1" 这类非法类型、字符串面积、自由文本的邻接描述），便于低成本重试。
+
+- build_design_schema:   生成 JSON Schema（draft 2020-12 子集）
+- build_response_format: 包装为 chat/completions 的 json_schema response_format（只发送供应商普遍支持的结构子集，
+                         非 strict；正则、按类型面积范围等完整约束只在本地校验）
+- compile_schema:        把 Schema 预编译为校验闭包（只支持本模块生成的关键字子集）
+- validate_design_json:  用预编译的默认 Schema 校验 design dict，返回错误列表
+"""
+import re
+from typing import Callable, List, Optional
+
+from design_ir.graph import ROOM_TYPES, Direction
+from constraint_checker.rule_engine import get_default_rule_plan
+
+# ---- 邻接描述的合法取值（与 prompt 中的 ALLOWED_CONNECTIONS / ALLOWED_DIRECTIONS 一致） ----
+CONNECTIONS = ["by door", "by connected space"]
+DIRECTIONS = [d.value for d in Direction if d is not Direction.UNKNOWN]
+
+# 兼容两种写法："by door in the north"（graph_to_json_dict 的输出）与 "north by door"（prompt 示例）
+_DIRECTION_ALT = "|".join(DIRECTIONS)
+_CONNECTION_ALT = "|".join(CONNECTIONS)
+ADJACENCY_PATTERN = (
+    rf"^(?:(?:in the )?(?:{_DIRECTION_ALT}) )?(?:{_CONNECTION_ALT})(?: in the (?:{_DIRECTION_ALT}))?$"
+)
+
+
+def room_name_pattern(room_types=None) -> str:
+    types = sorted(ROOM_TYPES if room_types is None else room_types)
+    return rf"^(?:{'|'.join(types)})_[0-9]+$"
+
+
+def build_design_schema(room_types=None, area_limits=None) -> dict:
+    """
+    生成严格的 design Schema：
+    - type:        <RoomType>_<N>，类型限定在 ROOM_TYPES
+    - area:        数值（不接受字符串），并按类型限定面积范围
+    - adjacent_to: 键为合法房间名，值为合法的“连接 + 方位”描述
+    :param area_limits: {类型: (min, max)}，默认取 config/rules.yaml 规则计划中的 type_ranges
+    """
+    area_limits = get_default_rule_plan().type_ranges() if area_limits is None else area_limits
+    name_pattern = room_name_pattern(room_types)
+
+    # 每个类型一条 if/then：房间名匹配该类型时限定面积范围
+    area_rules = [
+        {
+            "if": {
+                "required": ["type"],
+                "properties": {"type": {"pattern": rf"^{room_type}_[0-9]+$"}},
+            },
+            "then": {"properties": {"area": {"minimum": mn, "maximum": mx}}},
+        }
+        for room_type, (mn, mx) in sorted(area_limits.items())
+    ]
+    room_schema = {
+        "type": "object",
+        "required": ["type", "area", "adjacent_to"],
+        "additionalProperties": False,
+        "properties": {
+            "type": {"type": "string", "pattern": name_pattern},
+            "area": {"type": "number", "exclusiveMinimum": 0},
+            "adjacent_to": {
+                "type": "object",
+                "propertyNames": {"pattern": name_pattern},
+                "additionalProperties": {"type": "string", "pattern": ADJACENCY_PATTERN},
+            },
+        },
+        "allOf": area_rules,
+    }
+    return {
+        "$schema": "https://json-schema.org/draft/2020-12/schema",
+        "title": "design",
+        "type": "object",
+        "required": ["rooms"],
+        "additionalProperties": False,
+        "properties": {
+            "rooms": {"type": "array", "minItems": 1, "items": room_schema},
+        },
+    }
+
+
+# 供应商结构化输出普遍支持的关键字；其余（pattern / propertyNames / allOf / 数值范围等）只在本地校验
+_PROVIDER_KEYWORDS = {"type", "required", "properties", "additionalProperties", "items", "title", "description"}
+
+
+def provider_schema(schema: dict) -> dict:
+    """去掉供应商不支持的关键字，得到可发送的结构子集（对象 / 数组 / 基本类型与必填字段）"""
+    result = {}
+    for key, value in schema.items():
+        if key not in _PROVIDER_KEYWORDS:
+            continue
+        if key == "properties":
+            value = {name: provider_schema(sub) for name, sub in value.items()}
+        elif key in ("items", "additionalProperties") and isinstance(value, dict):
+            value = provider_schema(value)
+        result[key] = value
+    return result
+
+
+def build_response_format(schema: Optional[dict] = None, name: str = "design") -> dict:
+    """
+    chat/completions 的结构化输出参数（供应商支持 json_schema 时使用）
+    adjacent_to 是键不固定的映射，无法满足 strict 模式“所有对象 additionalProperties: false”的要求，
+    因此以非 strict 方式发送结构子集，完整 Schema 仍由 validate_design_json 在本地校验
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "strict": False,
+            "schema": provider_schema(build_design_schema() if schema is None else schema),
+        },
+    }
+
+
+# =========================
+# 预编译校验器
+# =========================
+
+Checker = Callable[[object, str, List[str]], None]
+
+_TYPE_CHECKS = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    # bool 是 int 的子类，需要单独排除
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+}
+
+
+def _matches(check: Checker, value) -> bool:
+    errors: List[str] = []
+    check(value, "", errors)
+    return not errors
+
+
+def compile_schema(schema: dict) -> Checker:
+    """
+    把 Schema 编译为校验闭包：正则、类型判断与子 Schema 只在编译时处理一次，
+    校验时只做一次遍历。遇到不支持的关键字直接报错，避免静默放行。
+    """
+    unknown = set(schema) - _KNOWN_KEYWORDS
+    if unknown:
+        raise ValueError(f"Unsupported schema keywords: {sorted(unknown)}")
+
+    checks = [
+        compiler(schema)
+        for keywords, compiler in _COMPILERS
+        if any(keyword in schema for keyword in keywords)
+    ]
+
+    def check(value, path: str, errors: List[str]) -> None:
+        for c in checks:
+            c(value, path, errors)
+
+    return check
+
+
+def _compile_type(schema: dict) -> Checker:
+    expected = schema["type"]
+    is_type = _TYPE_CHECKS[expected]
+
+    def check(value, path, errors):
+        if not is_type(value):
+            errors.append(f"{path or '$'}: expected {expected}, got {type(value).__name__}")
+    return check
+
+
+def _compile_required(schema: dict) -> Checker:
+    required = schema["required"]
+
+    def check(value, path, errors):
+        if isinstance(value, dict):
+            for key in required:
+                if key not in value:
+                    errors.append(f"{path or '$'}: missing required property '{key}'")
+    return check
+
+
+def _compile_properties(schema: dict) -> Checker:
+    """properties + additionalProperties（False 或子 Schema）"""
+    props = {key: compile_schema(sub) for key, sub in (schema.get("properties") or {}).items()}
+    extra = schema.get("additionalProperties", True)
+    extra_check = compile_schema(extra) if isinstance(extra, dict) else None
+
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            return
+        for key, item in value.items():
+            sub_path = f"{path}.{key}"
+            if key in props:
+                props[key](item, sub_path, errors)
+            elif extra is False:
+                errors.append(f"{path or '$'}: unexpected property '{key}'")
+            elif extra_check is not None:
+                extra_check(item, sub_path, errors)
+    return check
+
+
+def _compile_property_names(schema: dict) -> Checker:
+    pattern = re.compile(schema["propertyNames"]["pattern"])
+
+    def check(value, path, errors):
+        if isinstance(value, dict):
+            for key in value:
+                if not pattern.search(key):
+                    errors.append(f"{path or '$'}: invalid property name '{key}'")
+    return check
+
+
+def _compile_pattern(schema: dict) -> Checker:
+    raw = schema["pattern"]
+    pattern = re.compile(raw)
+
+    def check(value, path, errors):
+        if isinstance(value, str) and not pattern.search(value):
+            errors.append(f"{path or '$'}: '{value}' does not match {raw}")
+    return check
+
+
+def _compile_bounds(schema: dict) -> Checker:
+    bounds = [
+        (schema[key], op, symbol)
+        for key, op, symbol in (
+            ("minimum", lambda v, b: v >= b, ">="),
+            ("maximum", lambda v, b: v <= b, "<="),
+            ("exclusiveMinimum", lambda v, b: v > b, ">"),
+        )
+        if key in schema
+    ]
+
+    def check(value, path, errors):
+        if _TYPE_CHECKS["number"](value):
+            for bound, op, symbol in bounds:
+                if not op(value, bound):
+                    errors.append(f"{path or '$'}: {value} is not {symbol} {bound}")
+    return check
+
+
+def _compile_items(schema: dict) -> Checker:
+    item_check = compile_schema(schema["items"]) if "items" in schema else None
+    min_items = schema.get("minItems", 0)
+
+    def check(value, path, errors):
+        if not isinstance(value, list):
+            return
+        if len(value) < min_items:
+            errors.append(f"{path or '$'}: expected at least {min_items} items")
+        if item_check is not None:
+            for i, item in enumerate(value):
+                item_check(item, f"{path}[{i}]", errors)
+    return check
+
+
+def _compile_all_of(schema: dict) -> Checker:
+    """allOf；分支可为 {"if": ..., "then": ...}（if 不满足时跳过该分支）"""
+    branches = []
+    for sub in schema["allOf"]:
+        if "if" in sub:
+            branches.append((compile_schema(sub["if"]), compile_schema(sub.get("then", {}))))
+        else:
+            branches.append((None, compile_schema(sub)))
+
+    def check(value, path, errors):
+        for condition, then in branches:
+            if condition is None or _matches(condition, value):
+                then(value, path, errors)
+    return check
+
+
+# (触发关键字, 编译函数)：同一组关键字只编译为一个闭包
+_COMPILERS = [
+    (("type",), _compile_type),
+    (("required",), _compile_required),
+    (("properties", "additionalProperties"), _compile_properties),
+    (("propertyNames",), _compile_property_names),
+    (("pattern",), _compile_pattern),
+    (("minimum", "maximum", "exclusiveMinimum"), _compile_bounds),
+    (("items", "minItems"), _compile_items),
+    (("allOf",), _compile_all_of),
+]
+_KNOWN_KEYWORDS = {"$schema", "title", "description"} | {
+    keyword for keywords, _ in _COMPILERS for keyword in keywords
+}
+
+
+# ---- 默认 Schema 与校验器（导入时编译一次） ----
+DESIGN_SCHEMA = build_design_schema()
+_DESIGN_CHECK = compile_schema(DESIGN_SCHEMA)
+
+
+def validate_design_json(design, schema: Optional[dict] = None) -> List[str]:
+    """
+    校验 design dict，返回错误列表（空列表表示合规）
+    :param schema: 自定义 Schema；默认使用预编译的 DESIGN_SCHEMA
+    """
+    check = _DESIGN_CHECK if schema is None else compile_schema(schema)
+    errors: List[str] = []
+    check(design, "", errors)
+    return errors
@@ -3,9 +3,26 @@
 LLM 模块：提供大模型调用和提示词模板功能
 """
 # 导入核心函数和变量
-from .call_llm import call_llm
+from .call_llm import call_llm, call_llm_detailed, estimate_max_tokens
 from .prompts import build_intention_prompt
-from .intention_parser import parse_intention_to_requirements
+from .intention_parser import parse_intention_to_requirements, extract_requirements
+from .cassette import Cassette, CassetteMiss
+from .call_llm import set_cassette
+from .call_llm import get_scheduler, set_scheduler
+from .scheduler import RateLimitScheduler, RateLimitTimeout, llm_priority
+from .call_llm import get_router, set_router, choose_model
+from .router import ModelRouter
+from .retrieval import ExemplarIndex, get_exemplar_index, set_exemplar_index, retrieve_exemplars
 
 # 明确对外暴露的接口
-__all__ = ["call_llm", "build_intention_prompt", "parse_intention_to_requirements"]
\ No newline at end of file
+__all__ = [
+    "call_llm", "call_llm_detailed", "estimate_max_tokens", "build_intention_prompt", "parse_intention_to_requirements", "extract_requirements",
+    # 录制 / 回放
+    "Cassette", "CassetteMiss", "set_cassette",
+    # 出站限流调度
+    "RateLimitScheduler", "RateLimitTimeout", "llm_priority", "get_scheduler", "set_scheduler",
+    # 多模型路由
+    "ModelRouter", "get_router", "set_router", "choose_model",
+    # 历史方案检索（few-shot 示例）
+    "ExemplarIndex", "get_exemplar_index", "set_exemplar_index", "retrieve_exemplars",
+]
\ No newline at end of file
@@ -2,19 +2,50 @@
 
 import os
 import time
+import random
+import logging
 import requests
+from email.utils import parsedate_to_datetime
+from typing import Optional
 
 from utils.io import read_yaml, MODEL_CONFIG_YAML
+from utils.deadline import RequestCancelled, current_deadline
+from .cassette import Cassette, load_cassette_from_config
+from .scheduler import RateLimitScheduler, estimate_tokens, load_scheduler_from_config
+from .router import ModelRouter, load_router_from_config
+from intent.schema_builder import build_response_format
 
 MODEL_CONFIG = read_yaml(MODEL_CONFIG_YAML)
 
 LLM_CFG = MODEL_CONFIG["llm"]
 GEN_CFG = LLM_CFG["generation"]
+STRUCTURED_CFG = LLM_CFG.get("structured_output") or {}
+# 供应商支持 json_schema 时，用由房间规则生成的严格 Schema 替换 json_object
+if STRUCTURED_CFG.get("response_format") == "json_schema":
+    GEN_CFG = {**GEN_CFG, "response_format": build_response_format()}
 RETRY_CFG = LLM_CFG["retry"]
 
-QWEN_URL = LLM_CFG["url"]
+# 允许通过环境变量覆盖接口地址（如指向本地模拟服务做离线压测；对路由中的所有模型生效）
+URL_OVERRIDE = os.getenv("LLM_API_URL")
+QWEN_URL = URL_OVERRIDE or LLM_CFG["url"]
 MODEL_NAME = LLM_CFG["model"]
 SYSTEM_PROMPT = MODEL_CONFIG["system_prompt"]
+COMPACT_SYSTEM_PROMPT = MODEL_CONFIG.get("compact_system_prompt") or SYSTEM_PROMPT
+TRUNCATION_CFG = {
+    "max_continuations": 2,
+    "tokens_per_room": 80,
+    "tokens_per_room_compact": 24,
+    "base_tokens": 64,
+    "min_tokens": 512,
+    "max_tokens": 4096,
+    **(LLM_CFG.get("truncation") or {}),
+}
+CONTINUE_PROMPT = (
+    "Your previous reply was cut off. Continue EXACTLY from where it stopped. "
+    "Output only the remaining text, do not repeat anything already written."
+)
+
+logger = logging.getLogger(__name__)
 
 
 def get_api_key() -> str:
@@ -22,7 +53,7 @@ def get_api_key() -> str:
     获取 API Key（优先使用配置文件的 fallback 值，环境变量兜底）
     修复点：
     1. 优先返回 fallback 值，而非环境变量
-    2. 清除会话中残留的旧环境变量（可选）
+    2. 保留环境变量，保证同一进程内可重复调用
     3. 增加调试信息和异常处理
     """
     # 调试：打印当前配置和环境变量状态
@@ -30,10 +61,11 @@ def get_api_key() -> str:
     fallback_key = LLM_CFG.get("api_key_fallback")
     env_key = os.getenv(env_name) if env_name else None
     
-    print(f"===== API Key 加载调试 =====")
-    print(f"配置的环境变量名：{env_name}")
-    print(f"会话中环境变量值：{env_key[:6]}...{env_key[-4:]} if env_key else 'None'")
-    print(f"配置文件 fallback 值：{fallback_key[:6]}...{fallback_key[-4:]} if fallback_key else 'None'")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("===== API Key 加载调试 =====")
+        logger.debug("配置的环境变量名：%s", env_name)
+        logger.debug("会话中环境变量值：%s", f"{env_key[:6]}...{env_key[-4:]}" if env_key else "None")
+        logger.debug("配置文件 fallback 值：%s", f"{fallback_key[:6]}...{fallback_key[-4:]}" if fallback_key else "None")
     
     # 核心修复：优先使用 fallback 值，环境变量仅作为兜底
     # 如果你想彻底禁用环境变量，直接返回 fallback_key 即可
@@ -48,55 +80,313 @@ def get_api_key() -> str:
             f"- 环境变量 {env_name} 值：{env_key}"
         )
     
-    # 可选：清除会话中残留的旧环境变量（彻底避免干扰）
-    if env_name and env_name in os.environ:
-        del os.environ[env_name]
-        print(f"✅ 已清除会话中残留的 {env_name} 环境变量")
-    
-    print(f"✅ 最终使用的 API Key：{final_key[:6]}...{final_key[-4:]}")
+    # 注意：不能在这里删除环境变量，否则同一进程（如 api 服务）中
+    # 第二次调用起就读取不到 Key
+    logger.debug("最终使用的 API Key：%s...%s", final_key[:6], final_key[-4:])
     return final_key
 
 
-def call_llm(prompt: str) -> str:
+# ---- 录制 / 回放 ----
+_CASSETTE = None
+_CASSETTE_LOADED = False
+
+
+def get_cassette() -> Optional[Cassette]:
+    """按配置与环境变量惰性加载 cassette（未启用时为 None）"""
+    global _CASSETTE, _CASSETTE_LOADED
+    if not _CASSETTE_LOADED:
+        _CASSETTE = load_cassette_from_config(LLM_CFG)
+        _CASSETTE_LOADED = True
+    return _CASSETTE
+
+
+def set_cassette(cassette: Optional[Cassette]) -> None:
+    """以代码方式启用 / 关闭 cassette（覆盖配置）"""
+    global _CASSETTE, _CASSETTE_LOADED
+    _CASSETTE, _CASSETTE_LOADED = cassette, True
+
+
+# ---- 出站限流调度 ----
+_SCHEDULER = None
+_SCHEDULER_LOADED = False
+
+
+def get_scheduler() -> Optional[RateLimitScheduler]:
+    """按 llm.rate_limit 配置惰性创建进程内共享的调度器（未启用时为 None）"""
+    global _SCHEDULER, _SCHEDULER_LOADED
+    if not _SCHEDULER_LOADED:
+        _SCHEDULER = load_scheduler_from_config(LLM_CFG)
+        _SCHEDULER_LOADED = True
+    return _SCHEDULER
+
+
+def set_scheduler(scheduler: Optional[RateLimitScheduler]) -> None:
+    """以代码方式启用 / 关闭限流调度（覆盖配置）"""
+    global _SCHEDULER, _SCHEDULER_LOADED
+    _SCHEDULER, _SCHEDULER_LOADED = scheduler, True
+
+
+# ---- 多模型路由 ----
+_ROUTER = None
+
+
+def get_router() -> ModelRouter:
+    """按 llm.models / llm.routing 配置惰性创建进程内共享的模型路由器"""
+    global _ROUTER
+    if _ROUTER is None:
+        _ROUTER = load_router_from_config(LLM_CFG)
+    return _ROUTER
+
+
+def set_router(router: ModelRouter) -> None:
+    """以代码方式替换模型路由器（覆盖配置）"""
+    global _ROUTER
+    _ROUTER = router
+
+
+def choose_model() -> dict:
     """
-    调用 LLM，仅返回原始文本输出
+    本次请求的模型路由决策（见 ModelRouter.choose）
+    启用 cassette（录制 / 回放）时固定使用 llm.model：录制键包含 model，路由结果随统计变化会导致回放未命中
     """
-    api_key = get_api_key()
-    if not api_key:
-        raise RuntimeError("LLM API Key 未配置")
+    if get_cassette() is not None:
+        return {"model": MODEL_NAME, "reason": "pinned", "expected_time": None, "scores": {}}
+    return get_router().choose()
 
-    payload = {
-        "model": MODEL_NAME,
-        "messages": [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt}
-        ],
-        **GEN_CFG
-    }
 
+def _model_url(model: str) -> str:
+    """模型对应的接口地址：环境变量覆盖 > 模型自身配置 > llm.url"""
+    return URL_OVERRIDE or get_router().url_of(model) or LLM_CFG["url"]
+
+
+def _backoff(retry: int) -> float:
+    """指数退避 + 抖动，避免被限流的请求同时重试"""
+    return RETRY_CFG["retry_delay"] * (2 ** retry) * random.uniform(0.5, 1.0)
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After：秒数或 HTTP 日期；无法解析时返回 None（由调用方退避）"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def _request_completion(payload: dict, api_key: str, url: str = QWEN_URL) -> dict:
+    """
+    发送一次 chat/completions 请求（含超时 / 限流重试），
+    返回 {"content", "usage", "finish_reason", "latency"}
+    启用限流调度时每次发送前先按预估 token 取得配额，收到 429 时暂停整个调度器
+    遵守当前请求的截止时间：连接 / 读超时不超过剩余预算，任何网络异常都先检查截止时间，退避等待可被取消，超时 / 取消时抛出 RequestCancelled
+    """
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}"
     }
+    scheduler = get_scheduler()
+    deadline = current_deadline()
 
     for retry in range(RETRY_CFG["max_retries"]):
+        deadline.check("llm")
+        ticket = scheduler.acquire(estimate_tokens(payload)) if scheduler is not None else None
         try:
+            start = time.perf_counter()
             response = requests.post(
-                QWEN_URL,
+                url,
                 json=payload,
                 headers=headers,
                 timeout=(
-                    RETRY_CFG["timeout"]["connect"],
-                    RETRY_CFG["timeout"]["read"]
+                    deadline.cap(RETRY_CFG["timeout"]["connect"]),
+                    deadline.cap(RETRY_CFG["timeout"]["read"])
                 ),
                 verify=False
             )
 
+            if response.status_code == 429:
+                retry_after = _retry_after_seconds(response.headers.get("Retry-After"))
+                delay = retry_after if retry_after is not None else _backoff(retry)
+                if scheduler is not None:
+                    scheduler.penalize(delay)
+                if retry < RETRY_CFG["max_retries"] - 1:
+                    logger.info("LLM 接口限流（429），%.1fs 后重试", delay)
+                    # 有调度器时由 acquire 统一等待暂停结束，否则在此退避
+                    if scheduler is None:
+                        deadline.sleep(delay, "llm_retry")
+                    continue
+                raise RuntimeError("LLM 接口持续限流（429）")
+
             result = response.json()
-            return result["choices"][0]["message"]["content"]
+            if scheduler is not None:
+                scheduler.settle(ticket, (result.get("usage") or {}).get("total_tokens"))
+            choice = result["choices"][0]
+            return {
+                "content": choice["message"]["content"],
+                "usage": result.get("usage"),
+                "finish_reason": choice.get("finish_reason"),
+                "latency": time.perf_counter() - start,
+            }
 
         except requests.exceptions.ReadTimeout:
+            # 读超时可能是被截断到剩余预算所致：预算用尽时直接结束
+            deadline.check("llm")
             if retry < RETRY_CFG["max_retries"] - 1:
-                time.sleep(RETRY_CFG["retry_delay"])
+                deadline.sleep(_backoff(retry), "llm_retry")
                 continue
-            raise RuntimeError("LLM 多次超时")
\ No newline at end of file
+            raise RuntimeError("LLM 多次超时")
+        except requests.exceptions.RequestException:
+            # 连接超时 / 连接错误同样可能源于被截断的预算或已取消的请求：先按截止时间结束，
+            # 避免被当作供应商错误计入路由统计
+            deadline.check("llm")
+            raise
+
+
+def _send(payload: dict) -> dict:
+    """
+    发送一次请求；启用 cassette 时 replay 直接返回录制结果，record 调用后写入录制
+    真实调用的耗时与成败记入模型路由器（回放与请求取消不计）
+    """
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == "replay":
+        return cassette.replay(payload)
+
+    api_key = get_api_key()
+    if not api_key:
+        raise RuntimeError("LLM API Key 未配置")
+
+    model = payload["model"]
+    start = time.perf_counter()
+    try:
+        completion = _request_completion(payload, api_key, _model_url(model))
+    except RequestCancelled:
+        raise
+    except Exception:
+        get_router().record_call(model, time.perf_counter() - start, ok=False)
+        raise
+    get_router().record_call(model, completion["latency"], ok=True)
+    if cassette is not None and cassette.mode == "record":
+        cassette.record(payload, completion)
+    return completion
+
+
+def estimate_max_tokens(n_rooms: int, compact: bool = False) -> int:
+    """按任务书房间数估算输出 token 上限（紧凑格式每个房间所需 token 更少）"""
+    per_room = TRUNCATION_CFG["tokens_per_room_compact" if compact else "tokens_per_room"]
+    budget = TRUNCATION_CFG["base_tokens"] + per_room * max(n_rooms, 0)
+    return int(min(max(budget, TRUNCATION_CFG["min_tokens"]), TRUNCATION_CFG["max_tokens"]))
+
+
+def _completion_tokens(completion: dict) -> int:
+    """优先使用 usage；供应商未返回时按字符数粗略估算"""
+    usage = completion.get("usage") or {}
+    if usage.get("completion_tokens") is not None:
+        return int(usage["completion_tokens"])
+    return len(completion.get("content") or "") // 4
+
+
+# 续写去重的最短重叠：过短的重合（如 "}" 或单个数字）多半是巧合，去掉会删掉真实内容
+CONTINUATION_MIN_OVERLAP = 16
+
+
+def _join_continuation(
+    prefix: str,
+    continuation: str,
+    max_overlap: int = 200,
+    min_overlap: int = CONTINUATION_MIN_OVERLAP
+) -> str:
+    """
+    拼接续写内容；模型重复了截断处的末尾（至少 min_overlap 个字符）时去掉重叠部分
+
+    >>> _join_continuation('[{"X":"d"}', '}]}')
+    '[{"X":"d"}}]}'
+    >>> _join_continuation('"area": 1', '12')
+    '"area": 112'
+    >>> _join_continuation('{"type": "BedRoom_1", "area": 1', '"BedRoom_1", "area": 12}')
+    '{"type": "BedRoom_1", "area": 12}'
+    """
+    for size in range(min(max_overlap, len(prefix), len(continuation)), min_overlap - 1, -1):
+        if prefix.endswith(continuation[:size]):
+            return prefix + continuation[size:]
+    return prefix + continuation
+
+
+def call_llm_detailed(
+    prompt: str,
+    compact: bool = False,
+    max_tokens: Optional[int] = None,
+    model: Optional[str] = None
+) -> dict:
+    """
+    调用 LLM 并返回输出与元信息：
+    {"content", "finish_reason", "usage": {"prompt_tokens", "completion_tokens"},
+     "continuations", "completion_tokens_saved"}
+    输出因 max_tokens 被截断（finish_reason = length）时，带上已生成的部分发起续写请求，
+    而不是交给 fix_incomplete_json 补括号（会静默丢掉房间）或整体重新生成。
+    completion_tokens_saved：与“加大 max_tokens 整体重新生成”相比，不必重复生成的输出 token 数
+    :param compact: 请求紧凑格式输出（不发送 JSON response_format，使用对应的 system prompt）
+    :param max_tokens: 覆盖配置中的 max_tokens（通常由 estimate_max_tokens 按房间数给出）
+    :param model: 使用的模型（通常由 get_router().choose() 给出），默认 llm.model
+    """
+    gen_cfg = dict(GEN_CFG)
+    if compact:
+        gen_cfg.pop("response_format", None)
+    if max_tokens:
+        gen_cfg["max_tokens"] = int(max_tokens)
+    messages = [
+        {"role": "system", "content": COMPACT_SYSTEM_PROMPT if compact else SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    payload = {"model": model or MODEL_NAME, "messages": messages, **gen_cfg}
+
+    completion = _send(payload)
+    content = completion["content"]
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+    generated = 0
+    continuations, saved = 0, 0
+
+    while True:
+        usage["prompt_tokens"] += int((completion.get("usage") or {}).get("prompt_tokens") or 0)
+        usage["completion_tokens"] += _completion_tokens(completion)
+        generated += _completion_tokens(completion)
+        if completion.get("finish_reason") != "length" or continuations >= TRUNCATION_CFG["max_continuations"]:
+            break
+
+        # 续写：已生成的部分作为 assistant 消息，要求从截断处继续（续写片段不是完整 JSON，不发送 response_format）
+        continuations += 1
+        saved += generated
+        logger.info("LLM 输出被截断（%d tokens），发起第 %d 次续写", generated, continuations)
+        continue_payload = {
+            **{k: v for k, v in payload.items() if k != "response_format"},
+            "messages": messages + [
+                {"role": "assistant", "content": content},
+                {"role": "user", "content": CONTINUE_PROMPT},
+            ],
+        }
+        completion = _send(continue_payload)
+        content = _join_continuation(content, completion["content"])
+
+    return {
+        "content": content,
+        "finish_reason": completion.get("finish_reason"),
+        "usage": usage,
+        "continuations": continuations,
+        "completion_tokens_saved": saved,
+    }
+
+
+def call_llm(
+    prompt: str,
+    compact: bool = False,
+    max_tokens: Optional[int] = None,
+    model: Optional[str] = None
+) -> str:
+    """
+    调用 LLM，仅返回原始文本输出（截断时自动续写，详见 call_llm_detailed）
+    启用 cassette 时：replay 模式直接返回录制结果，record 模式调用后写入录制
+    """
+    return call_llm_detailed(prompt, compact=compact, max_tokens=max_tokens, model=model)["content"]
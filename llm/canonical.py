@@ -0,0 +1,194 @@
+# llm/canonical.py
+"""
+任务书规范化：在 extract_requirements 的基础上，把语义相同但写法不同的任务书（空白、大小写、
+子句顺序、房间编号不同）归一为同一份排序后的约束表示，作为流水线结果缓存的键。
+
+- 房间名大小写按已知空间类型归一（kitchen_2 → Kitchen_2），方位统一大写
+- 方位约束按规范房间名定向（B 在 A 南侧 ≡ A 在 B 北侧）
+- 房间编号与书写顺序无关：同类型房间按“面积 + 邻接 / 方位结构”的迭代签名（WL 细化）排序后重新编号，
+  签名完全相同的房间才按原编号决定顺序
+- 置信度：关系匹配覆盖的文本比例；匹配之外仍出现房间名（如 "Entry_1 (3㎡) is SOUTH of ..." 中
+  未被识别的方位）视为提取不完整，调用方应退回精确匹配
+- 显式传入的约束同样按文本计算置信度，且必须与从文本提取的约束规范一致（约束完整覆盖任务书），
+  否则视为不完整：只由约束生成的键会让内容无关、约束相同（如都为空）的任务书共用结果
+"""
+import hashlib
+import json
+import re
+from typing import Dict, Optional
+
+from design_ir.graph import ROOM_TYPES
+from .intention_parser import RELATION_PATTERN, extract_requirements
+
+_TYPE_NAMES = {room_type.lower(): room_type for room_type in ROOM_TYPES}
+_OPPOSITE = {"NORTH": "SOUTH", "SOUTH": "NORTH", "EAST": "WEST", "WEST": "EAST"}
+_ROOM_NAME = re.compile(r"\b([A-Za-z]+)_(\d+)\b")
+_RESIDUAL_ROOM = re.compile(
+    r"\b(?:[A-Za-z]+_\d+|" + "|".join(sorted(ROOM_TYPES, key=lambda t: (-len(t), t))) + r")\b", re.IGNORECASE
+)
+_WORD = re.compile(r"[^\W_]+")
+# 匹配之外可忽略的连接词 / 客套词（不影响约束）
+_FILLER = {
+    "a", "an", "the", "and", "of", "with", "is", "are", "to", "in", "on", "side", "it", "its", "has", "have",
+    "i", "we", "want", "need", "please", "design", "house", "home", "apartment", "plan", "layout", "room", "rooms",
+    "following", "should", "be", "must", "also",
+}
+# WL 细化轮数
+_REFINE_ROUNDS = 3
+
+
+class CanonicalBrief:
+    """
+    :ivar key: 规范约束的哈希（缓存键）
+    :ivar requirements: 规范化后的约束（排序、重新编号）
+    :ivar mapping: 原房间名 → 规范房间名
+    :ivar confidence: 关系匹配覆盖的文本比例（0~1）
+    :ivar partial: 匹配之外仍有房间名，提取不完整
+    """
+    def __init__(self, key: str, requirements: dict, mapping: Dict[str, str], confidence: float, partial: bool):
+        self.key = key
+        self.requirements = requirements
+        self.mapping = mapping
+        self.confidence = confidence
+        self.partial = partial
+
+    def confident(self, min_confidence: float) -> bool:
+        return not self.partial and self.confidence >= min_confidence
+
+
+def _normalize_room(name: str) -> str:
+    room_type, _, number = name.rpartition("_")
+    return f"{_TYPE_NAMES.get(room_type.lower(), room_type)}_{number}"
+
+
+def extraction_confidence(text: str):
+    """返回 (覆盖比例, 是否有未识别的房间名)；无任何匹配时为 (0, True)"""
+    covered, residual_parts = 0, []
+    for line in text.splitlines():
+        pos = 0
+        for match in RELATION_PATTERN.finditer(line):
+            covered += sum(len(w) for w in _WORD.findall(match.group(0)))
+            residual_parts.append(line[pos:match.start()])
+            pos = match.end()
+        residual_parts.append(line[pos:])
+    if not covered:
+        return 0.0, True
+    residual = " ".join(residual_parts)
+    significant = sum(len(w) for w in _WORD.findall(residual) if w.lower() not in _FILLER)
+    return covered / (covered + significant), bool(_RESIDUAL_ROOM.search(residual))
+
+
+def _refine_labels(rooms, areas, relations) -> Dict[str, str]:
+    """迭代签名：初始为 (类型, 面积)，每轮并入邻居的 (关系, 邻居签名) 多重集"""
+    labels = {room: json.dumps([room.rpartition("_")[0], areas.get(room)]) for room in rooms}
+    for _ in range(_REFINE_ROUNDS):
+        labels = {
+            room: hashlib.sha1(json.dumps(
+                [labels[room], sorted([rel, labels[other]] for rel, other in relations[room])]
+            ).encode("utf-8")).hexdigest()
+            for room in rooms
+        }
+    return labels
+
+
+def canonicalize_brief(text: str, requirements: Optional[dict] = None, explicit: bool = False) -> CanonicalBrief:
+    """
+    任务书 → 规范约束与缓存键
+    :param requirements: 已从 text 提取（或显式传入）的约束；为 None 时从 text 提取
+    :param explicit: 约束为调用方显式传入；此时还需与从 text 提取的约束规范一致，否则标记为不完整
+    """
+    if requirements is None:
+        requirements = extract_requirements(text)
+        explicit = False
+    confidence, partial = extraction_confidence(text)
+    canon = _canonicalize(requirements, confidence, partial)
+    if explicit and not canon.partial:
+        extracted = _canonicalize(extract_requirements(text), confidence, partial)
+        if extracted.key != canon.key:
+            canon.partial = True
+    return canon
+
+
+def _canonicalize(requirements: dict, confidence: float, partial: bool) -> CanonicalBrief:
+    # 1. 名称与方位归一
+    areas = {_normalize_room(r): a for r, a in (requirements.get("area") or {}).items()}
+    pairs = {frozenset(map(_normalize_room, pair)) for pair in requirements.get("adjacency") or []}
+    directions = {
+        (_normalize_room(a), _normalize_room(b), d.upper())
+        for a, targets in (requirements.get("direction") or {}).items()
+        for b, d in targets.items()
+    }
+    originals = {}
+    for name in list(requirements.get("area") or {}) + [r for p in requirements.get("adjacency") or [] for r in p] \
+            + [r for a, t in (requirements.get("direction") or {}).items() for r in (a, *t)]:
+        originals.setdefault(_normalize_room(name), name)
+    rooms = sorted(originals)
+    if not rooms:
+        # 没有任何约束：键与任务书内容无关，不能按意图共用
+        partial = True
+
+    # 2. 结构签名 → 同类型内按签名重新编号
+    relations = {room: [] for room in rooms}
+    for pair in pairs:
+        a, b = sorted(pair) if len(pair) == 2 else (next(iter(pair)),) * 2
+        relations[a].append(("adj", b))
+        relations[b].append(("adj", a))
+    for a, b, d in directions:
+        relations[a].append((f"dir:{d}", b))
+        relations[b].append((f"dir:{_OPPOSITE.get(d, d)}", a))
+    labels = _refine_labels(rooms, areas, relations)
+
+    def order(room):
+        room_type, _, number = room.rpartition("_")
+        return room_type, labels[room], int(number) if number.isdigit() else 0
+
+    canon, counters = {}, {}
+    for room in sorted(rooms, key=order):
+        room_type = room.rpartition("_")[0]
+        counters[room_type] = counters.get(room_type, 0) + 1
+        canon[room] = f"{room_type}_{counters[room_type]}"
+
+    # 3. 排序后的规范表示
+    oriented = set()
+    for a, b, d in directions:
+        a, b = canon[a], canon[b]
+        oriented.add((a, b, d) if a <= b else (b, a, _OPPOSITE.get(d, d)))
+    canonical = {
+        "area": {canon[r]: a for r, a in sorted(areas.items(), key=lambda item: canon[item[0]])},
+        "adjacency": sorted(sorted(canon[r] for r in pair) for pair in pairs),
+        "direction": sorted(list(t) for t in oriented),
+    }
+    key = hashlib.sha256(json.dumps(canonical, sort_keys=True).encode("utf-8")).hexdigest()
+    mapping = {originals[room]: canon[room] for room in rooms}
+    return CanonicalBrief(key, canonical, mapping, round(confidence, 4), partial)
+
+
+def translate_rooms(source: Dict[str, str], target: Dict[str, str], names) -> Dict[str, str]:
+    """
+    两份规范映射的复合：缓存方案中的房间名（source 原名）→ 新任务书中的房间名（target 原名）
+    缓存方案中不受约束的房间改用目标中未占用的编号，避免与重命名后的房间冲突
+    """
+    back = {canon: original for original, canon in target.items()}
+    mapping = {name: back[canon] for name, canon in source.items() if canon in back}
+    used = set(mapping.values())
+    for name in names:
+        if name in mapping:
+            continue
+        room_type, _, _ = name.rpartition("_")
+        number = 1
+        while f"{room_type}_{number}" in used:
+            number += 1
+        mapping[name] = f"{room_type}_{number}"
+        used.add(mapping[name])
+    return mapping
+
+
+def rename_rooms(value, mapping: Dict[str, str]):
+    """递归替换 dict 键 / 值、列表与字符串中的房间名（同时替换，互换编号也安全）"""
+    if isinstance(value, str):
+        return _ROOM_NAME.sub(lambda m: mapping.get(m.group(0), m.group(0)), value)
+    if isinstance(value, dict):
+        return {rename_rooms(k, mapping): rename_rooms(v, mapping) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [rename_rooms(v, mapping) for v in value]
+    return value
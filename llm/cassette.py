@@ -0,0 +1,139 @@
+# llm/cassette.py
+"""
+LLM 调用的录制 / 回放（cassette）：
+- record: 正常调用 LLM，并把 (请求哈希 → 原始输出、usage、耗时) 追加写入本地 JSONL
+- replay: 不访问网络，按请求哈希返回录制的输出；可按原始耗时或零耗时回放
+- off:    不启用（默认）
+
+请求哈希基于完整 payload（模型、消息、生成参数）的规范化 JSON，
+同一 prompt 在回放时总是得到同一输出，流水线结果因此完全可复现。
+文件后缀为 .gz 时自动压缩。
+
+配置：model_config.yaml 的 llm.cassette，环境变量优先：
+    LLM_CASSETTE_MODE=record|replay|off
+    LLM_CASSETTE_PATH=cassettes/llm_cassette.jsonl
+    LLM_CASSETTE_LATENCY=zero|original
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from utils.io import PROJECT_ROOT, LLM_CASSETTE_FILE, ensure_dir
+
+CASSETTE_MODES = ("off", "record", "replay")
+REPLAY_LATENCIES = ("zero", "original")
+
+
+class CassetteMiss(KeyError):
+    """回放模式下请求未被录制"""
+
+
+def request_key(payload: dict) -> str:
+    """请求哈希：payload 的规范化 JSON（键排序、无多余空白）的 sha256"""
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _open_text(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    """
+    JSONL 录制文件：每行一条 {"key", "content", "usage", "finish_reason", "latency"}
+    同一 key 多次录制时以最后一条为准
+    """
+
+    def __init__(self, path: Union[Path, str], mode: str = "replay", replay_latency: str = "zero"):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"未知 cassette 模式：{mode}（可选：{CASSETTE_MODES}）")
+        if replay_latency not in REPLAY_LATENCIES:
+            raise ValueError(f"未知回放耗时模式：{replay_latency}（可选：{REPLAY_LATENCIES}）")
+        self.path = Path(path)
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.records: Dict[str, dict] = {}
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with _open_text(self.path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    self.records[record["key"]] = record
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, payload: dict) -> bool:
+        return request_key(payload) in self.records
+
+    def record(self, payload: dict, completion: dict) -> dict:
+        """追加一条录制（completion 为 _request_completion 的返回值）"""
+        record = {
+            "key": request_key(payload),
+            "content": completion["content"],
+            "usage": completion.get("usage"),
+            "finish_reason": completion.get("finish_reason"),
+            "latency": round(completion.get("latency", 0.0), 4),
+        }
+        with self._lock:
+            ensure_dir(self.path.parent)
+            with _open_text(self.path, "a") as f:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self.records[record["key"]] = record
+            self.stats["recorded"] += 1
+        return record
+
+    def replay(self, payload: dict) -> dict:
+        """返回录制的 completion；replay_latency=original 时按原始耗时等待"""
+        key = request_key(payload)
+        with self._lock:
+            record = self.records.get(key)
+            self.stats["hits" if record else "misses"] += 1
+        if record is None:
+            raise CassetteMiss(f"cassette 中没有该请求的录制：{key[:12]}（{self.path}）")
+        if self.replay_latency == "original" and record.get("latency"):
+            time.sleep(record["latency"])
+        return dict(record)
+
+
+def load_cassette_from_config(llm_cfg: dict) -> Optional[Cassette]:
+    """按 llm.cassette 配置与环境变量构建 cassette；mode=off 时返回 None"""
+    cfg = llm_cfg.get("cassette") or {}
+    mode = os.getenv("LLM_CASSETTE_MODE") or cfg.get("mode") or "off"
+    if mode == "off":
+        return None
+    path = os.getenv("LLM_CASSETTE_PATH")
+    if not path:
+        # 配置文件中的相对路径按项目根目录解析
+        path = PROJECT_ROOT / cfg["path"] if cfg.get("path") else LLM_CASSETTE_FILE
+    replay_latency = os.getenv("LLM_CASSETTE_LATENCY") or cfg.get("replay_latency") or "zero"
+    return Cassette(path, mode=mode, replay_latency=replay_latency)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="查看 LLM cassette 录制文件")
+    arg_parser.add_argument("path", nargs="?", default=str(LLM_CASSETTE_FILE))
+    args = arg_parser.parse_args()
+
+    cassette = Cassette(args.path, mode="replay")
+    total_latency = sum(r.get("latency") or 0 for r in cassette.records.values())
+    total_tokens = sum((r.get("usage") or {}).get("total_tokens", 0) for r in cassette.records.values())
+    print(f"录制条数：{len(cassette)}")
+    print(f"原始总耗时：{total_latency:.1f}s")
+    print(f"原始总 tokens：{total_tokens}")
@@ -9,81 +9,124 @@ from utils.io import (
     read_text,        # 读取文本文件的方法
     write_json        # 写入JSON的方法
 )
+from design_ir.graph import ROOM_TYPES
 # 导入typing模块（适配低版本Python）
-from typing import Union, Optional
+from typing import Iterable, Union, Optional
 
-def parse_intention_to_requirements(output_path: Optional[Union[Path, str]] = None):
+# ---- 预编译的关系扫描器 ----
+# 房间：带编号的 <Type>_<N>，或已知房间类型的裸名称（补全为 _1）
+_ROOM = r"(?:[A-Za-z]+_\d+|(?:" + "|".join(sorted(ROOM_TYPES, key=lambda t: (-len(t), t))) + r")\b)"
+_DIRECTION = r"(?i:north|south|east|west)"
+# 房间列表：逗号 / and / 逗号 + and 分隔，房间后可带括号备注（如 BedRoom_1 (Master)）
+_ROOM_ITEM = rf"{_ROOM}(?:\s*\([^()]*\))?"
+_ROOM_SEP = r"\s*(?:,\s*(?:(?i:and)\s+)?|\s(?i:and)\s+)\s*"
+
+# 三类关系合并为一个带命名分组的正则，每行只需一次 finditer；
+# 开头的 \b 使扫描只在单词起点尝试匹配，避免在单词内部逐字符回溯
+RELATION_PATTERN = re.compile(
+    r"\b(?:"
+    # 面积：Kitchen_1 (6㎡) / Kitchen_1 (6.5 m²)
+    rf"(?P<area_room>[A-Za-z]+_\d+)\s*\(\s*(?P<area>\d+(?:\.\d+)?)\s*(?:㎡|m²|m2|(?i:sqm))\s*\)"
+    # 方位：Kitchen_1 is NORTH of DiningRoom_1（词间允许任意空白）
+    rf"|(?P<dir_room>{_ROOM})\s+(?i:is)\s+(?P<dir>{_DIRECTION})\s+(?i:of)\s+(?P<dir_target>{_ROOM})"
+    # 多房间邻接：LivingRoom_1 connects to BedRoom_1, BedRoom_2 and BedRoom_3 on SOUTH side
+    rf"|(?P<multi_room>{_ROOM})\s+(?i:connects\s+to)\s+(?P<multi_targets>{_ROOM_ITEM}(?:{_ROOM_SEP}{_ROOM_ITEM})*)"
+    rf"\s+(?i:on)\s+(?P<multi_dir>{_DIRECTION})\s+(?i:side)"
+    r")"
+)
+_ROOM_TOKEN = re.compile(_ROOM)
+
+
+def _room_id(name: str) -> str:
+    """裸房间类型补全编号：Kitchen -> Kitchen_1"""
+    return name if "_" in name else f"{name}_1"
+
+
+def _parse_area(value: str):
+    return float(value) if "." in value else int(value)
+
+
+def extract_requirements(source: Union[str, Iterable[str]]) -> dict:
     """
-    从user_input.txt中解析设计需求，生成config/requirements.json文件
-    :param output_path: 自定义输出路径（默认使用utils/io中定义的路径）
+    单遍扫描设计意图文本，提取面积 / 方位 / 邻接约束（纯内存，不读写文件）
+    :param source: 文本字符串，或逐行产出文本的流（文件对象、行迭代器）
+    :return: {"area": {...}, "adjacency": [[a, b], ...], "direction": {a: {b: D}}}
+             direction[A][B] = D 表示“A 位于 B 的 D 侧”
     """
-    # 使用统一路径，无传参则用默认的REQUIREMENTS_JSON
-    if output_path is None:
-        output_path = REQUIREMENTS_JSON
-    else:
-        output_path = Path(output_path)
-
-    # ========== 核心修改：读取user_input.txt文件内容 ==========
-    try:
-        # 调用io模块的read_text方法读取设计意图文本
-        intention_text = read_text(USER_INPUT_FILE).strip()
-        if not intention_text:
-            raise ValueError("user_input.txt文件内容为空，请检查文件")
-    except FileNotFoundError as e:
-        raise FileNotFoundError(f"设计意图文件读取失败：{e}")
-
-    # ========== 解析逻辑（完全复用原有逻辑，仅数据源改变） ==========
     requirements = {
         "area": {},
         "adjacency": [],
         "direction": {}
     }
+    seen_pairs = set()
 
-    lines = intention_text.split("\n")
+    def add_adjacency(a: str, b: str):
+        key = frozenset((a, b))
+        if key not in seen_pairs:
+            seen_pairs.add(key)
+            requirements["adjacency"].append([a, b])
+
+    lines = source.splitlines() if isinstance(source, str) else source
     for line in lines:
-        line = line.strip().lstrip("-").strip()
-        if not line:
-            continue
-
-        # 面积解析
-        area_match = re.search(r"(\w+_\d+) \((\d+)㎡\)", line)
-        if area_match:
-            room_id = area_match.group(1)
-            area = int(area_match.group(2))
-            requirements["area"][room_id] = area
-
-        # 邻接/方向解析
-        adj_dir_match = re.search(r"(\w+_\d+) is (\w+) of (\w+_\d?)", line)
-        if adj_dir_match:
-            room1 = adj_dir_match.group(1)
-            direction = adj_dir_match.group(2)
-            room2 = adj_dir_match.group(3)
-            if "_" not in room2:
-                room2 += "_1"
-            requirements["adjacency"].append([room1, room2])
-            if room1 not in requirements["direction"]:
-                requirements["direction"][room1] = {}
-            requirements["direction"][room1][room2] = direction
-
-        # 多房间邻接解析
-        multi_adj_match = re.search(r"(\w+_\d+) connects to (.*?) on (\w+) side", line)
-        if multi_adj_match:
-            main_room = multi_adj_match.group(1)
-            sub_rooms = [r.strip() for r in multi_adj_match.group(2).split(",")]
-            direction = multi_adj_match.group(3)
-            for sub_room in sub_rooms:
-                if "_" not in sub_room:
-                    sub_room += "_1"
-                requirements["adjacency"].append([main_room, sub_room])
-                if main_room not in requirements["direction"]:
-                    requirements["direction"][main_room] = {}
-                requirements["direction"][main_room][sub_room] = direction
-
-    # ========== 使用统一的write_json工具函数 ==========
-    write_json(output_path, requirements)
-    print(f"✅ requirements.json已生成：{output_path.absolute()}")
+        for match in RELATION_PATTERN.finditer(line):
+            # 面积解析
+            if match.group("area_room"):
+                requirements["area"][match.group("area_room")] = _parse_area(match.group("area"))
+
+            # 邻接/方位解析
+            elif match.group("dir_room"):
+                room1 = _room_id(match.group("dir_room"))
+                room2 = _room_id(match.group("dir_target"))
+                add_adjacency(room1, room2)
+                requirements["direction"].setdefault(room1, {})[room2] = match.group("dir")
+
+            # 多房间邻接解析
+            else:
+                main_room = _room_id(match.group("multi_room"))
+                direction = match.group("multi_dir")
+                for sub_room in _ROOM_TOKEN.findall(match.group("multi_targets")):
+                    sub_room = _room_id(sub_room)
+                    add_adjacency(main_room, sub_room)
+                    # direction[A][B] = D 统一表示“A 位于 B 的 D 侧”：这里是子房间位于主房间的该侧
+                    requirements["direction"].setdefault(sub_room, {})[main_room] = direction
+
+    return requirements
+
+
+def parse_intention_to_requirements(
+    output_path: Optional[Union[Path, str]] = None,
+    intention_text: Optional[str] = None,
+    export: bool = True
+):
+    """
+    解析设计需求，返回 requirements dict；文件导出仅为可选项
+    :param output_path: 自定义输出路径（默认使用utils/io中定义的路径）
+    :param intention_text: 设计意图文本；为 None 时读取 user_input.txt
+    :param export: 是否写出 requirements.json（按请求在内存中使用时应为 False，
+                   避免并发请求互相覆盖共享文件）
+    """
+    # ========== 读取设计意图：优先使用传入文本 ==========
+    if intention_text is None:
+        try:
+            # 调用io模块的read_text方法读取设计意图文本
+            intention_text = read_text(USER_INPUT_FILE)
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"设计意图文件读取失败：{e}")
+    intention_text = intention_text.strip()
+    if not intention_text:
+        raise ValueError("设计意图内容为空，请检查输入")
+
+    # ========== 解析逻辑：单遍扫描提取全部关系 ==========
+    requirements = extract_requirements(intention_text)
+
+    # ========== 可选导出：使用统一的write_json工具函数 ==========
+    if export:
+        # 使用统一路径，无传参则用默认的REQUIREMENTS_JSON
+        output_path = REQUIREMENTS_JSON if output_path is None else Path(output_path)
+        write_json(output_path, requirements)
+        print(f"✅ requirements.json已生成：{output_path.absolute()}")
     return requirements
 
 if __name__ == "__main__":
     # 直接调用，无需传路径（自动使用REQUIREMENTS_JSON）
-    parse_intention_to_requirements()
\ No newline at end of file
+    parse_intention_to_requirements()
@@ -1,10 +1,16 @@
 from pathlib import Path
+from typing import Optional
 # 导入io模块中的路径常量和读取方法
 from utils.io import (
     USER_INPUT_FILE,  # 对应 CONFIG_DIR / "user_input.txt"
     read_text         # 读取文本文件的方法
 )
 from intent import intent_schema
+from design_ir import encode_compact
+from design_ir.compact import TYPE_CODES
+from constraint_checker.rule_engine import get_default_rule_plan
+from .retrieval import render_exemplars
+import json
 
 PROMPT = """
 You are a strict architectural spatial constraint engine.
@@ -46,6 +52,40 @@ Output ONLY the JSON structure below, fill with correct values:
 {intent_schema}
 """
 
+# 紧凑输出格式（design_ir/compact.py）：单字母空间代号 + 短连接 / 方位代号，减少输出 token
+COMPACT_PROMPT = """
+You are a strict architectural spatial constraint engine.
+OUTPUT ONLY THE COMPACT FORMAT BELOW. NO JSON, NO EXPLANATION, NO MARKDOWN.
+
+Room codes: a=LivingRoom b=BedRoom c=Kitchen d=DiningRoom e=BathRoom f=Storage g=Entry h=Garage j=Garden o=Outdoor
+Room id = code + number (e.g. a1, b2).
+
+One line per room:
+<room id> <area> <neighbor>:<direction><connection> ...
+- area: number in square meters, within the allowed range:
+  {area_ranges}
+- direction (where the neighbor lies): n / s / e / w
+- connection: d = by door, o = by connected space
+- list every adjacency on BOTH rooms' lines, with opposite directions
+
+Example:
+g1 3 a1:eo
+a1 16 g1:wo d1:eo b1:sd
+d1 8 a1:wo c1:no
+c1 6 d1:so
+b1 12 a1:nd
+"""
+
+
+def compact_area_ranges() -> str:
+    """紧凑格式 prompt 中的面积范围（取自 config/rules.yaml 的规则计划），如 "a 12-22, b 9-18, ..." """
+    ranges = get_default_rule_plan().type_ranges()
+    return ", ".join(
+        f"{code} {ranges[room_type][0]:g}-{ranges[room_type][1]:g}"
+        for room_type, code in TYPE_CODES.items() if room_type in ranges
+    )
+
+
 def load_design_intention() -> str:
     """从user_input.txt文件中读取设计意图内容"""
     try:
@@ -58,16 +98,32 @@ def load_design_intention() -> str:
         # 可选：自定义异常提示，方便定位问题
         raise FileNotFoundError(f"设计意图文件读取失败：{e}")
 
-def build_intention_prompt(user_input: str) -> str:
-    """构建完整的prompt，包含动态读取的设计意图和用户输入"""
-    # 1. 读取设计意图内容
-    design_intention = load_design_intention()
-    # 2. 填充PROMPT模板中的设计意图占位符、JSON结构占位符
-    prompt_with_intention = PROMPT.format(intent_schema=intent_schema)
+def build_intention_prompt(
+    user_input: str,
+    compact: bool = False,
+    exemplars: Optional[list] = None,
+    token_budget: int = 800
+) -> str:
+    """
+    构建完整的prompt：模板 + 相似任务书的合规方案示例（可选）+ 本次请求的用户输入
+    （不再读取共享的 user_input.txt，prompt 只由请求参数决定）
+    :param compact: 使用紧凑输出格式的模板（输出需用 decode_compact 解码）
+    :param exemplars: llm/retrieval.py 检索到的示例 [{"brief", "design"}]，按输出格式编码后注入
+    :param token_budget: 示例部分的 token 上限，放不下的示例跳过
+    """
+    # 1. 填充PROMPT模板中的JSON结构占位符
+    prompt_with_intention = COMPACT_PROMPT.format(area_ranges=compact_area_ranges()) if compact else PROMPT.format(intent_schema=intent_schema)
+    # 2. 示例：与输出格式一致（紧凑格式 / 压缩 JSON），节省 prompt token
+    examples = ""
+    if exemplars:
+        encode = encode_compact if compact else (lambda d: json.dumps(d, ensure_ascii=False, separators=(",", ":")))
+        rendered = render_exemplars(exemplars, encode, token_budget)
+        if rendered:
+            examples = f"\nValidated designs for similar briefs (for reference only):\n\n{rendered}\n"
     # 3. 拼接用户输入（保持你原有逻辑）
     full_prompt = f"""
 {prompt_with_intention}
-
+{examples}
 Design intention:
 {user_input}
 """
@@ -0,0 +1,264 @@
+# llm/retrieval.py
+"""
+历史合规方案检索：对通过校验的任务书建立本地向量索引（特征哈希 + TF-IDF，纯 NumPy，无外部服务），
+生成时取最相似的 k 个方案作为 few-shot 示例注入 prompt，提高首轮通过率、减少重试。
+
+- 特征：任务书单词 / 相邻词对（房间编号去掉，BedRoom_2 → bedroom），外加 extract_requirements 提取的
+  关系（方位 / 邻接 / 面积档位），按 crc32 哈希到 dims 维
+- 存储：固定容量的行矩阵（次线性 tf），写满后覆盖最早的行；文档频率随增删增量维护
+- 查询：一次矩阵向量乘得到 TF-IDF 余弦相似度；行范数只在有新文档后重算一次
+"""
+import json
+import math
+import re
+import threading
+import time
+import zlib
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+
+from .intention_parser import extract_requirements
+
+_WORD = re.compile(r"[A-Za-z]+(?:_\d+)?|\d+(?:\.\d+)?")
+
+
+def _word(token: str) -> str:
+    return token.rpartition("_")[0].lower() if "_" in token else token.lower()
+
+
+def _room_type(name: str) -> str:
+    return name.rpartition("_")[0].lower()
+
+
+@lru_cache(maxsize=65536)
+def _feature_hash(feature: str) -> int:
+    """特征 → 稳定哈希（进程间一致；常见单词 / 关系反复出现，缓存后省去重复计算）"""
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+def brief_features(text: str, requirements: Optional[dict] = None) -> List[str]:
+    """任务书 → 特征列表（可重复，重复次数即词频）"""
+    words = [_word(t) for t in _WORD.findall(text)]
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    requirements = extract_requirements(text) if requirements is None else requirements
+    for room, area in (requirements.get("area") or {}).items():
+        if isinstance(area, (int, float)):
+            features.append(f"area:{_room_type(room)}:{int(area // 3)}")
+    for a, b in requirements.get("adjacency") or []:
+        features.append("adj:" + ":".join(sorted((_room_type(a), _room_type(b)))))
+    for a, targets in (requirements.get("direction") or {}).items():
+        for b, d in targets.items():
+            features.append(f"dir:{_room_type(a)}:{d.lower()}:{_room_type(b)}")
+    return features
+
+
+_UNKNOWN_SUFFIX = " in the unknown"
+
+
+def exemplar_design(design: dict) -> dict:
+    """
+    示例方案按 LLM 输出格式保存：graph_to_json_dict 把未知方位写成 "... in the unknown"，
+    该写法不满足 design Schema（validate_design_json 会拒绝），作为示例前去掉
+    """
+    return {
+        **design,
+        "rooms": [
+            {**room, "adjacent_to": {
+                target: desc[:-len(_UNKNOWN_SUFFIX)] if isinstance(desc, str) and desc.endswith(_UNKNOWN_SUFFIX) else desc
+                for target, desc in (room.get("adjacent_to") or {}).items()
+            }}
+            for room in design.get("rooms", [])
+        ],
+    }
+
+
+class ExemplarIndex:
+    """
+    :param dims: 哈希维数
+    :param capacity: 最多保留的方案数（写满后覆盖最早的）
+    """
+    def __init__(self, dims: int = 256, capacity: int = 5000):
+        self.dims = dims
+        self.capacity = capacity
+        self._tf = np.zeros((capacity, dims), dtype=np.float32)
+        self._tf_sq = np.zeros((capacity, dims), dtype=np.float32)
+        self._df = np.zeros(dims, dtype=np.float32)
+        self._norms = np.zeros(capacity, dtype=np.float32)
+        self._norms_stale = False
+        self._items = [None] * capacity
+        self._keys = {}
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {"added": 0, "duplicates": 0, "evicted": 0, "lookups": 0, "lookup_us": 0.0}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _vector(self, features: List[str]) -> np.ndarray:
+        counts = np.bincount(
+            [_feature_hash(f) % self.dims for f in features], minlength=self.dims
+        ).astype(np.float32)
+        nonzero = counts > 0
+        counts[nonzero] = 1.0 + np.log(counts[nonzero])
+        return counts
+
+    def _idf(self) -> np.ndarray:
+        return np.log((1.0 + self._size) / (1.0 + self._df)) + 1.0
+
+    def add(self, brief: str, design: dict, requirements: Optional[dict] = None) -> bool:
+        """加入一个通过校验的方案（按 Schema 格式保存，见 exemplar_design）；同一任务书（去首尾空白后相同）只保留一份"""
+        key = brief.strip()
+        vector = self._vector(brief_features(brief, requirements))
+        design = exemplar_design(design)
+        with self._lock:
+            if key in self._keys:
+                self.stats["duplicates"] += 1
+                return False
+            row = self._next
+            old = self._items[row]
+            if old is not None:
+                # 覆盖最早的行：撤销其文档频率
+                self._df -= self._tf[row] > 0
+                del self._keys[old[0]]
+                self.stats["evicted"] += 1
+            else:
+                self._size += 1
+            self._tf[row] = vector
+            self._tf_sq[row] = vector * vector
+            self._df += vector > 0
+            self._items[row] = (key, design)
+            self._keys[key] = row
+            self._next = (row + 1) % self.capacity
+            self._norms_stale = True
+            self.stats["added"] += 1
+        return True
+
+    def search(self, brief: str, k: int = 2, min_score: float = 0.0, requirements: Optional[dict] = None) -> List[dict]:
+        """最相似的 k 个方案（不含任务书完全相同的自身）：[{"score", "brief", "design"}]"""
+        start = time.perf_counter()
+        query = self._vector(brief_features(brief, requirements))
+        key = brief.strip()
+        with self._lock:
+            n = self._size
+            if n == 0:
+                return []
+            idf = self._idf()
+            if self._norms_stale:
+                self._norms[:n] = np.sqrt(self._tf_sq[:n] @ (idf * idf))
+                self._norms_stale = False
+            weighted = query * idf
+            q_norm = float(np.linalg.norm(weighted))
+            if q_norm == 0:
+                return []
+            scores = (self._tf[:n] @ (weighted * idf)) / (self._norms[:n] * q_norm + 1e-9)
+            if key in self._keys:
+                scores[self._keys[key]] = -1.0
+            top = np.argpartition(-scores, min(k, n) - 1)[:k] if n > k else np.arange(n)
+            top = top[np.argsort(-scores[top])]
+            results = [
+                {"score": round(float(scores[i]), 4), "brief": self._items[i][0], "design": self._items[i][1]}
+                for i in top if scores[i] >= min_score
+            ]
+            self.stats["lookups"] += 1
+            self.stats["lookup_us"] += (time.perf_counter() - start) * 1e6
+        return results
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, size=self._size, capacity=self.capacity)
+        lookup_us = stats.pop("lookup_us")
+        stats["avg_lookup_us"] = round(lookup_us / stats["lookups"], 1) if stats["lookups"] else 0.0
+        return stats
+
+
+def load_from_run_store(index: ExemplarIndex, run_store) -> int:
+    """用运行记录库中通过校验的方案预热索引（最新的 capacity 条），返回加入的条数"""
+    rows = run_store.query(
+        "SELECT user_input, design FROM runs WHERE passed = 1 AND design IS NOT NULL "
+        "AND generation_path != 'cached' ORDER BY id DESC LIMIT ?",
+        (index.capacity,),
+    )
+    added = 0
+    # 从旧到新加入，使最新的方案最后被覆盖
+    for row in reversed(rows):
+        if row["user_input"] and index.add(row["user_input"], json.loads(row["design"])):
+            added += 1
+    return added
+
+
+def render_exemplars(exemplars: List[dict], encode, token_budget: int) -> str:
+    """
+    按相似度顺序渲染示例，超出 token 预算（按 4 字符 / token 估算）的示例跳过
+    :param encode: design dict → 文本（紧凑格式或压缩 JSON）
+    """
+    blocks, used = [], 0
+    for exemplar in exemplars:
+        block = f"Brief:\n{exemplar['brief']}\nDesign:\n{encode(exemplar['design'])}"
+        tokens = math.ceil(len(block) / 4)
+        if used + tokens > token_budget:
+            continue
+        blocks.append(block)
+        used += tokens
+    return "\n\n".join(blocks)
+
+
+# ---- 进程内共享的示例索引 ----
+_INDEX = None
+_INDEX_LOADED = False
+_LOAD_LOCK = threading.Lock()
+
+
+def _retrieval_cfg() -> dict:
+    from .call_llm import LLM_CFG
+    return LLM_CFG.get("retrieval") or {}
+
+
+def load_index_from_config(cfg: dict) -> Optional[ExemplarIndex]:
+    """按 llm.retrieval 配置构建索引（warm_start 时从运行记录库预热）；未启用时返回 None"""
+    if not cfg.get("enabled"):
+        return None
+    index = ExemplarIndex(dims=cfg.get("dims", 256), capacity=cfg.get("capacity", 5000))
+    if cfg.get("warm_start", True):
+        from utils.run_store import get_run_store
+        run_store = get_run_store()
+        if run_store is not None:
+            load_from_run_store(index, run_store)
+    return index
+
+
+def get_exemplar_index() -> Optional[ExemplarIndex]:
+    """按配置惰性创建（未启用时为 None）"""
+    global _INDEX, _INDEX_LOADED
+    with _LOAD_LOCK:
+        if not _INDEX_LOADED:
+            _INDEX = load_index_from_config(_retrieval_cfg())
+            _INDEX_LOADED = True
+    return _INDEX
+
+
+def set_exemplar_index(index: Optional[ExemplarIndex]) -> None:
+    """以代码方式启用 / 关闭示例检索（覆盖配置）"""
+    global _INDEX, _INDEX_LOADED
+    with _LOAD_LOCK:
+        _INDEX, _INDEX_LOADED = index, True
+
+
+def retrieve_exemplars(brief: str, requirements: Optional[dict] = None) -> List[dict]:
+    """
+    按配置的 k / min_score 检索示例（未启用时为空列表）
+    启用 cassette（录制 / 回放）时不注入示例：录制键包含整个 prompt，而索引内容随运行历史（含运行记录库预热）变化，
+    同一任务书在回放时会检索到录制时没有的示例导致未命中（与 choose_model 固定模型同理）
+    """
+    from .call_llm import get_cassette
+    index = get_exemplar_index()
+    if index is None or get_cassette() is not None:
+        return []
+    cfg = _retrieval_cfg()
+    return index.search(brief, k=cfg.get("k", 2), min_score=cfg.get("min_score", 0.3), requirements=requirements)
+
+
+def exemplar_token_budget() -> int:
+    return int(_retrieval_cfg().get("token_budget", 800))
@@ -0,0 +1,155 @@
+# llm/router.py
+"""
+多模型路由：在配置的模型列表（llm.models）之间，按“得到合规方案的期望耗时”选择模型。
+
+每个模型维护三个 EWMA（指数加权移动平均）：
+- latency:    成功调用的耗时
+- error_rate: 调用失败（异常 / 限流 / 超时）的比例
+- pass_rate:  生成方案通过 validate_design 的比例
+期望耗时 = latency / (P(调用成功) × P(方案合规))，取最小者；
+样本不足 min_samples 的模型优先试用（explore），其余时间以 epsilon 概率随机探测其他模型（probe），
+使变慢的模型恢复后还能被重新选中。
+"""
+import random
+import threading
+from typing import Dict, List, Optional
+
+# 概率下限：避免某个 EWMA 归零后期望耗时变为无穷大，无法再比较
+_MIN_PROBABILITY = 0.05
+
+
+class ModelStats:
+    """单个模型的 EWMA 统计"""
+    def __init__(self, name: str, url: Optional[str] = None):
+        self.name = name
+        self.url = url
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.pass_rate = 1.0
+        self.calls = 0
+        self.validations = 0
+
+    def expected_time(self) -> Optional[float]:
+        """得到合规方案的期望耗时（尚无成功调用时为 None）"""
+        if self.latency is None:
+            return None
+        p_ok = max(1.0 - self.error_rate, _MIN_PROBABILITY)
+        p_valid = max(self.pass_rate, _MIN_PROBABILITY)
+        return self.latency / (p_ok * p_valid)
+
+    def to_dict(self) -> dict:
+        expected = self.expected_time()
+        return {
+            "latency": None if self.latency is None else round(self.latency, 4),
+            "error_rate": round(self.error_rate, 4),
+            "pass_rate": round(self.pass_rate, 4),
+            "expected_time": None if expected is None else round(expected, 4),
+            "calls": self.calls,
+            "validations": self.validations,
+        }
+
+
+def _ewma(current: Optional[float], sample: float, alpha: float) -> float:
+    return sample if current is None else (1 - alpha) * current + alpha * sample
+
+
+class ModelRouter:
+    """
+    :param models: [{"name": ..., "url": 可选}]，顺序即同分时的优先顺序
+    :param alpha: EWMA 平滑系数（越大越看重最近的样本）
+    :param epsilon: 探测其他模型的概率
+    :param min_samples: 调用次数少于该值的模型优先试用
+    """
+    def __init__(
+        self,
+        models: List[dict],
+        alpha: float = 0.2,
+        epsilon: float = 0.05,
+        min_samples: int = 3,
+        seed: Optional[int] = None,
+    ):
+        if not models:
+            raise ValueError("ModelRouter 需要至少一个模型")
+        self.models: Dict[str, ModelStats] = {
+            m["name"]: ModelStats(m["name"], m.get("url")) for m in models
+        }
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.min_samples = min_samples
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def url_of(self, model: str) -> Optional[str]:
+        stats = self.models.get(model)
+        return stats.url if stats else None
+
+    def choose(self) -> dict:
+        """
+        选择本次请求使用的模型，返回路由决策：
+        {"model", "reason": best / explore / probe / only, "expected_time", "scores"}
+        """
+        with self.lock:
+            scores = {name: s.expected_time() for name, s in self.models.items()}
+            names = list(self.models)
+            cold = [name for name in names if self.models[name].calls < self.min_samples]
+            scored = [name for name in names if scores[name] is not None]
+            best = min(scored, key=lambda name: scores[name]) if scored else names[0]
+
+            if len(names) == 1:
+                model, reason = names[0], "only"
+            elif cold:
+                # 样本最少的冷启动模型先试用
+                model, reason = min(cold, key=lambda name: self.models[name].calls), "explore"
+            elif self.rnd.random() < self.epsilon:
+                model, reason = self.rnd.choice([name for name in names if name != best]), "probe"
+            else:
+                model, reason = best, "best"
+
+        return {
+            "model": model,
+            "reason": reason,
+            "expected_time": None if scores[model] is None else round(scores[model], 4),
+            "scores": {name: None if v is None else round(v, 4) for name, v in scores.items()},
+        }
+
+    def record_call(self, model: str, latency: float, ok: bool) -> None:
+        """记录一次 LLM 调用的结果（失败调用只更新错误率）"""
+        stats = self.models.get(model)
+        if stats is None:
+            return
+        with self.lock:
+            stats.calls += 1
+            stats.error_rate = _ewma(stats.error_rate, 0.0 if ok else 1.0, self.alpha)
+            if ok:
+                stats.latency = _ewma(stats.latency, latency, self.alpha)
+
+    def record_validation(self, model: str, passed: bool) -> None:
+        """记录该模型生成的方案是否通过校验"""
+        stats = self.models.get(model)
+        if stats is None:
+            return
+        with self.lock:
+            stats.validations += 1
+            stats.pass_rate = _ewma(
+                None if stats.validations == 1 else stats.pass_rate, 1.0 if passed else 0.0, self.alpha
+            )
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {name: s.to_dict() for name, s in self.models.items()}
+
+
+def load_router_from_config(llm_cfg: dict) -> ModelRouter:
+    """
+    按 llm.models / llm.routing 构建路由器；未配置模型列表时只含 llm.model（路由退化为固定模型）
+    """
+    models = llm_cfg.get("models") or [{"name": llm_cfg["model"]}]
+    models = [m if isinstance(m, dict) else {"name": m} for m in models]
+    cfg = llm_cfg.get("routing") or {}
+    return ModelRouter(
+        models,
+        alpha=cfg.get("alpha", 0.2),
+        epsilon=cfg.get("epsilon", 0.05),
+        min_samples=cfg.get("min_samples", 3),
+        seed=cfg.get("seed"),
+    )
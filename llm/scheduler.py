@@ -0,0 +1,276 @@
+# llm/scheduler.py
+"""
+出站 LLM 调用的限流调度器：按供应商的 RPM（每分钟请求数）/ TPM（每分钟 token 数）配额
+用令牌桶平滑放行请求，等待中的请求按优先级排队（交互式 /generate 优先于批量任务）。
+
+- 令牌桶容量只有 burst_seconds 秒的配额，突发请求被摊平到配额速率上，而不是一起打到接口后集体被限流
+- 每次请求按 prompt 长度 + max_tokens 预估 token 消耗，返回后按 usage 多退少补
+- 收到 429 时暂停放行 Retry-After（或退避时间），所有等待者一起让出
+- state_path 指定 SQLite 文件时，多进程共享同一份配额（事务即跨进程锁）；否则为进程内共享
+
+用法：
+    scheduler = get_scheduler()
+    ticket = scheduler.acquire(estimate_tokens(payload))
+    ...发送请求...
+    scheduler.settle(ticket, actual_tokens)
+"""
+import contextlib
+import contextvars
+import heapq
+import itertools
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+from utils.io import PROJECT_ROOT
+from utils.deadline import current_deadline
+
+# ---- 优先级：数值越小越先放行 ----
+PRIORITIES = {"interactive": 0, "batch": 10}
+_PRIORITY = contextvars.ContextVar("llm_priority", default=PRIORITIES["interactive"])
+
+
+class RateLimitTimeout(TimeoutError):
+    """等待配额超过 max_wait"""
+
+
+def _priority_value(priority: Union[int, str]) -> int:
+    if isinstance(priority, str):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}（可选：{', '.join(PRIORITIES)}）")
+        return PRIORITIES[priority]
+    return int(priority)
+
+
+@contextlib.contextmanager
+def llm_priority(priority: Union[int, str]):
+    """在该上下文内发出的 LLM 调用使用指定优先级（"interactive" / "batch" 或整数）"""
+    token = _PRIORITY.set(_priority_value(priority))
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+def current_priority() -> int:
+    return _PRIORITY.get()
+
+
+def estimate_tokens(payload: dict) -> int:
+    """预估一次请求的 token 消耗：prompt 字符数 / 4 + max_tokens"""
+    prompt_chars = sum(len(m.get("content") or "") for m in payload.get("messages", []))
+    return prompt_chars // 4 + int(payload.get("max_tokens") or 0)
+
+
+# =========================
+# 配额状态（进程内 / SQLite 跨进程）
+# =========================
+
+class _MemoryState:
+    """进程内令牌桶状态"""
+    def __init__(self, capacities: dict):
+        self.capacities = capacities
+        self.levels = dict(capacities)
+        self.updated = time.time()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with self.lock:
+            state = {"levels": self.levels, "updated": self.updated, "paused_until": self.paused_until}
+            yield state
+            self.levels, self.updated, self.paused_until = state["levels"], state["updated"], state["paused_until"]
+
+
+class _SQLiteState:
+    """SQLite 中的令牌桶状态；BEGIN IMMEDIATE 事务保证多进程互斥"""
+    def __init__(self, path: Union[str, Path], capacities: dict):
+        self.path = str(path)
+        self.capacities = capacities
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit ("
+                "name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            now = time.time()
+            for name, capacity in list(capacities.items()) + [("paused_until", 0.0)]:
+                conn.execute(
+                    "INSERT OR IGNORE INTO rate_limit (name, level, updated) VALUES (?, ?, ?)",
+                    (name, capacity, now),
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = {name: (level, updated) for name, level, updated in
+                    conn.execute("SELECT name, level, updated FROM rate_limit")}
+            state = {
+                "levels": {name: rows[name][0] for name in self.capacities},
+                "updated": min(rows[name][1] for name in self.capacities),
+                "paused_until": rows["paused_until"][0],
+            }
+            yield state
+            for name, level in state["levels"].items():
+                conn.execute("UPDATE rate_limit SET level = ?, updated = ? WHERE name = ?",
+                             (level, state["updated"], name))
+            conn.execute("UPDATE rate_limit SET level = ? WHERE name = 'paused_until'", (state["paused_until"],))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+
+# =========================
+# 调度器
+# =========================
+
+class RateLimitScheduler:
+    """
+    RPM / TPM 双令牌桶 + 优先级等待队列
+    :param rpm: 每分钟请求数配额
+    :param tpm: 每分钟 token 配额
+    :param burst_seconds: 桶容量对应的配额秒数（越小放行越平滑）
+    :param state_path: SQLite 文件路径；设置后多进程共享配额
+    :param max_wait: 单次 acquire 最长等待秒数，超时抛出 RateLimitTimeout
+    """
+    def __init__(
+        self,
+        rpm: float,
+        tpm: float,
+        burst_seconds: float = 5.0,
+        state_path: Optional[Union[str, Path]] = None,
+        max_wait: Optional[float] = 120.0,
+    ):
+        self.rates = {"requests": rpm / 60.0, "tokens": tpm / 60.0}
+        self.capacities = {
+            "requests": max(1.0, rpm * burst_seconds / 60.0),
+            "tokens": max(1.0, tpm * burst_seconds / 60.0),
+        }
+        self.max_wait = max_wait
+        self.state = _SQLiteState(state_path, self.capacities) if state_path else _MemoryState(self.capacities)
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        self.stats = {"acquired": 0, "waited": 0, "wait_s": 0.0, "max_wait_s": 0.0,
+                      "throttled": 0, "timeouts": 0, "by_priority": {}}
+
+    def _try_take(self, tokens: float) -> float:
+        """配额足够时扣除并返回 0，否则返回还需等待的秒数"""
+        with self.state.transaction() as state:
+            now = time.time()
+            if state["paused_until"] > now:
+                return state["paused_until"] - now
+            elapsed = max(0.0, now - state["updated"])
+            levels = {
+                name: min(self.capacities[name], level + elapsed * self.rates[name])
+                for name, level in state["levels"].items()
+            }
+            state["levels"], state["updated"] = levels, now
+            cost = {"requests": 1.0, "tokens": tokens}
+            shortfalls = [
+                (cost[name] - levels[name]) / self.rates[name]
+                for name in levels if levels[name] < cost[name]
+            ]
+            if shortfalls:
+                return max(shortfalls)
+            for name in levels:
+                levels[name] -= cost[name]
+            return 0.0
+
+    def acquire(self, tokens: int, priority: Union[int, str, None] = None) -> dict:
+        """
+        阻塞直到配额足够且前面没有更高优先级（或更早到达）的等待者
+        返回 ticket，请求完成后交给 settle 按实际用量结算
+        当前请求超时 / 被取消时放弃排队，抛出 RequestCancelled
+        """
+        priority = current_priority() if priority is None else _priority_value(priority)
+        # 单次请求超过桶容量时按容量计，避免永远等不到
+        tokens = min(float(tokens), self.capacities["tokens"])
+        entry = (priority, next(self._seq))
+        start = time.monotonic()
+        deadline = current_deadline()
+
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    if self._waiters[0] == entry:
+                        wait = self._try_take(tokens)
+                        if wait <= 0:
+                            break
+                    else:
+                        wait = 1.0  # 排在后面：前面的请求放行时会被唤醒
+                    if self.max_wait is not None and time.monotonic() - start > self.max_wait:
+                        self.stats["timeouts"] += 1
+                        raise RateLimitTimeout(f"等待 LLM 配额超过 {self.max_wait}s")
+                    deadline.check("rate_limit")
+                    # 跨进程时其他进程不会通知本进程，最长 1s 轮询一次
+                    self._cond.wait(deadline.cap(min(wait, 1.0)))
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            self.stats["acquired"] += 1
+            if waited > 0.001:
+                self.stats["waited"] += 1
+                self.stats["wait_s"] += waited
+                self.stats["max_wait_s"] = max(self.stats["max_wait_s"], waited)
+            by_priority = self.stats["by_priority"]
+            by_priority[priority] = by_priority.get(priority, 0) + 1
+        return {"tokens": tokens, "priority": priority, "wait_s": waited}
+
+    def settle(self, ticket: dict, actual_tokens: Optional[int]) -> None:
+        """按实际 token 用量多退少补（供应商未返回 usage 时保持预估值）"""
+        if actual_tokens is None:
+            return
+        diff = ticket["tokens"] - float(actual_tokens)
+        with self.state.transaction() as state:
+            state["levels"]["tokens"] = min(self.capacities["tokens"], state["levels"]["tokens"] + diff)
+        with self._cond:
+            self._cond.notify_all()
+
+    def penalize(self, seconds: float) -> None:
+        """收到 429：seconds 秒内暂停放行（多个 429 取最晚的恢复时间）"""
+        with self.state.transaction() as state:
+            state["paused_until"] = max(state["paused_until"], time.time() + seconds)
+        with self._cond:
+            self.stats["throttled"] += 1
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            stats = dict(self.stats, by_priority=dict(self.stats["by_priority"]))
+            stats["queued"] = len(self._waiters)
+        stats["wait_s"] = round(stats["wait_s"], 3)
+        stats["max_wait_s"] = round(stats["max_wait_s"], 3)
+        return stats
+
+
+def load_scheduler_from_config(llm_cfg: dict) -> Optional[RateLimitScheduler]:
+    """按 llm.rate_limit 配置构建调度器；未启用时返回 None"""
+    cfg = llm_cfg.get("rate_limit") or {}
+    if not cfg.get("enabled"):
+        return None
+    state_path = cfg.get("state_path")
+    if state_path and not Path(state_path).is_absolute():
+        # 相对路径按项目根目录解析
+        state_path = PROJECT_ROOT / state_path
+    return RateLimitScheduler(
+        rpm=cfg["rpm"],
+        tpm=cfg["tpm"],
+        burst_seconds=cfg.get("burst_seconds", 5.0),
+        state_path=state_path,
+        max_wait=cfg.get("max_wait", 120.0),
+    )
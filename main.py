@@ -1,84 +1,467 @@
 # main.py
-from utils.io import USER_INPUT_FILE, read_text
-from llm import call_llm, build_intention_prompt
-from constraint_checker import validate_design
-from design_ir import parse_design_to_graph
+from utils.io import USER_INPUT_FILE, read_text, write_json
+from llm import call_llm_detailed, estimate_max_tokens, build_intention_prompt, extract_requirements, llm_priority, get_scheduler, get_router, choose_model
+from llm import get_exemplar_index, retrieve_exemplars
+from llm.retrieval import exemplar_token_budget
+from llm.call_llm import STRUCTURED_CFG
+from llm.canonical import canonicalize_brief, translate_rooms, rename_rooms
+from intent import validate_design_json
+from constraint_checker import validate_design, validate_design_report, check_feasibility, compile_requirements
+from constraint_checker.rule_engine import get_default_rule_plan
+from design_ir import (
+    parse_design_to_graph, graph_to_json_dict, synthesize_design, clean_and_validate_json, decode_compact,
+    ZONE_MIN_ROOMS, split_zones, zone_brief, merge_zone_graphs
+)
+from utils.logging import setup_logging
+from utils.run_store import get_run_store, input_hash
+from utils.result_cache import get_result_cache
+from utils.deadline import Deadline, RequestCancelled, DeadlineExceeded, deadline_scope, current_deadline
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import threading
 import time
 import json
 import logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+# 队列异步日志：格式化与输出在后台线程完成（已有日志配置时不覆盖）
+setup_logging(force=False)
 logger = logging.getLogger(__name__)
 
+# ---- 流水线统计：各生成路径的请求数（供 /stats 观察快速路径命中率与省下的 LLM 调用） ----
+PIPELINE_STATS = {"requests": 0, "deterministic": 0, "infeasible": 0, "llm": 0, "zoned": 0, "cached": 0, "llm_calls_avoided": 0,
+                  "schema_rejections": 0, "continuations": 0, "completion_tokens_saved": 0, "truncated_outputs": 0,
+                  "exemplar_prompts": 0, "fast_path_fallbacks": 0, "cancelled": 0, "deadline_exceeded": 0, "cancelled_work_s": 0.0, "cancelled_stages": {}}
+# 分区生成的最大并发 LLM 调用数
+ZONE_MAX_WORKERS = 4
+# LLM 输出编码：json（默认）或 compact（紧凑格式，输出 token 更少）
+COMPACT_OUTPUT = STRUCTURED_CFG.get("encoding") == "compact"
+_STATS_LOCK = threading.Lock()
+
+
+def _count_path(generation_path: str) -> None:
+    with _STATS_LOCK:
+        PIPELINE_STATS["requests"] += 1
+        PIPELINE_STATS[generation_path] += 1
+        if generation_path not in ("llm", "zoned"):
+            PIPELINE_STATS["llm_calls_avoided"] += 1
+
+
+def get_pipeline_stats() -> dict:
+    """统计快照 + 快速路径命中率 + 限流调度统计 + 各模型的路由统计 + 运行记录写入统计 + 结果缓存命中率 + 示例检索统计"""
+    with _STATS_LOCK:
+        stats = dict(PIPELINE_STATS, cancelled_stages=dict(PIPELINE_STATS["cancelled_stages"]))
+    stats["cancelled_work_s"] = round(stats["cancelled_work_s"], 3)
+    stats["fast_path_rate"] = (
+        round(stats["deterministic"] / stats["requests"], 4) if stats["requests"] else 0.0
+    )
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        stats["rate_limit"] = scheduler.get_stats()
+    stats["routing"] = get_router().snapshot()
+    run_store = get_run_store()
+    if run_store is not None:
+        stats["run_store"] = run_store.get_stats()
+    result_cache = get_result_cache()
+    if result_cache is not None:
+        stats["result_cache"] = result_cache.get_stats()
+    exemplar_index = get_exemplar_index()
+    if exemplar_index is not None:
+        stats["retrieval"] = exemplar_index.get_stats()
+    return stats
+
+
+def _count_cancelled(error: RequestCancelled, elapsed: float) -> None:
+    """取消统计：被取消的请求数（其中超时的数量）、取消前已耗费的时间、检测到取消的阶段"""
+    with _STATS_LOCK:
+        PIPELINE_STATS["cancelled"] += 1
+        PIPELINE_STATS["deadline_exceeded"] += int(isinstance(error, DeadlineExceeded))
+        PIPELINE_STATS["cancelled_work_s"] += elapsed
+        stages = PIPELINE_STATS["cancelled_stages"]
+        stages[error.stage] = stages.get(error.stage, 0) + 1
+
+
+def _new_usage() -> dict:
+    """单次请求的 LLM 用量（跨重试 / 续写 / 分区累加）"""
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "continuations": 0, "completion_tokens_saved": 0, "truncated_outputs": 0}
+
+
+def _merge_usage(total: dict, part: dict) -> dict:
+    for key, value in part.items():
+        total[key] = total.get(key, 0) + value
+    return total
 
-def graph_to_json_dict(spatial_graph):
-    """把 SpatialGraph 转回原始 JSON 格式的字典"""
-    rooms = []
-    for room_node in spatial_graph.rooms.values():
-        # 构建邻接关系字典
-        adjacent_to = {}
-        for adj_edge in room_node.adjacencies:
-            # 还原邻接描述字符串（如 "by door in the north"）
-            direction = adj_edge.direction.value
-            connection = "by door" if adj_edge.connection_type.value == "door" else "by connected space"
-            desc = f"{connection} in the {direction}"
-            adjacent_to[adj_edge.target.name] = desc
-        
-        rooms.append({
-            "type": room_node.name,
-            "area": room_node.area,
-            "adjacent_to": adjacent_to
+
+def _count_rooms(requirements) -> int:
+    index = compile_requirements(requirements)
+    return len(index.rooms) if index else 0
+
+
+def call_llm_checked(prompt: str, n_rooms: int = 0, usage: dict = None, model: str = None):
+    """
+    调用 LLM 并在建图前用本地 Schema 校验输出；不合规时附上错误重新生成
+    max_tokens 按房间数估算，截断时由 call_llm_detailed 续写；用量累加到 usage
+    model 为路由选出的模型（None 时使用配置中的默认模型）
+    返回 (原始输出, design dict)；用尽 max_attempts 仍不合规时抛出 ValueError
+    """
+    usage = _new_usage() if usage is None else usage
+    max_tokens = estimate_max_tokens(n_rooms, compact=COMPACT_OUTPUT)
+    max_attempts = max(1, int(STRUCTURED_CFG.get("max_attempts", 1)))
+    attempt_prompt = prompt
+    deadline = current_deadline()
+    for attempt in range(1, max_attempts + 1):
+        deadline.check("llm")
+        detail = call_llm_detailed(attempt_prompt, compact=COMPACT_OUTPUT, max_tokens=max_tokens, model=model)
+        raw = detail["content"]
+        truncated = detail["finish_reason"] == "length"
+        _merge_usage(usage, {
+            "calls": 1 + detail["continuations"],
+            **detail["usage"],
+            "continuations": detail["continuations"],
+            "completion_tokens_saved": detail["completion_tokens_saved"],
+            "truncated_outputs": int(truncated),
         })
+        if truncated:
+            if COMPACT_OUTPUT:
+                # 紧凑格式没有 JSON 修复兜底，截断处的行（如 "b1 12" 截成 "b1 1"）仍能解码，只能拒绝
+                raise ValueError(f"续写 {detail['continuations']} 次后紧凑格式输出仍被截断")
+            logger.warning("续写 %d 次后输出仍被截断，交由 JSON 修复兜底", detail["continuations"])
+        deadline.check("repair")
+        design = decode_compact(raw) if COMPACT_OUTPUT else clean_and_validate_json(raw)
+        if not STRUCTURED_CFG.get("validate", True):
+            return raw, design
+        errors = validate_design_json(design)
+        if not errors:
+            return raw, design
+        with _STATS_LOCK:
+            PIPELINE_STATS["schema_rejections"] += 1
+        logger.info("LLM 输出未通过 Schema 校验（第 %d/%d 次）：%s", attempt, max_attempts, errors[:3])
+        attempt_prompt = (
+            f"{prompt}\n\nYour previous output was INVALID:\n"
+            + "\n".join(f"- {e}" for e in errors[:10])
+            + "\nFix these errors and output the complete JSON again."
+        )
+    raise ValueError(f"LLM 输出未通过 Schema 校验：{'; '.join(errors[:3])}")
+
+
+def _exact_key(user_input: str, requirements: dict, explicit: bool) -> str:
+    """精确键：原文哈希；显式传入的约束一并计入（同一原文配不同约束不能共用结果）"""
+    if not explicit:
+        return input_hash(user_input)
+    return input_hash(f"{user_input.strip()}\n{json.dumps(requirements, sort_keys=True, ensure_ascii=False)}")
+
+
+def lookup_cached_design(user_input: str, requirements: dict, explicit: bool = False, rule_plan=None):
+    """
+    结果缓存查找：规范化置信度足够时用规范化任务书的键（intent），否则退回原文精确键（exact）
+    命中时把缓存方案中的房间名换成本次任务书的房间名，并按本次约束复核，未通过则作废该条目
+    返回 (缓存信息, 命中时的 (原始输出, design)，未命中为 None)；未启用缓存时返回 (None, None)
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return None, None
+    canon = canonicalize_brief(user_input, requirements, explicit=explicit)
+    if canon.confident(cache.min_confidence):
+        kind, key = "intent", canon.key
+    else:
+        cache.note_gated()
+        kind, key = "exact", _exact_key(user_input, requirements, explicit)
+    info = {"kind": kind, "key": key, "hit": False, "confidence": canon.confidence, "mapping": canon.mapping}
+
+    entry = cache.get(kind, key)
+    if entry is None:
+        return info, None
+    mapping = {}
+    if kind == "intent":
+        mapping = translate_rooms(entry["mapping"], canon.mapping, [room["type"] for room in entry["design"]["rooms"]])
+    design = rename_rooms(entry["design"], mapping)
+    if not validate_design(design, requirements, rule_plan)[0]:
+        cache.invalidate(kind, key)
+        logger.info("缓存结果复核未通过，重新生成")
+        return info, None
+    info.update(hit=True, source_path=entry["generation_path"])
+    return info, (rename_rooms(entry["raw"], mapping), design)
 
-        print(rooms)
-    return {"rooms": rooms}
 
-def run_design_pipeline(user_input: str):
+def store_cached_design(info: dict, llm_result: str, design: dict, generation_path: str) -> None:
+    """缓存通过校验的 LLM 生成结果（连同本次的房间名映射，供其他编号方式的同一任务书复用）"""
+    cache = get_result_cache()
+    if cache is None or info is None:
+        return
+    cache.put(info["kind"], info["key"], {
+        "raw": llm_result, "design": design, "mapping": info["mapping"], "generation_path": generation_path
+    })
+
+
+def _public_cache_info(info):
+    """结果中返回的缓存信息（不含房间名映射）"""
+    return None if info is None else {k: v for k, v in info.items() if k != "mapping"}
+
+
+def plan_zones(requirements, zoned=None) -> list:
+    """
+    分区生成是否适用：zoned=None 时约束中房间数达到 ZONE_MIN_ROOMS 且可拆出多个分区才启用，zoned=False 时不分区
+    返回分区列表（不适用时为空列表）
+    """
+    zones = split_zones(requirements) if zoned is not False else []
+    if zoned is None and sum(len(zone.rooms) for zone in zones) < ZONE_MIN_ROOMS:
+        return []
+    return zones if len(zones) > 1 else []
+
+
+def generate_by_zones(zones, requirements, usage: dict = None, model: str = None):
+    """
+    分区并发生成：每个分区单独构建 prompt 并调用 LLM（同一请求的各分区使用同一模型），解析为 SpatialGraph 后按跨区约束拼接
+    返回 (合并后的 SpatialGraph, 各分区原始输出列表)；各分区用量累加到 usage
+    """
+    def generate_zone(zone):
+        zone_usage = _new_usage()
+        raw, design = call_llm_checked(
+            build_intention_prompt(zone_brief(zone), compact=COMPACT_OUTPUT), len(zone.rooms), zone_usage, model
+        )
+        return raw, parse_design_to_graph(design), zone_usage
+
+    # 线程池中的调用沿用当前上下文（如 LLM 调用优先级）
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=min(ZONE_MAX_WORKERS, len(zones))) as pool:
+        outputs = list(pool.map(lambda zone: context.copy().run(generate_zone, zone), zones))
+    if usage is not None:
+        for _, _, zone_usage in outputs:
+            _merge_usage(usage, zone_usage)
+    raw_outputs = [raw for raw, _, _ in outputs]
+    return merge_zone_graphs([graph for _, graph, _ in outputs], zones, requirements), raw_outputs
+
+
+def run_design_pipeline(
+    user_input: str,
+    requirements=None,
+    export_requirements=None,
+    fast_path: bool = True,
+    zoned=None,
+    priority: str = "interactive",
+    deadline: Deadline = None
+):
+    """
+    :param priority: 本次请求的 LLM 调用在限流调度中的优先级（"interactive" 优先于 "batch"）
+    :param deadline: 端到端截止时间 / 取消令牌；超时或被取消（如客户端断开）时在下一个阶段边界停止，
+                     LLM 重试等待与限流排队同样会提前结束
+    其余参数见 _run_design_pipeline
+    结果交给运行记录库（utils/run_store.py）后台批量写入
+    """
+    with llm_priority(priority), deadline_scope(deadline):
+        result = _run_design_pipeline(user_input, requirements, export_requirements, fast_path, zoned)
+    run_store = get_run_store()
+    if run_store is not None:
+        run_store.submit(user_input, result)
+    return result
+
+
+def _run_design_pipeline(
+    user_input: str,
+    requirements=None,
+    export_requirements=None,
+    fast_path: bool = True,
+    zoned=None
+):
     """
     执行完整流程：
-    LLM生成 → 解析 → 构建图 → 转回JSON → 规则校验
+    意图提取 → 可行性预检 → 确定性合成 / LLM生成 → 解析 → 构建图 → 转回JSON → 规则校验
     返回结构化结果
+    :param requirements: 本次请求的约束；为 None 时从 user_input 中提取（纯内存，不读写共享文件）
+    :param export_requirements: 可选，将本次约束导出到该路径（默认不写文件）
+    :param fast_path: 约束完整（每个房间都有面积与邻接）时直接合成方案，跳过 LLM
+    :param zoned: 是否按分区并发生成（见 plan_zones）；适用分区生成时总面积按户（邻接连通分量）判定
+    需要 LLM 生成时先查结果缓存（措辞 / 顺序 / 编号不同的同一任务书共用结果，见 lookup_cached_design）
     """
     start_time = time.time()
+    explicit = requirements is not None
+    deadline = current_deadline()
+    cancelled = None
+    # 各阶段耗时（秒）：intent / feasibility / generate / parse / validate / total
+    timings = {}
+    lap_start = time.perf_counter()
+
+    def lap(stage: str) -> None:
+        nonlocal lap_start
+        now = time.perf_counter()
+        timings[stage] = round(now - lap_start, 4)
+        lap_start = now
+
+    diagnostics = []
+    feasibility = []
+    generation_path = None
+    spatial_graph = None
+    design = None
+    llm_usage = _new_usage()
+    routing = None
+    cache_info = None
+    prompt = None
+    llm_result, json_dict, ok, result = "", {}, False, ""
     try:
-        # 1. 构建 Prompt
-        prompt = build_intention_prompt(user_input)
+        # 0. 本次请求的约束（按请求传递，并发请求互不干扰）
+        if requirements is None:
+            requirements = extract_requirements(user_input)
+        if export_requirements:
+            write_json(export_requirements, requirements)
+        lap("intent")
+        deadline.check("intent")
+
+        # 多户型楼层（适用分区生成）：整层总面积必然超过单套上限，总面积按户判定；预检与校验使用同一规则计划
+        zones = plan_zones(requirements, zoned)
+        rule_plan = get_default_rule_plan().per_unit() if zones else None
+
+        # 1. 可行性预检：可证明无法通过校验时直接拒绝，不调用 LLM
+        feasibility = check_feasibility(requirements, rule_plan)
+        lap("feasibility")
+        if feasibility:
+            generation_path = "infeasible"
+            logger.info("任务书不可行，跳过生成：%s", feasibility[0]["message"])
+            return {
+                "llm_raw_output": "",
+                "parsed_design": {},
+                "validation_passed": False,
+                "validation_result": feasibility[0]["message"],
+                "requirements": requirements,
+                "generation_path": generation_path,
+                "diagnostics": diagnostics,
+                "feasibility": feasibility,
+                "llm_usage": llm_usage,
+                "routing": routing,
+                "cancelled": cancelled,
+                "timings": timings,
+                "cache": None,
+                "prompt": prompt
+            }
 
-        # 2. 调用 LLM
-        llm_result = call_llm(prompt)
-        llm_result_record = json.dumps(llm_result, indent=2, ensure_ascii=False)
-        logger.info(f"JSON 解析成功，结果：")
-        logger.info(llm_result_record)
+        deadline.check("generate")
+        # 2. 快速路径：约束完整时直接合成方案；合成结果不满足硬规则（任务书只给出部分房间，
+        #    如缺少客厅 / 入口、总面积不足）说明信息仍不全，回退到 LLM 补全
+        design = synthesize_design(requirements) if fast_path else None
+        if design is not None and not validate_design(design, requirements, rule_plan)[0]:
+            logger.info("合成方案未通过校验，回退到 LLM 生成")
+            with _STATS_LOCK:
+                PIPELINE_STATS["fast_path_fallbacks"] += 1
+            design = None
+        cached = None
+        if design is None:
+            # 需要 LLM 时先查结果缓存
+            cache_info, cached = lookup_cached_design(user_input, requirements, explicit, rule_plan)
+        if design is not None:
+            generation_path = "deterministic"
+            llm_result = json.dumps(design, ensure_ascii=False)
+            logger.info("约束完整，跳过 LLM，直接合成方案（%d 个房间）", len(design["rooms"]))
+        elif cached is not None:
+            # 2b. 缓存命中：复用此前通过校验的方案（已换成本次任务书的房间名）
+            generation_path = "cached"
+            llm_result, design = cached
+            logger.info("命中结果缓存（%s，置信度 %.2f）", cache_info["kind"], cache_info["confidence"])
+        else:
+            # 按各模型“得到合规方案的期望耗时”选择本次请求使用的模型
+            routing = choose_model()
+            model = routing["model"]
+            if zones:
+                # 3a. 大型任务书：各分区并发生成后拼接，耗时取决于最大的分区
+                generation_path = "zoned"
+                spatial_graph, raw_outputs = generate_by_zones(zones, requirements, llm_usage, model)
+                llm_result = json.dumps(raw_outputs, ensure_ascii=False)
+                logger.info("分区生成：%d 个分区，最大分区 %d 个房间", len(zones), max(len(z.rooms) for z in zones))
+            else:
+                # 3b. 构建 Prompt 并调用 LLM
+                generation_path = "llm"
+                # 相似任务书的历史合规方案作为示例（按 token 预算注入）
+                exemplars = retrieve_exemplars(user_input, requirements)
+                if exemplars:
+                    with _STATS_LOCK:
+                        PIPELINE_STATS["exemplar_prompts"] += 1
+                # 输出先经本地 Schema 校验（不合规则带错误重试），再建图；max_tokens 按房间数估算
+                prompt = build_intention_prompt(
+                    user_input, compact=COMPACT_OUTPUT, exemplars=exemplars, token_budget=exemplar_token_budget()
+                )
+                llm_result, design = call_llm_checked(prompt, _count_rooms(requirements), llm_usage, model)
+            # 完整输出只在 DEBUG 级别记录，避免每次请求格式化整段 JSON
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("LLM 输出：\n%s", json.dumps(llm_result, indent=2, ensure_ascii=False))
+        lap("generate")
 
-        # 3. 解析为图结构
-        spatial_graph = parse_design_to_graph(llm_result, fix_json=True)
-        logger.info(f"SpatialGraph 构建成功！包含 {len(spatial_graph.rooms)} 个房间节点")
+        # 4. 解析为图结构（分区生成时已得到拼接后的图）
+        deadline.check("parse")
+        if spatial_graph is None:
+            spatial_graph = parse_design_to_graph(design)
+        diagnostics = list(spatial_graph.diagnostics)
+        logger.info(
+            "SpatialGraph 构建成功！包含 %d 个房间节点，诊断事件 %d 条",
+            len(spatial_graph.rooms), len(diagnostics)
+        )
 
-        # 4. 转回 JSON
+        # 5. 转回 JSON
         json_dict = graph_to_json_dict(spatial_graph)
-        logger.info(json_dict)
+        logger.debug("%s", json_dict)
+        lap("parse")
 
-        # 5. 校验
-        ok, result = validate_design(json_dict)
+        # 6. 校验（通用规则 + 本次请求的约束）
+        deadline.check("validate")
+        # 完整报告：首条违规作为结论，全部违规同时记为诊断事件
+        ok, violations = validate_design_report(json_dict, requirements, rule_plan)
+        result = violations[0]["message"] if violations else "Design valid"
+        diagnostics.extend(
+            {"kind": "validation.violation", "message": v["message"], "rule": v["rule"], "rooms": v["rooms"]}
+            for v in violations
+        )
+        lap("validate")
+        if routing is not None:
+            get_router().record_validation(routing["model"], ok)
         if ok:
             logger.info("Validation passed!")
+            if generation_path in ("llm", "zoned"):
+                store_cached_design(cache_info, llm_result, json_dict, generation_path)
+            # 通过校验的方案增量加入示例索引（缓存命中的方案已在索引中）
+            exemplar_index = get_exemplar_index()
+            if exemplar_index is not None and generation_path != "cached":
+                # 优先保存 LLM / 合成的原始方案（与 prompt 要求的格式一致），分区生成时只有拼接后的图
+                exemplar_index.add(user_input, design if design is not None else json_dict, requirements)
         else:
-            logger.info(f"Rejected: {result}")
+            logger.info("Rejected: %s", result)
+
+    except RequestCancelled as e:
+        # 超时或客户端已断开：不再继续后续阶段
+        cancelled = {"reason": e.reason, "stage": e.stage, "elapsed": round(deadline.elapsed(), 3)}
+        _count_cancelled(e, deadline.elapsed())
+        logger.warning("%s，已耗时 %.2fs", e, deadline.elapsed())
+        result = str(e)
 
     except Exception as e:
-        logger.error(f"程序执行失败：{e}")
-    
+        logger.error("程序执行失败：%s", e)
+        result = str(e)
+        # 输出无法解析 / 未通过 Schema 校验也计为该模型生成失败（网络错误已计入调用错误率）
+        if routing is not None and isinstance(e, ValueError):
+            get_router().record_validation(routing["model"], False)
+
     finally:
-        logger.info(f"总耗时：{time.time() - start_time:.2f}s")
+        # 生成路径一经选定即计数（LLM 调用失败 / 被取消的请求同样计入，快速路径命中率不会因 LLM 故障而虚高）
+        if generation_path is not None:
+            _count_path(generation_path)
+        with _STATS_LOCK:
+            for key in ("continuations", "completion_tokens_saved", "truncated_outputs"):
+                PIPELINE_STATS[key] += llm_usage[key]
+        timings["total"] = round(time.time() - start_time, 4)
+        logger.info("总耗时：%.2fs", timings["total"])
 
     return {
         "llm_raw_output": llm_result,
         "parsed_design": json_dict,
         "validation_passed": ok,
-        "validation_result": result
+        "validation_result": result,
+        "requirements": requirements,
+        "generation_path": generation_path,
+        "diagnostics": diagnostics,
+        "feasibility": feasibility,
+        "llm_usage": llm_usage,
+        "routing": routing,
+        "cancelled": cancelled,
+        "timings": timings,
+        "cache": _public_cache_info(cache_info),
+        # 实际发送的 prompt（含示例；供运行记录，API 响应中不返回）
+        "prompt": prompt
     }
 
 # 调用示例
@@ -0,0 +1,103 @@
+# utils/deadline.py
+"""
+请求级截止时间与取消令牌：
+- Deadline(timeout) 记录请求的端到端时间预算，cancel(reason) 由外部（如客户端断开）主动取消
+- 流水线在各阶段边界调用 check(stage)，超时 / 已取消时抛出 RequestCancelled，后续工作不再执行
+- 重试退避用 sleep() 代替 time.sleep：取消时立即醒来，且不会睡过截止时间
+- deadline_scope() 将令牌放入 contextvars，LLM 调用与限流调度无需逐层传参即可读取
+
+用法：
+    deadline = Deadline(timeout=30)
+    with deadline_scope(deadline):
+        ...
+        current_deadline().check("llm")
+"""
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Optional
+
+
+class RequestCancelled(Exception):
+    """请求被取消（客户端断开等）；reason 为取消原因，stage 为检测到取消的阶段"""
+    def __init__(self, reason: str, stage: Optional[str] = None):
+        super().__init__(f"请求已取消（{reason}）" + (f"，阶段：{stage}" if stage else ""))
+        self.reason = reason
+        self.stage = stage
+
+
+class DeadlineExceeded(RequestCancelled, TimeoutError):
+    """请求超过端到端时间预算"""
+
+
+class Deadline:
+    """
+    :param timeout: 时间预算（秒）；None 表示不限时，仅响应 cancel()
+    """
+    def __init__(self, timeout: Optional[float] = None):
+        self.start = time.monotonic()
+        self.expires_at = None if timeout is None else self.start + timeout
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """主动取消（只记录第一次的原因），唤醒正在 sleep() 的线程"""
+        if self.reason is None:
+            self.reason = reason
+        self._event.set()
+
+    def remaining(self) -> Optional[float]:
+        """剩余秒数（不限时为 None，已超时为 0）"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or self.remaining() == 0.0
+
+    def check(self, stage: Optional[str] = None) -> None:
+        """已取消或已超时时抛出 RequestCancelled / DeadlineExceeded"""
+        if self._event.is_set():
+            raise RequestCancelled(self.reason, stage)
+        if self.remaining() == 0.0:
+            raise DeadlineExceeded("deadline", stage)
+
+    def cap(self, seconds: float) -> float:
+        """将超时 / 等待时间截断到剩余预算以内"""
+        remaining = self.remaining()
+        return seconds if remaining is None else min(seconds, remaining)
+
+    def sleep(self, seconds: float, stage: Optional[str] = None) -> None:
+        """可被取消的 sleep；睡眠将越过截止时间时直接抛出 DeadlineExceeded"""
+        self.check(stage)
+        remaining = self.remaining()
+        if remaining is not None and seconds >= remaining:
+            self._event.wait(remaining)
+            self.check(stage)
+            raise DeadlineExceeded("deadline", stage)
+        self._event.wait(seconds)
+        self.check(stage)
+
+
+# ---- 当前请求的令牌（默认不限时、永不取消） ----
+_NO_DEADLINE = Deadline()
+_DEADLINE = contextvars.ContextVar("request_deadline", default=_NO_DEADLINE)
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    """在该上下文内执行的流水线阶段与 LLM 调用遵守 deadline（None 时不限时）"""
+    token = _DEADLINE.set(deadline or _NO_DEADLINE)
+    try:
+        yield deadline
+    finally:
+        _DEADLINE.reset(token)
+
+
+def current_deadline() -> Deadline:
+    return _DEADLINE.get()
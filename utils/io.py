@@ -44,6 +44,7 @@ MAIN_ENTRY_FILE = PROJECT_ROOT / "main.py"
 # -------------------- config 目录 --------------------
 CONFIG_DIR = PROJECT_ROOT / "config"
 REQUIREMENTS_JSON = CONFIG_DIR / "requirements.json"  # 设计约束文件
+RULES_YAML = CONFIG_DIR / "rules.yaml"  # 声明式校验规则集
 MODEL_CONFIG_YAML = CONFIG_DIR / "model_config.yaml"  # LLM模型配置
 USER_INPUT_FILE = CONFIG_DIR / "user_input.txt"
 
@@ -52,6 +53,8 @@ LLM_DIR = PROJECT_ROOT / "llm"
 LLM_INIT_FILE = LLM_DIR / "__init__.py"
 LLM_CALL_LLM_FILE = LLM_DIR / "call_llm.py"          # LLM API调用
 LLM_PROMPTS_FILE = LLM_DIR / "prompts.py"            # Prompt模板
+LLM_CASSETTE_FILE = PROJECT_ROOT / "cassettes" / "llm_cassette.jsonl"  # LLM 调用录制 / 回放
+RUN_STORE_DB = PROJECT_ROOT / "runs" / "runs.sqlite"  # 流水线运行记录库
 
 # -------------------- intention_parser 目录/文件 --------------------
 INTENTION_PARSER_FILE = PROJECT_ROOT / "intention_parser.py"  # 独立的意图解析文件
@@ -72,6 +75,7 @@ CONSTRAINT_CHECKER_DIR = PROJECT_ROOT / "constraint_checker"
 CONSTRAINT_CHECKER_INIT_FILE = CONSTRAINT_CHECKER_DIR / "__init__.py"
 CONSTRAINT_CHECKER_VALIDATOR_FILE = CONSTRAINT_CHECKER_DIR / "validator.py"  # 规则调度
 CONSTRAINT_CHECKER_RUN_CHECK_FILE = CONSTRAINT_CHECKER_DIR / "run_check.py"  # 测试CLI
+CONSTRAINT_CHECKER_RULE_ENGINE_FILE = CONSTRAINT_CHECKER_DIR / "rule_engine.py"  # 声明式规则引擎
 
 # constraint_checker/rules 子目录
 CONSTRAINT_RULES_DIR = CONSTRAINT_CHECKER_DIR / "rules"
@@ -0,0 +1,108 @@
+# utils/result_cache.py
+"""
+流水线结果缓存：进程内 LRU（可选 TTL），按键的种类分别统计命中率
+- intent: 规范化任务书的键（llm/canonical.py），措辞 / 顺序 / 编号不同的同一任务书共用
+- exact:  原文精确匹配的键（规范化置信度不足时的退路）
+
+只缓存通过校验的结果；命中后由调用方按新任务书的房间名重命名并复核。
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from utils.io import MODEL_CONFIG_YAML, read_yaml
+
+KINDS = ("intent", "exact")
+
+
+class ResultCache:
+    """
+    :param max_entries: 最多缓存的结果数，超出时淘汰最久未用的
+    :param ttl: 条目有效期（秒）；None 表示不过期
+    :param min_confidence: 规范化置信度低于该值时退回 exact 键
+    """
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None, min_confidence: float = 0.9):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.min_confidence = min_confidence
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {kind: {"lookups": 0, "hits": 0} for kind in KINDS}
+        self.stats.update({"gated": 0, "stale": 0, "stored": 0, "evicted": 0})
+
+    def get(self, kind: str, key: str):
+        """查找并计入 kind 的命中统计；过期条目视为未命中"""
+        with self._lock:
+            self.stats[kind]["lookups"] += 1
+            entry = self._entries.get((kind, key))
+            if entry is not None and self.ttl is not None and time.time() - entry[0] > self.ttl:
+                del self._entries[(kind, key)]
+                entry = None
+            if entry is None:
+                return None
+            self._entries.move_to_end((kind, key))
+            self.stats[kind]["hits"] += 1
+            return entry[1]
+
+    def put(self, kind: str, key: str, value) -> None:
+        with self._lock:
+            self._entries[(kind, key)] = (time.time(), value)
+            self._entries.move_to_end((kind, key))
+            self.stats["stored"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+
+    def invalidate(self, kind: str, key: str) -> None:
+        """命中的结果复核未通过：移除并撤销该次命中"""
+        with self._lock:
+            self._entries.pop((kind, key), None)
+            self.stats[kind]["hits"] -= 1
+            self.stats["stale"] += 1
+
+    def note_gated(self) -> None:
+        """规范化置信度不足、退回精确匹配的次数"""
+        with self._lock:
+            self.stats["gated"] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = {k: dict(v) if isinstance(v, dict) else v for k, v in self.stats.items()}
+            stats["entries"] = len(self._entries)
+        for kind in KINDS:
+            lookups = stats[kind]["lookups"]
+            stats[kind]["hit_rate"] = round(stats[kind]["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+def load_result_cache_from_config(config: dict) -> Optional[ResultCache]:
+    """按 result_cache 配置构建结果缓存；未启用时返回 None"""
+    cfg = config.get("result_cache") or {}
+    if not cfg.get("enabled"):
+        return None
+    return ResultCache(
+        max_entries=cfg.get("max_entries", 1024),
+        ttl=cfg.get("ttl"),
+        min_confidence=cfg.get("min_confidence", 0.9),
+    )
+
+
+# ---- 进程内共享的结果缓存 ----
+_RESULT_CACHE = None
+_RESULT_CACHE_LOADED = False
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """按配置惰性创建（未启用时为 None）"""
+    global _RESULT_CACHE, _RESULT_CACHE_LOADED
+    if not _RESULT_CACHE_LOADED:
+        _RESULT_CACHE = load_result_cache_from_config(read_yaml(MODEL_CONFIG_YAML))
+        _RESULT_CACHE_LOADED = True
+    return _RESULT_CACHE
+
+
+def set_result_cache(cache: Optional[ResultCache]) -> None:
+    """以代码方式启用 / 关闭结果缓存（覆盖配置）"""
+    global _RESULT_CACHE, _RESULT_CACHE_LOADED
+    _RESULT_CACHE, _RESULT_CACHE_LOADED = cache, True
@@ -0,0 +1,329 @@
+# utils/run_store.py
+"""
+运行记录库：把每次 run_design_pipeline 的输入、prompt、LLM 原始输出、标准化方案、结论、
+违规规则、各阶段耗时与 token 用量写入本地 SQLite（WAL 模式），供事后按索引查询，而不必翻日志。
+
+- 请求线程只把结果放入内存队列（submit 不阻塞，队列满时丢弃并计数）
+- 后台线程批量取出，在同一个事务中写入；违规明细取自结果本身（可行性分析结果，或流水线校验时
+  记入 diagnostics 的 validation.violation 事件），不重复校验
+- WAL 模式下查询与写入互不阻塞，查询使用独立连接
+
+表结构：
+    runs(id, created, day, input_hash, user_input, prompt, model, generation_path, passed, verdict,
+         raw_output, design, requirements, cancelled, timings, total_s, llm_calls, prompt_tokens, completion_tokens)
+    run_violations(run_id, rule, message, rooms)
+索引：
+    runs(day, model, passed)      → 每天每个模型的通过率
+    runs(input_hash)              → 同一输入的历次运行
+    run_violations(rule, run_id)  → 违反某条规则（如 function.kitchen_dining）的所有运行
+
+用法：
+    python -m utils.run_store pass-rate
+    python -m utils.run_store failing function.kitchen_dining
+"""
+import atexit
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Union
+
+from utils.io import PROJECT_ROOT, RUN_STORE_DB, MODEL_CONFIG_YAML, read_yaml
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    day TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    user_input TEXT,
+    prompt TEXT,
+    model TEXT,
+    generation_path TEXT,
+    passed INTEGER NOT NULL,
+    verdict TEXT,
+    raw_output TEXT,
+    design TEXT,
+    requirements TEXT,
+    cancelled TEXT,
+    timings TEXT,
+    total_s REAL,
+    llm_calls INTEGER,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER
+);
+CREATE TABLE IF NOT EXISTS run_violations (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    rule TEXT NOT NULL,
+    message TEXT,
+    rooms TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_day_model ON runs(day, model, passed);
+CREATE INDEX IF NOT EXISTS idx_runs_input_hash ON runs(input_hash);
+CREATE INDEX IF NOT EXISTS idx_violations_rule ON run_violations(rule, run_id);
+"""
+
+_RUN_COLUMNS = (
+    "created", "day", "input_hash", "user_input", "prompt", "model", "generation_path", "passed", "verdict",
+    "raw_output", "design", "requirements", "cancelled", "timings", "total_s",
+    "llm_calls", "prompt_tokens", "completion_tokens",
+)
+_INSERT_RUN = f"INSERT INTO runs ({', '.join(_RUN_COLUMNS)}) VALUES ({', '.join('?' * len(_RUN_COLUMNS))})"
+
+
+def input_hash(user_input: str) -> str:
+    return hashlib.sha256((user_input or "").strip().encode("utf-8")).hexdigest()
+
+
+def _dumps(value) -> Optional[str]:
+    return None if value is None else json.dumps(value, ensure_ascii=False)
+
+
+def _violations(result: dict) -> list:
+    """失败运行的全部违规：不可行时取可行性分析结果，否则取诊断事件中的 validation.violation"""
+    if result.get("feasibility"):
+        return result["feasibility"]
+    return [e for e in result.get("diagnostics") or () if e.get("kind") == "validation.violation"]
+
+
+class RunStore:
+    """
+    :param path: SQLite 文件路径
+    :param batch_size: 每个事务最多写入的运行数
+    :param flush_interval: 队列不满一批时最长等待秒数
+    :param max_queue: 内存队列上限，超出时丢弃（写库慢不能拖慢请求）
+    """
+    def __init__(
+        self,
+        path: Union[str, Path] = RUN_STORE_DB,
+        batch_size: int = 64,
+        flush_interval: float = 0.5,
+        max_queue: int = 10000,
+    ):
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.stats = {"submitted": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="run-store-writer", daemon=True)
+        self._thread.start()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ---- 写入（请求线程） ----
+    def submit(self, user_input: str, result: dict) -> bool:
+        """登记一次运行结果（不阻塞）；队列已满时丢弃并返回 False"""
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait((time.time(), user_input, result))
+            accepted = True
+        except queue.Full:
+            accepted = False
+        with self._stats_lock:
+            self.stats["submitted" if accepted else "dropped"] += 1
+        return accepted
+
+    def flush(self) -> None:
+        """阻塞直到已提交的运行全部写入"""
+        self._queue.join()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    # ---- 后台批量写入 ----
+    def _row(self, created: float, user_input: str, result: dict) -> tuple:
+        usage = result.get("llm_usage") or {}
+        routing = result.get("routing") or {}
+        return (
+            created,
+            time.strftime("%Y-%m-%d", time.localtime(created)),
+            input_hash(user_input),
+            user_input,
+            result.get("prompt"),
+            routing.get("model"),
+            result.get("generation_path"),
+            int(bool(result.get("validation_passed"))),
+            result.get("validation_result"),
+            result.get("llm_raw_output"),
+            _dumps(result.get("parsed_design")),
+            _dumps(result.get("requirements")),
+            _dumps(result.get("cancelled")),
+            _dumps(result.get("timings")),
+            (result.get("timings") or {}).get("total"),
+            usage.get("calls", 0),
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
+        )
+
+    def _write(self, conn: sqlite3.Connection, batch: list) -> None:
+        with conn:
+            for created, user_input, result in batch:
+                run_id = conn.execute(_INSERT_RUN, self._row(created, user_input, result)).lastrowid
+                conn.executemany(
+                    "INSERT INTO run_violations (run_id, rule, message, rooms) VALUES (?, ?, ?, ?)",
+                    [(run_id, v["rule"], v.get("message"), _dumps(v.get("rooms"))) for v in _violations(result)],
+                )
+
+    def _run(self) -> None:
+        conn = self.connect()
+        stop = False
+        while not stop:
+            # 1. 阻塞等待第一条，随后在 flush_interval 内凑满一批
+            item = self._queue.get()
+            batch, deadline = [], time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stop = True
+                    self._queue.task_done()
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            # 2. 一个事务写入整批
+            if batch:
+                try:
+                    self._write(conn, batch)
+                    with self._stats_lock:
+                        self.stats["written"] += len(batch)
+                        self.stats["batches"] += 1
+                except Exception as e:
+                    with self._stats_lock:
+                        self.stats["errors"] += 1
+                    logger.error("运行记录写入失败（%d 条）：%s", len(batch), e)
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+    # ---- 查询 ----
+    def query(self, sql: str, params: tuple = ()) -> List[dict]:
+        with contextlib.closing(self.connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def pass_rate_by_model_day(self, since: Optional[str] = None) -> List[dict]:
+        """每天每个模型的运行数与通过率（走 idx_runs_day_model 覆盖索引）；since 形如 2026-01-01"""
+        return self.query(
+            "SELECT day, model, COUNT(*) AS runs, SUM(passed) AS passed, ROUND(AVG(passed), 4) AS pass_rate "
+            "FROM runs WHERE day >= ? AND model IS NOT NULL GROUP BY day, model ORDER BY day, model",
+            (since or "",),
+        )
+
+    def runs_failing(self, rule: str, limit: int = 100) -> List[dict]:
+        """违反指定规则的运行（最新的在前；走 idx_violations_rule）"""
+        return self.query(
+            "SELECT r.id, r.created, r.model, r.generation_path, r.verdict, r.input_hash, v.message, v.rooms "
+            "FROM run_violations v JOIN runs r ON r.id = v.run_id "
+            "WHERE v.rule = ? ORDER BY r.id DESC LIMIT ?",
+            (rule, limit),
+        )
+
+    def runs_for_input(self, user_input: str) -> List[dict]:
+        """同一输入的历次运行"""
+        return self.query(
+            "SELECT id, created, model, generation_path, passed, verdict, total_s FROM runs "
+            "WHERE input_hash = ? ORDER BY id",
+            (input_hash(user_input),),
+        )
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self.stats, queued=self._queue.qsize())
+
+
+def load_run_store_from_config(config: dict) -> Optional[RunStore]:
+    """按 run_store 配置与环境变量 RUN_STORE_PATH 构建运行记录库；未启用时返回 None"""
+    cfg = config.get("run_store") or {}
+    if not cfg.get("enabled"):
+        return None
+    path = os.getenv("RUN_STORE_PATH") or cfg.get("path")
+    if not path:
+        path = RUN_STORE_DB
+    elif not Path(path).is_absolute():
+        # 相对路径按项目根目录解析
+        path = PROJECT_ROOT / path
+    return RunStore(
+        path,
+        batch_size=cfg.get("batch_size", 64),
+        flush_interval=cfg.get("flush_interval", 0.5),
+        max_queue=cfg.get("max_queue", 10000),
+    )
+
+
+# ---- 进程内共享的运行记录库 ----
+_RUN_STORE = None
+_RUN_STORE_LOADED = False
+_LOAD_LOCK = threading.Lock()
+
+
+def get_run_store() -> Optional[RunStore]:
+    """按配置惰性创建（未启用时为 None）"""
+    global _RUN_STORE, _RUN_STORE_LOADED
+    with _LOAD_LOCK:
+        if not _RUN_STORE_LOADED:
+            _RUN_STORE = load_run_store_from_config(read_yaml(MODEL_CONFIG_YAML))
+            _RUN_STORE_LOADED = True
+    return _RUN_STORE
+
+
+def set_run_store(store: Optional[RunStore]) -> None:
+    """以代码方式启用 / 关闭运行记录（覆盖配置）"""
+    global _RUN_STORE, _RUN_STORE_LOADED
+    with _LOAD_LOCK:
+        _RUN_STORE, _RUN_STORE_LOADED = store, True
+
+
+def _close_run_store() -> None:
+    """进程退出前写完队列中的记录"""
+    if _RUN_STORE is not None:
+        _RUN_STORE.close()
+
+
+atexit.register(_close_run_store)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="查询运行记录库")
+    arg_parser.add_argument("--db", default=None, help="SQLite 文件路径（默认按配置）")
+    sub = arg_parser.add_subparsers(dest="command", required=True)
+    pass_rate = sub.add_parser("pass-rate", help="每天每个模型的通过率")
+    pass_rate.add_argument("--since", default=None)
+    failing = sub.add_parser("failing", help="违反指定规则的运行")
+    failing.add_argument("rule")
+    failing.add_argument("--limit", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    store = RunStore(args.db) if args.db else get_run_store()
+    if store is None:
+        raise SystemExit("运行记录未启用（run_store.enabled），可用 --db 指定文件")
+    rows = store.pass_rate_by_model_day(args.since) if args.command == "pass-rate" else store.runs_failing(args.rule, args.limit)
+    for row in rows:
+        print(json.dumps(row, ensure_ascii=False))